@@ -1,864 +1,3526 @@
 import os
+import re
+import sys
 import json
+import math
+import time
+import argparse
+import random
+import heapq
+import hashlib
+import posixpath
+import functools
+import textwrap
+import threading
 from datetime import datetime
-from openai import OpenAI
-from dotenv import load_dotenv
-load_dotenv()
-
-
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Few-shot template examples for different website categories
-TEMPLATE_EXAMPLES = {
-    "ecommerce": """
-<!-- E-COMMERCE EXAMPLE TEMPLATE -->
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Online Store</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-</head>
-<body class="bg-gray-50">
-    <!-- Navigation -->
-    <nav class="bg-white shadow-lg sticky top-0 z-50">
-        <div class="max-w-7xl mx-auto px-4 py-4">
-            <div class="flex justify-between items-center">
-                <h1 class="text-2xl font-bold text-gray-800">StoreName</h1>
-                <div class="flex gap-6 items-center">
-                    <a href="#" class="text-gray-600 hover:text-gray-900">Shop</a>
-                    <a href="#" class="text-gray-600 hover:text-gray-900">About</a>
-                    <button id="cart-btn" class="relative">
-                        🛒 <span id="cart-count" class="absolute -top-2 -right-2 bg-red-500 text-white rounded-full w-5 h-5 text-xs flex items-center justify-center">0</span>
-                    </button>
-                </div>
-            </div>
-        </div>
-    </nav>
-
-    <!-- Hero Section -->
-    <section class="bg-gradient-to-r from-purple-600 to-blue-600 text-white py-20">
-        <div class="max-w-7xl mx-auto px-4 text-center">
-            <h2 class="text-5xl font-bold mb-4">Welcome to Our Store</h2>
-            <p class="text-xl mb-8">Discover amazing products at great prices</p>
-            <button class="bg-white text-purple-600 px-8 py-3 rounded-full font-bold hover:bg-gray-100 transition">Shop Now</button>
-        </div>
-    </section>
-
-    <!-- Products Grid -->
-    <section class="max-w-7xl mx-auto px-4 py-16">
-        <h3 class="text-3xl font-bold mb-8">Featured Products</h3>
-        <div id="products-grid" class="grid grid-cols-1 md:grid-cols-3 lg:grid-cols-4 gap-6">
-            <!-- Products loaded dynamically -->
-        </div>
-    </section>
-
-    <!-- Cart Modal -->
-    <div id="cart-modal" class="hidden fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center z-50">
-        <div class="bg-white rounded-lg p-8 max-w-2xl w-full max-h-[80vh] overflow-y-auto">
-            <div class="flex justify-between items-center mb-6">
-                <h3 class="text-2xl font-bold">Shopping Cart</h3>
-                <button id="close-cart" class="text-gray-500 hover:text-gray-700 text-2xl">&times;</button>
-            </div>
-            <div id="cart-items"></div>
-            <div class="border-t pt-4 mt-4">
-                <div class="flex justify-between text-xl font-bold mb-4">
-                    <span>Total:</span>
-                    <span id="cart-total">$0.00</span>
-                </div>
-                <button class="w-full bg-green-600 text-white py-3 rounded-lg hover:bg-green-700 transition">Checkout</button>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        // Sample products data
-        const products = [
-            {id: 1, name: "Product 1", price: 29.99, image: "https://via.placeholder.com/300"},
-            {id: 2, name: "Product 2", price: 49.99, image: "https://via.placeholder.com/300"},
-            {id: 3, name: "Product 3", price: 19.99, image: "https://via.placeholder.com/300"},
-            {id: 4, name: "Product 4", price: 39.99, image: "https://via.placeholder.com/300"}
-        ];
-
-        // Cart functionality (using in-memory storage instead of localStorage)
-        let cart = [];
-
-        function updateCartCount() {
-            document.getElementById('cart-count').textContent = cart.reduce((sum, item) => sum + item.quantity, 0);
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError, wait
+
+
+# Default model settings, used by any route that does not set its own
+MODEL = "gpt-4.1-mini"
+TEMPERATURE = 0.7
+
+# Model routing: every call takes its model, temperature and max_tokens from the first matching
+# route in ROUTES_PATH, by kind of call, estimated output tokens and number of files affected
+ROUTES_PATH = os.getenv("AI_WEB_BUILDER_ROUTES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "routes.json"))
+ROUTE_PAGE_TOKENS = 2500  # expected output per generated page
+ROUTE_PLAN_TOKENS = 800
+ROUTE_EDIT_TOKENS = 300  # fixed part of an edit reply, plus a quarter of the files it touches
+ROUTE_PAGE_WORDS = {
+    "about", "contact", "menu", "cart", "checkout", "gallery", "blog", "login", "signup", "account",
+    "dashboard", "faq", "shop", "services", "team", "careers", "booking", "order", "orders",
+}
+
+# LLM backend: HTTP pool size, per-request timeout, retries with jittered exponential backoff
+POOL_CONNECTIONS = 20
+REQUEST_TIMEOUT = 120.0  # seconds
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0  # seconds
+BACKOFF_MAX = 30.0  # seconds
+
+# Hedged requests: fire a second request when the first runs past the recent p95 latency
+HEDGE_REQUESTS = os.getenv("AI_WEB_BUILDER_HEDGE", "0") == "1"
+HEDGE_MIN_SAMPLES = 5
+HEDGE_DEFAULT_AFTER = 60.0  # seconds, used until enough latencies are recorded
+
+# Client-side rate limiting: token buckets for requests and tokens per minute, shared by all calls
+# through one backend. Limits start from AI_WEB_BUILDER_RPM/TPM (0 = unknown) and follow the
+# x-ratelimit-* response headers; interactive calls are served before batch ones
+RATE_LIMIT = os.getenv("AI_WEB_BUILDER_RATE_LIMIT", "1") == "1"
+RATE_LIMIT_RPM = int(os.getenv("AI_WEB_BUILDER_RPM", "0"))
+RATE_LIMIT_TPM = int(os.getenv("AI_WEB_BUILDER_TPM", "0"))
+RATE_LIMIT_HEADROOM = 0.95  # fraction of each limit to use
+RATE_LIMIT_COMPLETION_TOKENS = 4000  # completion size assumed until real usage is seen
+RATE_LIMIT_LANES = ("interactive", "batch")
+
+# On-disk response cache settings
+CACHE_DIR = os.getenv("AI_WEB_BUILDER_CACHE_DIR", os.path.join(".cache", "generations"))
+CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+CACHE_MAX_AGE = 7 * 24 * 60 * 60  # 7 days
+
+# Similar-prompt reuse (opt-in): a new site is generated with the nearest earlier one as a reference
+# when the normalized word sets of the two prompts overlap by at least SIMILARITY_THRESHOLD and
+# share at least SIMILAR_MIN_SHARED_TERMS words beyond the site type and colors
+SIMILAR_REUSE = os.getenv("AI_WEB_BUILDER_REUSE_SIMILAR", "0") == "1"
+SIMILAR_INDEX_PATH = os.path.join(CACHE_DIR, "similar.jsonl")
+SIMILARITY_THRESHOLD = 0.7
+SIMILAR_MIN_SHARED_TERMS = 2
+SIMILAR_GENERIC_TERMS = {"color", "dark", "light", "bright", "pastel", "black", "white"}
+SIMILAR_MAX_ENTRIES = 50000
+MINHASH_BANDS = 10
+MINHASH_ROWS = 3
+MINHASH_BUCKET_SIZE = 64
+MINHASH_PRIME = (1 << 61) - 1
+MINHASH_SEED = 17
+PROMPT_FILLER_WORDS = {
+    "a", "an", "the", "for", "with", "and", "or", "of", "to", "in", "on", "my", "our", "me", "i",
+    "want", "need", "please", "create", "build", "make", "generate", "design", "website", "site",
+    "web", "page", "webpage", "modern", "simple", "nice", "beautiful", "new", "that", "which",
+}
+PROMPT_SYNONYMS = {
+    "colour": "color", "colours": "color", "colors": "color", "theme": "color", "themed": "color",
+    "palette": "color", "scheme": "color", "tones": "color",
+}
+SIMILAR_SEED_PROMPT = """A site built earlier for a similar request ("{prompt}") follows, for reference only:
+{files}
+
+Build a complete new site for the next request. Reuse the earlier site's structure and code where they fit, but replace everything specific to the earlier request (names, copy, products, colors) and add or drop pages as the new request needs."""
+
+# Per-call metrics: JSONL file rotated at METRICS_MAX_BYTES, keeping METRICS_BACKUPS old files
+METRICS_PATH = os.getenv("AI_WEB_BUILDER_METRICS", os.path.join(".cache", "metrics.jsonl"))
+METRICS_MAX_BYTES = 5 * 1024 * 1024  # 5 MB
+METRICS_BACKUPS = 3
+
+# Maximum estimated tokens of past conversation turns resent with each request
+HISTORY_TOKEN_BUDGET = 4000
+
+# Project saving: per-project manifest of content hashes and number of parallel writers
+MANIFEST_NAME = ".manifest.json"
+SAVE_WORKERS = 8
+
+# Build step on save: replace the Tailwind Play CDN with a purged static stylesheet
+STATIC_CSS = os.getenv("AI_WEB_BUILDER_STATIC_CSS", "1") == "1"
+STATIC_CSS_NAME = "tailwind.css"
+
+# Opt-in build step on save: hoist markup and functions repeated across pages into shared files
+SHARED_LAYOUT = os.getenv("AI_WEB_BUILDER_SHARED_LAYOUT", "0") == "1"
+SHARED_LAYOUT_MIN_BYTES = 200
+
+# Few-shot template selection: at most MAX_TEMPLATES examples within TEMPLATE_TOKEN_BUDGET
+MAX_TEMPLATES = 2
+TEMPLATE_TOKEN_BUDGET = 4000
+
+# Few-shot examples are sent compacted: comments and indentation dropped, and after the first of
+# more than TEMPLATE_REPEAT_KEEP similar sibling blocks (cards, list items, data rows) the rest elided
+COMPACT_TEMPLATES = os.getenv("AI_WEB_BUILDER_COMPACT_TEMPLATES", "1") == "1"
+TEMPLATE_REPEAT_KEEP = 2
+TEMPLATE_COMPACT_NOTE = (
+    "The examples are compacted: indentation and comments are removed and repeated blocks are "
+    "elided where marked. Write your own files complete and properly indented."
+)
+
+# Display name and (keyword, weight) pairs per template; nouns naming the business count in
+# full, generic words for less and verbs any kind of site uses ("selling", "buy") least.
+# Plural and verb forms of each keyword match too (see keyword_variants)
+TEMPLATE_KEYWORDS = {
+    "cake_shop": ("Cake Shop", [
+        ("cake", 1.0), ("bakery", 1.0), ("sweet", 0.5), ("dessert", 1.0), ("pastry", 1.0),
+        ("cupcake", 1.0), ("brownie", 1.0), ("cookie", 1.0), ("donut", 1.0), ("muffin", 1.0),
+        ("baker", 1.0),
+    ]),
+    "ecommerce": ("E-Commerce", [
+        ("shop", 1.0), ("store", 1.0), ("ecommerce", 1.0), ("e-commerce", 1.0), ("cart", 1.0),
+        ("product", 0.5), ("buy", 0.25), ("sell", 0.25),
+    ]),
+    "landing": ("Landing Page", [
+        ("landing", 1.0), ("saas", 1.0), ("service", 0.5), ("features", 0.5), ("pricing", 1.0),
+        ("startup", 1.0),
+    ]),
+    "portfolio": ("Portfolio", [
+        ("portfolio", 1.0), ("showcase", 1.0), ("work", 0.5), ("projects", 0.5), ("designer", 1.0),
+        ("developer", 1.0), ("artist", 1.0),
+    ]),
+}
+
+# Local fast path: a short prompt that only names a site type plus a brand, colors and items
+# is rendered straight from the matching template, without a model call
+FAST_PATH = os.getenv("AI_WEB_BUILDER_FAST_PATH", "1") == "1"
+FAST_PATH_MAX_WORDS = 30
+FAST_PATH_MAX_ITEMS = 12
+# Per template: placeholder brand, color families to recolor (primary first), JS items array, tagline
+FAST_PATH_TEMPLATES = {
+    "cake_shop": {"brand": "Sweet Bites", "colors": ("pink",), "items": "cakes"},
+    "ecommerce": {"brand": "StoreName", "colors": ("purple", "blue"), "items": "products"},
+    "landing": {"brand": "BrandName", "colors": ("blue", "purple")},
+    "portfolio": {"brand": "John Doe", "colors": ("gray",), "tagline": "Creative Developer & Designer"},
+}
+# Words a fast-path prompt may contain besides template keywords, colors and the extracted slots
+FAST_PATH_WORDS = PROMPT_FILLER_WORDS | {
+    "called", "named", "brand", "branded", "selling", "sells", "offering", "featuring", "using",
+    "color", "colors", "colour", "colours", "theme", "themed", "scheme", "accent", "accents",
+    "primary", "secondary", "clean", "minimal", "elegant", "stylish", "professional", "responsive",
+    "small", "local", "online", "personal", "business", "company", "homepage", "one", "single",
+}
+FAST_PATH_COLOR_ALIASES = {
+    "grey": "gray", "gold": "amber", "golden": "amber", "brown": "amber", "navy": "blue",
+    "turquoise": "cyan", "magenta": "fuchsia", "lavender": "violet",
+}
+
+# Diff-mode modifications: at most this many files are sent to the model
+MAX_EDIT_FILES = 3
+EDIT_STOPWORDS = {
+    "make", "change", "update", "please", "should", "with", "that", "this", "into",
+    "from", "more", "less", "some", "them", "have", "also", "instead", "add", "remove",
+}
+
+# System prompt for diff-mode modifications
+EDIT_SYSTEM_PROMPT = """You are an expert web developer AI agent editing an existing website.
+You receive only the files relevant to the requested change, not the whole site.
+
+Return a JSON object with this structure:
+{
+    "edits": [
+        {"file": "index.html", "search": "exact text copied from the current file", "replace": "new text"}
+    ],
+    "new_files": {
+        "extra.js": "Full content of any file that does not exist yet"
+    },
+    "description": "Brief description of the change"
+}
+
+EDIT RULES:
+1. "search" must be copied character for character from the current file and match exactly one place in it
+2. Keep each search block short: the lines that change plus just enough context to be unique
+3. Use several small edits rather than one large one
+4. Never repeat whole existing files; only put files that do not exist yet in "new_files"
+5. Keep the existing code style, Tailwind classes and functionality intact"""
+
+# Output validation: files are checked in a process pool, broken or missing ones regenerated once
+VALIDATE_OUTPUT = os.getenv("AI_WEB_BUILDER_VALIDATE", "1") == "1"
+VALIDATION_WORKERS = min(8, os.cpu_count() or 1)
+
+# Session snapshots: compressed builder state saved on quit and restored with 'resume <name>'
+SNAPSHOT_DIR = os.getenv("AI_WEB_BUILDER_SNAPSHOT_DIR", os.path.join(".cache", "sessions"))
+SNAPSHOT_SUFFIX = ".session.gz"
+SNAPSHOT_VERSION = 1
+
+# Service mode: sessions kept in memory, builder calls running at once, calls allowed to wait
+SERVICE_MAX_SESSIONS = 1000
+SERVICE_MAX_IN_FLIGHT = 32
+SERVICE_MAX_QUEUE = 256
+SERVICE_MAX_BODY = 1024 * 1024  # bytes
+
+# Replies cut off at the output limit (finish_reason "length") keep every file received in full
+# and ask for the rest, at most MAX_CONTINUATIONS times
+MAX_CONTINUATIONS = 4
+CONTINUE_PROMPT = """Your previous reply was cut off at the output limit. Files received in full: {received}.{cut_off}
+Reply with a JSON object {{"files": {{"filename": "complete file content"}}, "complete": true}} holding, in full, every file the site still needs that was not received. Do not resend files that were received. If they do not all fit, send as many complete files as fit and set "complete" to false."""
+
+# Plan-then-fan-out generation: a short planning call, then one request per file
+FAN_OUT_WORKERS = 8
+
+PLAN_SYSTEM_PROMPT = """You are an expert web developer AI agent planning a website before it is built.
+Each file will be generated separately and in parallel from your plan, so the plan must contain
+everything the pages need to look and work like one consistent site.
+
+Return a JSON object with this structure:
+{
+    "project_name": "project-name",
+    "needs_backend": true/false,
+    "backend_requirements": "Brief description of what backend features are needed (if any)",
+    "description": "Brief description of the site",
+    "design": {
+        "colors": {"primary": "Tailwind color, e.g. pink-600", "secondary": "...", "accent": "..."},
+        "fonts": "Font choices",
+        "style": "Shared look: corners, shadows, gradients, spacing"
+    },
+    "navigation": [
+        {"label": "Home", "href": "index.html"}
+    ],
+    "shared": "Markup and behavior every page shares (header, footer, cart state, etc.)",
+    "files": {
+        "index.html": "Sections and functionality of this file",
+        "script.js": "Functions this file provides and which pages use them"
+    }
+}
+
+Keep the plan short: no code, only decisions. Use the fewest files that meet the request."""
+
+# Fixed instructions for the generation agent. This is sent first and never varies
+# between requests so the provider can cache it; per-request parts follow it.
+SYSTEM_PROMPT = """You are an expert web developer AI agent. Your job is to:
+1. Understand user requirements for websites
+2. Generate complete, production-ready HTML, CSS, and JavaScript code
+3. Create modern, responsive, and accessible websites using Tailwind CSS
+4. Learn from the template examples provided and generate similar quality code
+5. Identify if backend is needed
+6. Return code in a structured JSON format
+
+IMPORTANT TEMPLATE EXAMPLES TO LEARN FROM are provided in the next message.
+
+Study these examples carefully! They demonstrate:
+- Proper HTML structure and semantic markup
+- Tailwind CSS usage for styling
+- JavaScript for interactivity
+- Responsive design patterns
+- Component organization
+- Cart functionality for e-commerce
+- Form handling
+- Modal dialogs
+- Navigation patterns
+- Layout best practices
+
+When generating code, return a JSON object with this structure:
+{
+    "project_name": "project-name",
+    "needs_backend": true/false,
+    "backend_requirements": "Brief description of what backend features are needed (if any)",
+    "files": {
+        "index.html": "HTML content here",
+        "cart.html": "Additional pages if needed",
+        "checkout.html": "More pages as required",
+        "styles.css": "Custom CSS if needed beyond Tailwind",
+        "script.js": "JavaScript for functionality"
+    },
+    "description": "Brief description of what was created"
+}
+
+Set "needs_backend" to TRUE if the website requires:
+- Database (storing products, users, orders, etc.)
+- User authentication/login
+- Payment processing
+- Server-side operations
+- API integration
+- Real-time features
+- Order management
+- Email sending
+- Admin panels with data persistence
+
+IMPORTANT CODE QUALITY REQUIREMENTS:
+1. Use Tailwind CSS CDN: <script src="https://cdn.tailwindcss.com"></script>
+2. Make it fully responsive (mobile-first approach)
+3. Include proper semantic HTML5 tags
+4. Add accessibility features (ARIA labels, alt tags, proper form labels)
+5. DO NOT use localStorage or sessionStorage - use JavaScript variables for cart/data
+6. Include smooth transitions and hover effects
+7. Add clear comments explaining functionality
+8. For e-commerce: Implement full cart functionality like the example
+9. Use modern JavaScript (ES6+) with arrow functions, template literals
+10. Ensure clean, readable, well-organized code
+11. Add proper error handling for forms
+12. Include loading states for buttons when appropriate
+
+STYLING GUIDELINES:
+- Use consistent color schemes (primary, secondary, accent colors)
+- Proper spacing and typography hierarchy
+- Smooth transitions (transition-all duration-300)
+- Hover effects on interactive elements
+- Shadow effects for depth (shadow-md, shadow-lg)
+- Rounded corners for modern look (rounded-lg, rounded-xl)
+- Gradient backgrounds where appropriate
+- Proper contrast for accessibility
+
+FUNCTIONAL REQUIREMENTS:
+- All forms should have validation
+- Buttons should have hover and active states
+- Navigation should be sticky or fixed
+- Mobile menu for responsive navigation
+- Shopping carts should use JavaScript variables (NOT localStorage)
+- Modals should have backdrop and close buttons
+- Images should be lazy-loaded where possible
+- Add smooth scroll behavior
+
+Make websites visually stunning and highly functional!"""
+
+
+# Few-shot template examples for different website categories, loaded from TEMPLATE_DIR on first use
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+
+def _indent_of(line):
+    return len(line) - len(line.lstrip())
+
+
+def _block_end(lines, start):
+    """End (exclusive) of the multi-line element or JS object entry starting at lines[start], or None"""
+    stripped = lines[start].strip()
+    if stripped.startswith("{") and stripped.rstrip(",").endswith("}"):
+        return start + 1
+    match = re.match(r"<([a-zA-Z][\w-]*)\b", stripped)
+    if not match or f"</{match.group(1)}>" in stripped:
+        return None
+    indent = _indent_of(lines[start])
+    for end in range(start + 1, len(lines)):
+        if lines[end].strip() and _indent_of(lines[end]) <= indent:
+            return end + 1 if lines[end].strip().startswith(f"</{match.group(1)}>") else None
+    return None
+
+
+def _block_shape(lines):
+    """A block with its text, links, images and literal values removed, for spotting repeats"""
+    text = "\n".join(line.strip() for line in lines)
+    if text.startswith("{"):
+        return re.sub(r"\"(?:[^\"\\]|\\.)*\"|-?\d+(?:\.\d+)?", "", text)
+    text = re.sub(r"\s(?:alt|src|href|onclick|id)=\"[^\"]*\"", "", text)
+    return re.sub(r">[^<]*<", "><", text)
+
+
+def compact_template(source):
+    """Few-shot form of a template: comments and indentation dropped, runs of similar blocks elided
+    
+    Comments naming a file (<!-- CART PAGE (cart.html) -->) are kept, since they tell the
+    model how a multi-page example is split into files.
+    """
+    lines = source.splitlines()
+    elided = {}  # line index -> (index to continue from, marker)
+    index = 0
+    while index < len(lines):
+        end = _block_end(lines, index) if index not in elided else None
+        if end is not None:
+            # Count the similar blocks that follow at the same indentation
+            shape = _block_shape(lines[index:end])
+            following, repeats, run_end = end, 0, end
+            while following < len(lines):
+                while following < len(lines) and not lines[following].strip():
+                    following += 1
+                next_end = _block_end(lines, following) if following < len(lines) else None
+                if (next_end is None or _indent_of(lines[following]) != _indent_of(lines[index])
+                        or _block_shape(lines[following:next_end]) != shape):
+                    break
+                repeats += 1
+                following = run_end = next_end
+            if repeats >= TEMPLATE_REPEAT_KEEP:
+                marker = (f"// ... {repeats} more entries like the one above" if lines[index].strip().startswith("{")
+                          else f"<!-- ... {repeats} more blocks like the one above -->")
+                elided[end] = (run_end, marker)
+        index += 1
+    
+    out = []
+    index = 0
+    while index < len(lines):
+        if index in elided:
+            index, marker = elided[index]
+            out.append(marker)
+            continue
+        line = lines[index].strip()
+        index += 1
+        if line.startswith("<!--") and line.endswith("-->") and not re.search(r"[\w-]+\.html", line):
+            continue
+        if line.startswith("//"):
+            continue
+        if not line:
+            continue
+        # Text on its own line goes back inside its element: <h2 ...>Text</h2>
+        if out and out[-1].endswith(">") and not out[-1].startswith("</") and not line.startswith(("<", "{", "//")):
+            closing = lines[index].strip() if index < len(lines) else ""
+            if closing.startswith("</"):
+                out[-1] += line + closing
+                index += 1
+                continue
+        out.append(line)
+    return "\n".join(out) + "\n"
+
+
+class TemplateLibrary(Mapping):
+    """Read-only mapping of template name -> example HTML, reading each file only when needed
+    
+    With compact=True the mapping holds compact_template() forms, computed once per template.
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR, compact=False):
+        self.template_dir = template_dir
+        self.compact = compact
+        self._loaded = {}
+
+    def __getitem__(self, key):
+        if key not in self._loaded:
+            path = os.path.join(self.template_dir, f"{key}.html")
+            try:
+                with open(path, "r", encoding="utf-8", newline="") as f:
+                    source = f.read()
+            except FileNotFoundError:
+                raise KeyError(key) from None
+            self._loaded[key] = compact_template(source) if self.compact else source
+        return self._loaded[key]
+
+    def __iter__(self):
+        return iter(sorted(name[:-5] for name in os.listdir(self.template_dir) if name.endswith(".html")))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+TEMPLATE_SOURCES = TemplateLibrary()  # as written, for rendering sites locally
+TEMPLATE_EXAMPLES = TemplateLibrary(compact=COMPACT_TEMPLATES)
+
+
+def template_token_report(templates=TEMPLATE_SOURCES):
+    """Estimated tokens per template as written and compacted: [(name, tokens, compact_tokens)]"""
+    return [
+        (name, estimate_tokens(templates[name]), estimate_tokens(compact_template(templates[name])))
+        for name in templates
+    ]
+
+
+class GenerationCache:
+    """Content-addressed on-disk cache of model responses with LRU eviction
+    
+    Entries may be removed at any time by another builder or process sharing cache_dir,
+    so a file vanishing mid-operation counts as a miss or an entry already evicted.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, user_prompt, template_names, model, temperature, history):
+        """Build a cache key from everything that influences the model output"""
+        history_digest = hashlib.sha256(
+            json.dumps(history, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        payload = json.dumps({
+            "prompt": " ".join(user_prompt.lower().split()),
+            "templates": sorted(template_names),
+            "model": model,
+            "temperature": temperature,
+            "history": history_digest,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached response text for key, or None on a miss"""
+        content = self.peek(key)
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return content
+
+    def peek(self, key):
+        """Like get, without counting a hit or miss"""
+        path = self._path(key)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age > self.max_age:
+                self._remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except OSError:
+            return None
+        
+        # Touch the entry so eviction treats it as recently used
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            pass
+        return content
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # already removed by another builder sharing the cache
+
+    def put(self, key, content):
+        """Store response text under key and evict old entries"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_file_atomic(self._path(key), content)
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        
+        with self._lock:
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def stats(self):
+        """Return hit/miss counters"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+# Shared response cache, reused across builder instances
+generation_cache = GenerationCache()
+
+
+class SimilarityIndex:
+    """MinHash/LSH index of earlier prompts, for starting new sites from the nearest old one
+
+    Prompts are reduced to sets of normalized words (template keywords folded into their
+    template, filler words dropped). Each set gets a MinHash signature split into LSH
+    bands, so a lookup only scores prompts sharing at least one band bucket. Prompts with
+    the same word set share one entry (the newest), and buckets keep only their newest
+    MINHASH_BUCKET_SIZE entries, which bounds the work per lookup.
+    """
+
+    def __init__(self, path=SIMILAR_INDEX_PATH, threshold=SIMILARITY_THRESHOLD, max_entries=SIMILAR_MAX_ENTRIES,
+                 min_shared=SIMILAR_MIN_SHARED_TERMS):
+        self.path = path
+        self.threshold = threshold
+        self.min_shared = min_shared
+        self.max_entries = max_entries
+        self.entries = None  # loaded on first use
+        self.buckets = {}
+        self.positions = {}  # word set -> position in entries
+        self._lock = threading.Lock()
+        rng = random.Random(MINHASH_SEED)
+        self._permutations = [
+            (rng.randrange(1, MINHASH_PRIME), rng.randrange(MINHASH_PRIME))
+            for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+        ]
+
+    @staticmethod
+    def shingles(prompt):
+        """Normalized word set of a prompt"""
+        words = set()
+        for word in re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", prompt.lower()):
+            if word in PROMPT_FILLER_WORDS:
+                continue
+            keyword = TEMPLATE_KEYWORD_PATTERN.fullmatch(word)
+            if keyword:
+                # Every template the keyword points to, so "bakery" and "cake" meet
+                words.update(key for key, weight in TEMPLATE_KEYWORD_INDEX[keyword.group(1)] if weight >= 1.0)
+                continue
+            words.add(PROMPT_SYNONYMS.get(word, word.rstrip("s") if len(word) > 3 else word))
+        return words
+
+    @staticmethod
+    def distinctive(shingles):
+        """Number of words that name the business rather than the site type or colors"""
+        return sum(
+            1 for word in shingles
+            if word not in TEMPLATE_KEYWORDS and word not in TAILWIND_PALETTE and word not in SIMILAR_GENERIC_TERMS
+        )
+
+    def signature(self, shingles):
+        hashes = [int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+                  for word in shingles]
+        return [min((a * value + b) % MINHASH_PRIME for value in hashes) for a, b in self._permutations]
+
+    @staticmethod
+    def _bands(signature):
+        return [
+            (band, tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]))
+            for band in range(MINHASH_BANDS)
+        ]
+
+    def _load(self):
+        self.entries = []
+        if os.path.exists(self.path):
+            lines = 0
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        lines += 1
+                        self._insert(json.loads(line))
+            if len(self.entries) > self.max_entries or lines > 2 * len(self.entries) + 100:
+                # Keep the newest entries and rewrite the file without the rest and without repeats
+                kept = self.entries[-self.max_entries:]
+                self.entries, self.buckets, self.positions = [], {}, {}
+                for entry in kept:
+                    self._insert(entry)
+                write_file_atomic(self.path, "".join(json.dumps(entry) + "\n" for entry in kept))
+
+    def _insert(self, entry):
+        words = frozenset(entry["shingles"])
+        if words in self.positions:
+            self.entries[self.positions[words]] = entry
+            return
+        position = self.positions[words] = len(self.entries)
+        self.entries.append(entry)
+        for bucket in self._bands(entry["signature"]):
+            if bucket not in self.buckets:
+                self.buckets[bucket] = deque(maxlen=MINHASH_BUCKET_SIZE)
+            self.buckets[bucket].append(position)
+
+    def add(self, prompt, key):
+        """Index a prompt whose generation is stored in the response cache under key"""
+        shingles = self.shingles(prompt)
+        if not shingles:
+            return
+        entry = {"prompt": prompt, "key": key, "shingles": sorted(shingles), "signature": self.signature(shingles)}
+        with self._lock:
+            if self.entries is None:
+                self._load()
+            self._insert(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def lookup(self, prompt, limit=5):
+        """Earlier prompts at or above the similarity threshold, most similar first
+
+        Returns [{"prompt", "key", "similarity"}]; similarity is the Jaccard index of
+        the two word sets. Prompts sharing fewer than min_shared distinctive words (other than
+        template names and colors) are left out, so "dentist, dark theme" does not match
+        "gym, dark theme" through the site type and color alone.
+        """
+        shingles = self.shingles(prompt)
+        if not shingles:
+            return []
+        with self._lock:
+            if self.entries is None:
+                self._load()
+            collisions = {}
+            for bucket in self._bands(self.signature(shingles)):
+                for position in self.buckets.get(bucket, ()):
+                    collisions[position] = collisions.get(position, 0) + 1
+            # Candidates sharing the most bands are the likeliest matches; only those get scored
+            candidates = sorted(collisions, key=lambda position: (-collisions[position], -position))[:limit * 4]
+            matches = []
+            for position in candidates:
+                entry = self.entries[position]
+                stored = set(entry["shingles"])
+                similarity = len(shingles & stored) / len(shingles | stored)
+                if similarity >= self.threshold and self.distinctive(shingles & stored) >= self.min_shared:
+                    matches.append({"prompt": entry["prompt"], "key": entry["key"], "similarity": similarity})
+        matches.sort(key=lambda match: -match["similarity"])
+        return matches[:limit]
+
+
+# Shared similar-prompt index, reused across builder instances
+similarity_index = SimilarityIndex()
+
+
+class StreamingJSONParser:
+    """Incremental JSON parser that emits each entry of "files" as soon as its string closes"""
+
+    _WHITESPACE = re.compile(r"[ \t\n\r]*")
+    _SCALAR = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null")
+    _LITERALS = {"true": True, "false": False, "null": None}
+    _STRING_SPECIAL = re.compile(r'["\\\\]')
+
+    def __init__(self, on_file=None):
+        self.on_file = on_file
+        self.result = None
+        self.done = False
+        self._buffer = ""
+        self._stack = []  # [container, pending_key] per open object/array
+        self._expect_key = False
+        # While a string is open, new chunks wait here until one of them can close it
+        self._pending = []
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk):
+        """Consume the next piece of streamed text"""
+        if self._in_string:
+            # Only the new text is scanned, so a long file value costs linear time overall
+            self._pending.append(chunk)
+            end, self._escaped = self._closing_quote(chunk, 1 if self._escaped else 0)
+            if end is None:
+                return
+            self._flush()
+        else:
+            self._buffer += chunk
+        self._parse(final=False)
+
+    def close(self):
+        """Finish parsing and return the complete object"""
+        self._flush()
+        self._parse(final=True)
+        if not self.done:
+            raise json.JSONDecodeError("Incomplete JSON object", self._buffer, len(self._buffer))
+        return self.result
+
+    def _flush(self):
+        self._buffer += "".join(self._pending)
+        self._pending = []
+        self._in_string = False
+
+    @classmethod
+    def _closing_quote(cls, text, start):
+        """Index of the unescaped quote at or after start (or None), and whether text ends mid-escape"""
+        while True:
+            match = cls._STRING_SPECIAL.search(text, start)
+            if not match:
+                return None, start > len(text)
+            if match.group() == '"':
+                return match.start(), False
+            start = match.end() + 1
+
+    def _add_value(self, value):
+        if not self._stack:
+            self.result = value
+            self.done = True
+            return
+        container, key = self._stack[-1]
+        if isinstance(container, list):
+            container.append(value)
+            return
+        container[key] = value
+        # Hand finished files to the caller right away
+        if (self.on_file and isinstance(value, str) and len(self._stack) == 2
+                and self._stack[0][1] == "files"):
+            self.on_file(key, value)
+
+    def _parse(self, final):
+        buf = self._buffer
+        pos = self._WHITESPACE.match(buf, 0).end()
+        while pos < len(buf) and not self.done:
+            char = buf[pos]
+            if char == '"':
+                closing, escaped = self._closing_quote(buf, pos + 1)
+                if closing is None:
+                    if final:
+                        raise json.JSONDecodeError("Unterminated string", buf, pos)
+                    self._in_string, self._escaped = True, escaped
+                    break  # string not closed yet, wait for more data
+                value, end = json.decoder.scanstring(buf, pos + 1)
+                if self._expect_key:
+                    self._stack[-1][1] = value
+                    self._expect_key = False
+                else:
+                    self._add_value(value)
+                pos = end
+            elif char in "{[":
+                container = {} if char == "{" else []
+                self._add_value(container)
+                self.done = False
+                self._stack.append([container, None])
+                self._expect_key = char == "{"
+                pos += 1
+            elif char in "}]":
+                if not self._stack:
+                    raise json.JSONDecodeError("Unexpected closing bracket", buf, pos)
+                self._stack.pop()
+                self._expect_key = False
+                if not self._stack:
+                    self.done = True
+                pos += 1
+            elif char == ",":
+                self._expect_key = bool(self._stack) and isinstance(self._stack[-1][0], dict)
+                pos += 1
+            elif char == ":":
+                pos += 1
+            else:
+                match = self._SCALAR.match(buf, pos)
+                if not match:
+                    if final or len(buf) - pos >= 5:
+                        raise json.JSONDecodeError("Unexpected character", buf, pos)
+                    break
+                if not final and (match.end() == len(buf) or buf[match.end()] not in ",]} \t\n\r"):
+                    if len(buf) - match.end() > 8:
+                        raise json.JSONDecodeError("Unexpected character", buf, match.end())
+                    break  # number or literal may continue in the next chunk
+                token = match.group()
+                if token in self._LITERALS:
+                    value = self._LITERALS[token]
+                else:
+                    value = json.loads(token)
+                self._add_value(value)
+                pos = match.end()
+            pos = self._WHITESPACE.match(buf, pos).end()
+
+        # Drop consumed text so the raw stream is never held in full
+        self._buffer = buf[pos:]
+
+    def partial(self):
+        """Everything parsed so far and the name of the file whose content is still open (or None)"""
+        open_file = None
+        if len(self._stack) == 2 and self._stack[0][1] == "files":
+            files, key = self._stack[1]
+            if key is not None and key not in files:
+                open_file = key
+        return self.result, open_file
+
+
+def salvage_json(text):
+    """Parse a reply cut off part-way: (object with every value received in full, file left open or None)"""
+    parser = StreamingJSONParser()
+    try:
+        parser.feed(text)
+    except json.JSONDecodeError:
+        pass  # keep what parsed before the damage
+    return parser.partial()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class MetricsSink:
+    """Thread-safe JSONL sink for per-call metrics with size-based rotation"""
+
+    def __init__(self, path=METRICS_PATH, max_bytes=METRICS_MAX_BYTES, backups=METRICS_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def read(self):
+        """Return all records, oldest first"""
+        records = []
+        paths = [f"{self.path}.{index}" for index in range(self.backups, 0, -1)] + [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+        return records
+
+    def summary(self):
+        """Latency percentiles per operation and token usage per generated site"""
+        by_operation = {}
+        for record in self.read():
+            by_operation.setdefault(record["operation"], []).append(record)
+        
+        summary = {}
+        for operation, records in by_operation.items():
+            latencies = [record["total_ms"] for record in records]
+            tokens = [record.get("prompt_tokens", 0) + record.get("completion_tokens", 0) for record in records]
+            summary[operation] = {
+                "calls": len(records),
+                "p50_ms": percentile(latencies, 0.50),
+                "p95_ms": percentile(latencies, 0.95),
+                "avg_tokens": sum(tokens) / len(tokens),
+            }
+        return summary
+
+    def reuse_summary(self):
+        """How often generations started from a similar earlier site, and the time that saved
+
+        Time saved compares the mean latency of reused generations with that of generations
+        made from scratch (cache hits are left out of both).
+        """
+        generations = [
+            record for record in self.read()
+            if record["operation"] == "generate" and "error" not in record
+            and not record.get("cache_hit") and not record.get("fast_path")
+        ]
+        reused = [record["total_ms"] for record in generations if "reused_from" in record]
+        fresh = [record["total_ms"] for record in generations if "reused_from" not in record]
+        saved_ms = 0.0
+        if reused and fresh:
+            saved_ms = max(sum(fresh) / len(fresh) - sum(reused) / len(reused), 0.0) * len(reused)
+        return {
+            "generations": len(generations),
+            "reused": len(reused),
+            "reuse_rate": len(reused) / len(generations) if generations else 0.0,
+            "saved_ms": saved_ms,
+        }
+
+    def fast_path_summary(self):
+        """How many generations were built locally from a template, and how fast"""
+        generations = [
+            record for record in self.read()
+            if record["operation"] == "generate" and "error" not in record
+        ]
+        local = [record["total_ms"] for record in generations if record.get("fast_path")]
+        return {
+            "generations": len(generations),
+            "local": len(local),
+            "hit_rate": len(local) / len(generations) if generations else 0.0,
+            "p50_ms": percentile(local, 0.50),
         }
 
-        function renderProducts() {
-            const grid = document.getElementById('products-grid');
-            grid.innerHTML = products.map(product => `
-                <div class="bg-white rounded-lg shadow-md overflow-hidden hover:shadow-xl transition">
-                    <img src="${product.image}" alt="${product.name}" class="w-full h-48 object-cover">
-                    <div class="p-4">
-                        <h4 class="font-bold text-lg mb-2">${product.name}</h4>
-                        <p class="text-gray-600 mb-4">$${product.price.toFixed(2)}</p>
-                        <button onclick="addToCart(${product.id})" class="w-full bg-blue-600 text-white py-2 rounded hover:bg-blue-700 transition">
-                            Add to Cart
-                        </button>
-                    </div>
-                </div>
-            `).join('');
-        }
+    def route_summary(self):
+        """Latency percentiles, tokens and cost of the model calls made through each route"""
+        by_route = {}
+        for record in self.read():
+            for name, stats in record.get("routes", {}).items():
+                totals = by_route.setdefault(name, {"model": stats["model"], "ms": [], "tokens": 0, "cost_usd": 0.0})
+                totals["ms"].extend(stats["ms"])
+                totals["tokens"] += stats["prompt_tokens"] + stats["completion_tokens"]
+                totals["cost_usd"] += stats["cost_usd"]
+        
+        summary = {}
+        for name, totals in by_route.items():
+            calls = len(totals["ms"])
+            summary[name] = {
+                "model": totals["model"],
+                "calls": calls,
+                "p50_ms": percentile(totals["ms"], 0.50),
+                "p95_ms": percentile(totals["ms"], 0.95),
+                "avg_tokens": totals["tokens"] / calls,
+                "cost_usd": totals["cost_usd"],
+            }
+        return summary
+
+
+# Shared metrics sink, reused across builder instances
+metrics_sink = MetricsSink()
+
+
+@contextmanager
+def metrics_call(builder, operation):
+    """Record wall time, phase timings and token usage of one builder operation to its metrics sink
+    
+    Nested operations (modify_website -> generate_website) are folded into the outer one.
+    """
+    if builder.current_call is not None or builder.metrics is None:
+        yield
+        return
+    
+    builder.current_call = {
+        "operation": operation,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "phases": {},
+    }
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        builder.current_call["error"] = str(e)
+        raise
+    finally:
+        record = builder.current_call
+        builder.current_call = None
+        record["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        builder.metrics.write(record)
+
+
+def instrumented(operation):
+    """Decorator running a builder method inside metrics_call(operation)"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with metrics_call(self, operation):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TransientBackendError(Exception):
+    """A failed request worth retrying (rate limit, timeout, connection or server error)"""
+
+    def __init__(self, message, retry_after=None, rate_limited=False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.rate_limited = rate_limited
+
+
+def parse_retry_after(headers):
+    """Seconds to wait from Retry-After / retry-after-ms response headers, or None"""
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def transient_error(error, limiter=None):
+    """TransientBackendError for an OpenAI SDK exception worth retrying, or None
+    
+    Rate-limit responses also update limiter from their headers.
+    """
+    import openai
+    
+    if isinstance(error, openai.RateLimitError):
+        if limiter:
+            limiter.observe(error.response.headers)
+        return TransientBackendError("rate limited", parse_retry_after(error.response.headers), rate_limited=True)
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code >= 500 or error.status_code in (408, 409):
+            return TransientBackendError(f"HTTP {error.status_code}", parse_retry_after(error.response.headers))
+        return None
+    if isinstance(error, openai.APIConnectionError):
+        return TransientBackendError(type(error).__name__)
+    return None
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, shared by every call to one backend
+    
+    acquire() waits until both buckets hold enough for a request. Waiters are served by
+    lane (RATE_LIMIT_LANES order), then by start-time fair queuing across sessions, so one
+    busy session cannot starve the others. Limits follow the x-ratelimit-* response headers
+    once they are seen; while no limit is known acquire() returns at once.
+    """
+
+    KINDS = ("requests", "tokens")
+
+    def __init__(self, rpm=RATE_LIMIT_RPM, tpm=RATE_LIMIT_TPM, headroom=RATE_LIMIT_HEADROOM):
+        self.headroom = headroom
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self.levels = {kind: limit * headroom for kind, limit in self.limits.items()}
+        self.unmetered = {kind: 0 for kind in self.limits}  # taken while the limit was still unknown
+        self.completions = deque(maxlen=20)  # recent completion sizes, for estimating new requests
+        self.waits = 0
+        self.wait_time = 0.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (lane, start tag, sequence)
+        self._sequence = 0
+        self._virtual_time = 0.0
+        self._finish_tags = {}  # session -> finish tag of its latest request
+
+    def estimate(self, request):
+        """Tokens a request counts against the limit: its messages plus the expected completion"""
+        completion = request.get("max_tokens") or (
+            sum(self.completions) / len(self.completions) if self.completions else RATE_LIMIT_COMPLETION_TOKENS
+        )
+        return estimate_tokens(json.dumps(request.get("messages", []))) + int(completion)
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        for kind, limit in self.limits.items():
+            if limit:
+                capacity = limit * self.headroom
+                self.levels[kind] = min(capacity, self.levels[kind] + capacity / 60 * elapsed)
+
+    def _delay(self, tokens):
+        """Seconds until a request of `tokens` fits both buckets (0 when it fits now)"""
+        now = time.monotonic()
+        self._refill(now)
+        delay = max(self._blocked_until - now, 0.0)
+        for kind, need in (("requests", 1), ("tokens", tokens)):
+            limit = self.limits[kind]
+            if not limit:
+                continue
+            # A request larger than the whole bucket goes through once the bucket is full
+            need = min(need, limit * self.headroom)
+            if self.levels[kind] < need:
+                delay = max(delay, (need - self.levels[kind]) / (limit * self.headroom / 60))
+        return delay
+
+    def acquire(self, tokens, lane="interactive", session=None):
+        """Wait for room for one request of about `tokens` tokens, then take it from the buckets"""
+        with self._cond:
+            start_tag = max(self._virtual_time, self._finish_tags.get(session, 0.0))
+            self._finish_tags[session] = start_tag + tokens
+            entry = (RATE_LIMIT_LANES.index(lane), start_tag, self._sequence)
+            self._sequence += 1
+            heapq.heappush(self._queue, entry)
+            began = time.monotonic()
+            waited = False
+            try:
+                while True:
+                    # Only the head of the queue may take from the buckets; the rest wait their turn
+                    delay = self._delay(tokens) if self._queue[0] == entry else None
+                    if delay == 0:
+                        break
+                    waited = True
+                    self._cond.wait(delay)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                if not self._queue:
+                    self._finish_tags.clear()  # fairness only matters while there is a backlog
+                self._cond.notify_all()
+            
+            self._virtual_time = start_tag
+            for kind, amount in (("requests", 1), ("tokens", tokens)):
+                if self.limits[kind]:
+                    self.levels[kind] -= amount
+                else:
+                    self.unmetered[kind] += amount
+            if waited:
+                self.waits += 1
+                self.wait_time += time.monotonic() - began
+
+    def settle(self, estimated, usage):
+        """Correct the token bucket once a request's real usage is known"""
+        with self._cond:
+            self.completions.append(usage.completion_tokens)
+            self._credit(estimated - usage.prompt_tokens - usage.completion_tokens)
+            self._cond.notify_all()
+
+    def refund(self, estimated):
+        """Give back the tokens taken for a request that failed, e.g. with a 429"""
+        with self._cond:
+            self._credit(estimated)
+            self._cond.notify_all()
+
+    def _credit(self, tokens):
+        if self.limits["tokens"]:
+            self.levels["tokens"] += tokens
+        else:
+            self.unmetered["tokens"] -= tokens
+
+    def observe(self, headers):
+        """Adopt the limits and remaining budget reported in x-ratelimit-* response headers"""
+        with self._cond:
+            self._refill(time.monotonic())
+            for kind in self.KINDS:
+                try:
+                    limit = int(headers.get(f"x-ratelimit-limit-{kind}") or 0)
+                    remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                    remaining = None if remaining is None else int(remaining)
+                except (TypeError, ValueError):
+                    continue
+                if limit:
+                    if not self.limits[kind]:
+                        # Requests already sent count against the newly learned limit
+                        self.levels[kind] = limit * self.headroom - self.unmetered[kind]
+                        self.unmetered[kind] = 0
+                    self.limits[kind] = limit
+                if remaining is not None and self.limits[kind]:
+                    # Keep the same headroom below what the server has left
+                    reserve = self.limits[kind] * (1 - self.headroom)
+                    self.levels[kind] = min(self.levels[kind], remaining - reserve)
+            self._cond.notify_all()
+
+    def block(self, seconds):
+        """Hold every request for `seconds`, e.g. after the server answered 429"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "limits": dict(self.limits),
+                "waits": self.waits,
+                "wait_s": self.wait_time,
+                "queued": len(self._queue),
+            }
+
+
+class LLMBackend:
+    """Chat completion backend with retries and optional hedged requests
+    
+    Subclasses implement _create_once(request) and raise TransientBackendError for
+    failures that should be retried. Every attempt first waits for room in the rate limiter.
+    """
+
+    def __init__(self, max_retries=MAX_RETRIES, hedge=HEDGE_REQUESTS, limiter=None):
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.limiter = limiter if limiter is not None else RateLimiter() if RATE_LIMIT else None
+        self.latencies = deque(maxlen=50)
+        self.retries = 0
+        self.hedged_requests = 0
+        self._executor = ThreadPoolExecutor(max_workers=POOL_CONNECTIONS)
+
+    def create(self, lane="interactive", session=None, **request):
+        """Create a chat completion; takes the same arguments as chat.completions.create
+        
+        lane and session place the request in the rate limiter's queue.
+        """
+        if self.hedge and not request.get("stream"):
+            return self._hedged(request, lane, session)
+        return self._with_retries(request, lane, session)
+
+    def warm(self):
+        """Open a connection ahead of the first real request"""
+
+    def hedge_after(self):
+        """Seconds to wait before hedging: p95 of recent latencies"""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_AFTER
+        return percentile(self.latencies, 0.95)
+
+    def _with_retries(self, request, lane="interactive", session=None):
+        estimated = self.limiter.estimate(request) if self.limiter else 0
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                self.limiter.acquire(estimated, lane, session)
+            start = time.perf_counter()
+            try:
+                response = self._create_once(request)
+            except Exception as e:
+                if self.limiter:
+                    self.limiter.refund(estimated)  # a failed attempt is not charged for tokens
+                if not isinstance(e, TransientBackendError) or attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                if e.rate_limited and self.limiter:
+                    self.limiter.block(delay)  # hold every session, not just this one
+                else:
+                    time.sleep(delay)
+                continue
+            if request.get("stream"):
+                return self._settled_stream(response, estimated) if self.limiter else response
+            self.latencies.append(time.perf_counter() - start)
+            if self.limiter and getattr(response, "usage", None):
+                self.limiter.settle(estimated, response.usage)
+            return response
+
+    def _settled_stream(self, chunks, estimated):
+        """Pass a stream through, then settle the rate limiter from its final usage chunk"""
+        usage = None
+        try:
+            for chunk in chunks:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                yield chunk
+        finally:
+            if usage is not None:
+                self.limiter.settle(estimated, usage)
+
+    def _retry_delay(self, error, attempt):
+        """Seconds to wait before retrying after a transient error; counts the retry"""
+        delay = error.retry_after
+        if delay is None:
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        self.retries += 1
+        print(f"⏳ Request failed ({error}), retrying in {delay:.1f}s...")
+        return delay
+
+    async def acreate(self, async_client, lane="interactive", session=None, **request):
+        """create() on an AsyncOpenAI client, with the same rate limiting, retries and backoff"""
+        import asyncio
+        
+        estimated = self.limiter.estimate(request) if self.limiter else 0
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                await asyncio.to_thread(self.limiter.acquire, estimated, lane, session)
+            try:
+                raw = await async_client.chat.completions.with_raw_response.create(**request)
+            except Exception as e:
+                if self.limiter:
+                    self.limiter.refund(estimated)
+                error = e if isinstance(e, TransientBackendError) else transient_error(e, self.limiter)
+                if error is None:
+                    raise
+                if attempt == self.max_retries:
+                    raise error from e
+                delay = self._retry_delay(error, attempt)
+                if error.rate_limited and self.limiter:
+                    self.limiter.block(delay)  # hold every session, not just this one
+                else:
+                    await asyncio.sleep(delay)
+                continue
+            response = raw.parse()
+            if asyncio.iscoroutine(response):  # AsyncAPIResponse.parse is a coroutine, LegacyAPIResponse.parse is not
+                response = await response
+            if self.limiter:
+                self.limiter.observe(raw.headers)
+                if getattr(response, "usage", None):
+                    self.limiter.settle(estimated, response.usage)
+            return response
+
+    def _hedged(self, request, lane="interactive", session=None):
+        first = self._executor.submit(self._with_retries, request, lane, session)
+        try:
+            return first.result(timeout=self.hedge_after())
+        except FuturesTimeoutError:
+            pass
+        
+        # The first request is slow: race a second one and take whichever finishes first
+        self.hedged_requests += 1
+        second = self._executor.submit(self._with_retries, request, lane, session)
+        done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        try:
+            return winner.result()
+        except Exception:
+            return (second if winner is first else first).result()
+
+    def _create_once(self, request):
+        raise NotImplementedError
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI API backend sharing one tuned HTTP connection pool"""
+
+    def __init__(self, api_key=None, base_url=None, timeout=REQUEST_TIMEOUT, **kwargs):
+        super().__init__(**kwargs)
+        import httpx
+        from openai import OpenAI, DefaultHttpxClient
+        
+        http_client = DefaultHttpxClient(
+            limits=httpx.Limits(max_connections=POOL_CONNECTIONS, max_keepalive_connections=POOL_CONNECTIONS),
+            timeout=timeout,
+        )
+        # Retries are handled by LLMBackend so they can honor Retry-After and feed hedging
+        self.client = OpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=base_url,
+            max_retries=0,
+            http_client=http_client,
+        )
+
+    def warm(self):
+        try:
+            self.client.models.list()
+        except Exception:
+            pass  # warming is best effort; the real request will report problems
+
+    def _create_once(self, request):
+        import openai
+        
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(**request)
+        except openai.OpenAIError as e:
+            error = transient_error(e, self.limiter)
+            if error is None:
+                raise
+            raise error from e
+        if self.limiter:
+            self.limiter.observe(raw.headers)
+        return raw.parse()
+
+
+class StubBackend(LLMBackend):
+    """Offline backend returning canned completions, for tests and demos without API calls
+    
+    content is a string or a callable(request) -> str. failures are exceptions raised by
+    the first calls, in order, to exercise retry and hedging logic. Completions longer than
+    max_chars are cut off with finish_reason "length", like a model reaching its output limit.
+    """
+
+    def __init__(self, content=None, latency=0.0, failures=(), max_chars=None, **kwargs):
+        super().__init__(**kwargs)
+        self.content = content if content is not None else json.dumps(STUB_SITE)
+        self.latency = latency
+        self.failures = list(failures)
+        self.max_chars = max_chars
+        self.requests = []
+
+    def _create_once(self, request):
+        self.requests.append(request)
+        if self.failures:
+            raise self.failures.pop(0)
+        time.sleep(self.latency)
+        
+        content = self.content(request) if callable(self.content) else self.content
+        finish_reason = "stop"
+        if self.max_chars is not None and len(content) > self.max_chars:
+            content, finish_reason = content[:self.max_chars], "length"
+        usage = SimpleNamespace(
+            prompt_tokens=estimate_tokens(json.dumps(request.get("messages", []))),
+            completion_tokens=estimate_tokens(content),
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+        )
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+        if request.get("stream"):
+            return self._stream(content, usage, finish_reason)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason=finish_reason)],
+            usage=usage,
+        )
+
+    def _stream(self, content, usage, finish_reason="stop"):
+        for start in range(0, len(content), 80):
+            delta = SimpleNamespace(content=content[start:start + 80])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason=finish_reason)], usage=usage)
 
-        function addToCart(productId) {
-            const product = products.find(p => p.id === productId);
-            const existingItem = cart.find(item => item.id === productId);
-            
-            if (existingItem) {
-                existingItem.quantity++;
-            } else {
-                cart.push({...product, quantity: 1});
-            }
-            
-            updateCartCount();
-        }
 
-        function renderCart() {
-            const cartItems = document.getElementById('cart-items');
-            const cartTotal = document.getElementById('cart-total');
-            
-            if (cart.length === 0) {
-                cartItems.innerHTML = '<p class="text-gray-500 text-center py-8">Your cart is empty</p>';
-                cartTotal.textContent = '$0.00';
-                return;
-            }
-            
-            cartItems.innerHTML = cart.map(item => `
-                <div class="flex justify-between items-center mb-4 pb-4 border-b">
-                    <div class="flex items-center gap-4">
-                        <img src="${item.image}" alt="${item.name}" class="w-16 h-16 object-cover rounded">
-                        <div>
-                            <h4 class="font-bold">${item.name}</h4>
-                            <p class="text-gray-600">$${item.price.toFixed(2)}</p>
-                        </div>
-                    </div>
-                    <div class="flex items-center gap-2">
-                        <button onclick="updateQuantity(${item.id}, -1)" class="bg-gray-200 w-8 h-8 rounded">-</button>
-                        <span class="w-8 text-center">${item.quantity}</span>
-                        <button onclick="updateQuantity(${item.id}, 1)" class="bg-gray-200 w-8 h-8 rounded">+</button>
-                        <button onclick="removeFromCart(${item.id})" class="text-red-500 ml-4">🗑️</button>
-                    </div>
-                </div>
-            `).join('');
-            
-            const total = cart.reduce((sum, item) => sum + (item.price * item.quantity), 0);
-            cartTotal.textContent = `$${total.toFixed(2)}`;
-        }
+# Canned site returned by StubBackend
+STUB_SITE = {
+    "project_name": "stub-site",
+    "needs_backend": False,
+    "backend_requirements": "",
+    "files": {
+        "index.html": "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"UTF-8\">\n<title>Stub Site</title>\n"
+                      "<script src=\"https://cdn.tailwindcss.com\"></script>\n</head>\n"
+                      "<body class=\"bg-gray-50\">\n<h1 class=\"text-4xl font-bold\">Stub Site</h1>\n</body>\n</html>\n",
+    },
+    "description": "Stub site generated offline",
+}
 
-        function updateQuantity(productId, change) {
-            const item = cart.find(i => i.id === productId);
-            if (item) {
-                item.quantity += change;
-                if (item.quantity <= 0) {
-                    removeFromCart(productId);
-                } else {
-                    updateCartCount();
-                    renderCart();
-                }
-            }
-        }
+# Shared backend, created on first use so importing this module stays fast
+_backend = None
 
-        function removeFromCart(productId) {
-            cart = cart.filter(item => item.id !== productId);
-            updateCartCount();
-            renderCart();
-        }
 
-        // Modal controls
-        document.getElementById('cart-btn').addEventListener('click', () => {
-            document.getElementById('cart-modal').classList.remove('hidden');
-            renderCart();
-        });
-
-        document.getElementById('close-cart').addEventListener('click', () => {
-            document.getElementById('cart-modal').classList.add('hidden');
-        });
-
-        // Initialize
-        renderProducts();
-        updateCartCount();
-    </script>
-</body>
-</html>
-""",
-
-    "landing": """
-<!-- LANDING PAGE EXAMPLE TEMPLATE -->
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Landing Page</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-</head>
-<body class="bg-white">
-    <!-- Navigation -->
-    <nav class="fixed w-full bg-white shadow-sm z-50">
-        <div class="max-w-7xl mx-auto px-4 py-4 flex justify-between items-center">
-            <h1 class="text-2xl font-bold text-blue-600">BrandName</h1>
-            <div class="hidden md:flex gap-6">
-                <a href="#features" class="text-gray-600 hover:text-blue-600">Features</a>
-                <a href="#pricing" class="text-gray-600 hover:text-blue-600">Pricing</a>
-                <a href="#contact" class="text-gray-600 hover:text-blue-600">Contact</a>
-            </div>
-            <button class="bg-blue-600 text-white px-6 py-2 rounded-lg hover:bg-blue-700">Get Started</button>
-        </div>
-    </nav>
-
-    <!-- Hero Section -->
-    <section class="pt-32 pb-20 px-4">
-        <div class="max-w-7xl mx-auto text-center">
-            <h2 class="text-5xl md:text-6xl font-bold mb-6 bg-gradient-to-r from-blue-600 to-purple-600 bg-clip-text text-transparent">
-                Build Amazing Things
-            </h2>
-            <p class="text-xl text-gray-600 mb-8 max-w-2xl mx-auto">
-                The perfect solution for your business. Fast, reliable, and easy to use.
-            </p>
-            <div class="flex gap-4 justify-center">
-                <button class="bg-blue-600 text-white px-8 py-3 rounded-lg hover:bg-blue-700 text-lg font-semibold">
-                    Start Free Trial
-                </button>
-                <button class="border-2 border-blue-600 text-blue-600 px-8 py-3 rounded-lg hover:bg-blue-50 text-lg font-semibold">
-                    Watch Demo
-                </button>
-            </div>
-        </div>
-    </section>
-
-    <!-- Features Section -->
-    <section id="features" class="py-20 bg-gray-50 px-4">
-        <div class="max-w-7xl mx-auto">
-            <h3 class="text-4xl font-bold text-center mb-16">Amazing Features</h3>
-            <div class="grid grid-cols-1 md:grid-cols-3 gap-8">
-                <div class="bg-white p-8 rounded-xl shadow-md hover:shadow-xl transition">
-                    <div class="text-4xl mb-4">⚡</div>
-                    <h4 class="text-xl font-bold mb-3">Lightning Fast</h4>
-                    <p class="text-gray-600">Experience blazing fast performance that keeps your users engaged.</p>
-                </div>
-                <div class="bg-white p-8 rounded-xl shadow-md hover:shadow-xl transition">
-                    <div class="text-4xl mb-4">🔒</div>
-                    <h4 class="text-xl font-bold mb-3">Secure</h4>
-                    <p class="text-gray-600">Enterprise-grade security to keep your data safe and protected.</p>
-                </div>
-                <div class="bg-white p-8 rounded-xl shadow-md hover:shadow-xl transition">
-                    <div class="text-4xl mb-4">📱</div>
-                    <h4 class="text-xl font-bold mb-3">Responsive</h4>
-                    <p class="text-gray-600">Works perfectly on all devices, from mobile to desktop.</p>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <!-- Pricing Section -->
-    <section id="pricing" class="py-20 px-4">
-        <div class="max-w-7xl mx-auto">
-            <h3 class="text-4xl font-bold text-center mb-16">Simple Pricing</h3>
-            <div class="grid grid-cols-1 md:grid-cols-3 gap-8">
-                <div class="border-2 rounded-xl p-8 hover:border-blue-600 transition">
-                    <h4 class="text-2xl font-bold mb-4">Starter</h4>
-                    <p class="text-4xl font-bold mb-6">$9<span class="text-lg text-gray-600">/mo</span></p>
-                    <ul class="space-y-3 mb-8">
-                        <li class="flex items-center gap-2"><span class="text-green-500">✓</span> Feature 1</li>
-                        <li class="flex items-center gap-2"><span class="text-green-500">✓</span> Feature 2</li>
-                        <li class="flex items-center gap-2"><span class="text-green-500">✓</span> Feature 3</li>
-                    </ul>
-                    <button class="w-full border-2 border-blue-600 text-blue-600 py-3 rounded-lg hover:bg-blue-50">
-                        Choose Plan
-                    </button>
-                </div>
-                <div class="border-2 border-blue-600 rounded-xl p-8 relative transform scale-105">
-                    <div class="absolute top-0 right-0 bg-blue-600 text-white px-4 py-1 rounded-bl-lg rounded-tr-lg text-sm">Popular</div>
-                    <h4 class="text-2xl font-bold mb-4">Pro</h4>
-                    <p class="text-4xl font-bold mb-6">$29<span class="text-lg text-gray-600">/mo</span></p>
-                    <ul class="space-y-3 mb-8">
-                        <li class="flex items-center gap-2"><span class="text-green-500">✓</span> Everything in Starter</li>
-                        <li class="flex items-center gap-2"><span class="text-green-500">✓</span> Feature 4</li>
-                        <li class="flex items-center gap-2"><span class="text-green-500">✓</span> Feature 5</li>
-                    </ul>
-                    <button class="w-full bg-blue-600 text-white py-3 rounded-lg hover:bg-blue-700">
-                        Choose Plan
-                    </button>
-                </div>
-                <div class="border-2 rounded-xl p-8 hover:border-blue-600 transition">
-                    <h4 class="text-2xl font-bold mb-4">Enterprise</h4>
-                    <p class="text-4xl font-bold mb-6">$99<span class="text-lg text-gray-600">/mo</span></p>
-                    <ul class="space-y-3 mb-8">
-                        <li class="flex items-center gap-2"><span class="text-green-500">✓</span> Everything in Pro</li>
-                        <li class="flex items-center gap-2"><span class="text-green-500">✓</span> Feature 6</li>
-                        <li class="flex items-center gap-2"><span class="text-green-500">✓</span> Priority Support</li>
-                    </ul>
-                    <button class="w-full border-2 border-blue-600 text-blue-600 py-3 rounded-lg hover:bg-blue-50">
-                        Choose Plan
-                    </button>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <!-- Contact Section -->
-    <section id="contact" class="py-20 bg-gray-50 px-4">
-        <div class="max-w-3xl mx-auto">
-            <h3 class="text-4xl font-bold text-center mb-8">Get In Touch</h3>
-            <form class="bg-white p-8 rounded-xl shadow-md">
-                <div class="mb-6">
-                    <label class="block text-gray-700 font-bold mb-2">Name</label>
-                    <input type="text" class="w-full border-2 rounded-lg px-4 py-2 focus:border-blue-600 outline-none" required>
-                </div>
-                <div class="mb-6">
-                    <label class="block text-gray-700 font-bold mb-2">Email</label>
-                    <input type="email" class="w-full border-2 rounded-lg px-4 py-2 focus:border-blue-600 outline-none" required>
-                </div>
-                <div class="mb-6">
-                    <label class="block text-gray-700 font-bold mb-2">Message</label>
-                    <textarea class="w-full border-2 rounded-lg px-4 py-2 focus:border-blue-600 outline-none h-32" required></textarea>
-                </div>
-                <button class="w-full bg-blue-600 text-white py-3 rounded-lg hover:bg-blue-700 font-bold">
-                    Send Message
-                </button>
-            </form>
-        </div>
-    </section>
-
-    <!-- Footer -->
-    <footer class="bg-gray-900 text-white py-12 px-4">
-        <div class="max-w-7xl mx-auto text-center">
-            <p>&copy; 2024 BrandName. All rights reserved.</p>
-        </div>
-    </footer>
-</body>
-</html>
-""",
-
-    "portfolio": """
-<!-- PORTFOLIO EXAMPLE TEMPLATE -->
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Portfolio</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-</head>
-<body class="bg-gray-900 text-white">
-    <!-- Hero Section -->
-    <section class="min-h-screen flex items-center justify-center px-4">
-        <div class="text-center">
-            <h1 class="text-6xl md:text-8xl font-bold mb-6 animate-fade-in">John Doe</h1>
-            <p class="text-2xl text-gray-400 mb-8">Creative Developer & Designer</p>
-            <div class="flex gap-6 justify-center">
-                <a href="#work" class="bg-white text-gray-900 px-8 py-3 rounded-full hover:bg-gray-200 transition">View Work</a>
-                <a href="#contact" class="border-2 border-white px-8 py-3 rounded-full hover:bg-white hover:text-gray-900 transition">Contact Me</a>
-            </div>
-        </div>
-    </section>
-
-    <!-- Work Section -->
-    <section id="work" class="py-20 px-4 bg-gray-800">
-        <div class="max-w-7xl mx-auto">
-            <h2 class="text-5xl font-bold mb-16 text-center">Selected Work</h2>
-            <div class="grid grid-cols-1 md:grid-cols-2 gap-8">
-                <div class="group cursor-pointer">
-                    <div class="overflow-hidden rounded-lg">
-                        <img src="https://via.placeholder.com/600x400" alt="Project 1" class="w-full transform group-hover:scale-110 transition duration-500">
-                    </div>
-                    <h3 class="text-2xl font-bold mt-4">Project Name</h3>
-                    <p class="text-gray-400">Web Design • Development</p>
-                </div>
-                <div class="group cursor-pointer">
-                    <div class="overflow-hidden rounded-lg">
-                        <img src="https://via.placeholder.com/600x400" alt="Project 2" class="w-full transform group-hover:scale-110 transition duration-500">
-                    </div>
-                    <h3 class="text-2xl font-bold mt-4">Project Name</h3>
-                    <p class="text-gray-400">Branding • UI/UX</p>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <!-- Skills Section -->
-    <section class="py-20 px-4">
-        <div class="max-w-4xl mx-auto">
-            <h2 class="text-5xl font-bold mb-16 text-center">Skills</h2>
-            <div class="grid grid-cols-2 md:grid-cols-4 gap-6 text-center">
-                <div class="p-6 bg-gray-800 rounded-lg hover:bg-gray-700 transition">
-                    <div class="text-4xl mb-3">💻</div>
-                    <p class="font-bold">Web Development</p>
-                </div>
-                <div class="p-6 bg-gray-800 rounded-lg hover:bg-gray-700 transition">
-                    <div class="text-4xl mb-3">🎨</div>
-                    <p class="font-bold">UI/UX Design</p>
-                </div>
-                <div class="p-6 bg-gray-800 rounded-lg hover:bg-gray-700 transition">
-                    <div class="text-4xl mb-3">📱</div>
-                    <p class="font-bold">Mobile Apps</p>
-                </div>
-                <div class="p-6 bg-gray-800 rounded-lg hover:bg-gray-700 transition">
-                    <div class="text-4xl mb-3">⚡</div>
-                    <p class="font-bold">Performance</p>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <!-- Contact Section -->
-    <section id="contact" class="py-20 px-4 bg-gray-800">
-        <div class="max-w-2xl mx-auto text-center">
-            <h2 class="text-5xl font-bold mb-8">Let's Work Together</h2>
-            <p class="text-xl text-gray-400 mb-8">Have a project in mind? Let's create something amazing together.</p>
-            <a href="mailto:hello@example.com" class="inline-block bg-white text-gray-900 px-12 py-4 rounded-full text-lg font-bold hover:bg-gray-200 transition">
-                Get In Touch
-            </a>
-        </div>
-    </section>
-
-    <footer class="py-8 text-center text-gray-500">
-        <p>&copy; 2024 John Doe. All rights reserved.</p>
-    </footer>
-</body>
-</html>
-""",
-
-    "cake_shop": """
-<!-- CAKE SHOP COMPLETE EXAMPLE TEMPLATE -->
-<!-- INDEX PAGE -->
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Sweet Bites - Cakes</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-</head>
-<body class="bg-pink-50">
-    <!-- Header -->
-    <header class="bg-white shadow-md sticky top-0 z-50">
-        <div class="max-w-7xl mx-auto px-4 py-4">
-            <div class="flex justify-between items-center">
-                <h1 class="text-3xl font-bold text-pink-600">Sweet Bites</h1>
-                <nav class="flex gap-6 items-center">
-                    <a href="index.html" class="text-gray-700 hover:text-pink-600 transition">Home</a>
-                    <a href="cart.html" class="text-gray-700 hover:text-pink-600 transition">
-                        Cart (<span id="cart-count">0</span>)
-                    </a>
-                </nav>
-            </div>
-        </div>
-    </header>
-
-    <!-- Main Content -->
-    <main class="max-w-7xl mx-auto px-4 py-8">
-        <h2 class="text-4xl font-bold mb-8 text-gray-800">Our Cakes</h2>
-        <div id="cakes-grid" class="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-            <!-- Cakes will be loaded here dynamically -->
-        </div>
-    </main>
-
-    <script>
-        // Sample cake data
-        const cakes = [
-            {id: 1, name: "Chocolate Delight", price: 450, image: "https://via.placeholder.com/300x250/8B4513/FFFFFF?text=Chocolate+Cake"},
-            {id: 2, name: "Vanilla Dream", price: 400, image: "https://via.placeholder.com/300x250/FFE4B5/8B4513?text=Vanilla+Cake"},
-            {id: 3, name: "Strawberry Bliss", price: 500, image: "https://via.placeholder.com/300x250/FF69B4/FFFFFF?text=Strawberry+Cake"},
-            {id: 4, name: "Red Velvet", price: 550, image: "https://via.placeholder.com/300x250/DC143C/FFFFFF?text=Red+Velvet"},
-            {id: 5, name: "Black Forest", price: 600, image: "https://via.placeholder.com/300x250/2F1B0C/FFFFFF?text=Black+Forest"},
-            {id: 6, name: "Butterscotch", price: 480, image: "https://via.placeholder.com/300x250/DAA520/FFFFFF?text=Butterscotch"},
-            {id: 7, name: "Pineapple Cake", price: 420, image: "https://via.placeholder.com/300x250/FFD700/8B4513?text=Pineapple"},
-            {id: 8, name: "Fruit Cake", price: 520, image: "https://via.placeholder.com/300x250/FF6347/FFFFFF?text=Fruit+Cake"}
-        ];
-
-        // Cart stored in memory
-        let cart = [];
-
-        // Load cart from memory on page load
-        function loadCart() {
-            // In a real app, this would load from backend/session
-            const savedCart = sessionStorage.getItem('cart');
-            if (savedCart) {
-                cart = JSON.parse(savedCart);
-            }
-            updateCartCount();
-        }
+def get_backend():
+    """Return the shared LLM backend, creating an OpenAIBackend on first call"""
+    global _backend
+    if _backend is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _backend = OpenAIBackend()
+    return _backend
 
-        // Save cart to session (temporary storage for demo)
-        function saveCart() {
-            sessionStorage.setItem('cart', JSON.stringify(cart));
-            updateCartCount();
-        }
 
-        // Update cart count in header
-        function updateCartCount() {
-            const count = cart.reduce((sum, item) => sum + item.qty, 0);
-            document.getElementById('cart-count').textContent = count;
-        }
+def set_backend(backend):
+    """Replace the shared LLM backend, e.g. with a StubBackend"""
+    global _backend
+    _backend = backend
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+class ModelRouter:
+    """Model settings per call from the routes in ROUTES_PATH; the first matching route wins
+    
+    A route matches on "kind" (one of generate, modify, edit, plan, file, or a list of them),
+    "max_files" and "max_output_tokens", each optional, and sets "model", "temperature" and
+    "max_tokens". "prices" gives USD per million input, cached input and output tokens per
+    model, for the cost recorded with each route.
+    """
+
+    def __init__(self, path=ROUTES_PATH):
+        self.path = path
+        self.routes = None  # loaded on first use
+        self.prices = {}
+
+    def _load(self):
+        if self.routes is not None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            config = {}
+        self.prices = config.get("prices", {})
+        self.routes = config.get("routes") or []
+
+    def route(self, kind, output_tokens=0, files=0):
+        """Settings for one call: SimpleNamespace(name, model, temperature, max_tokens)"""
+        self._load()
+        for route in self.routes:
+            kinds = route.get("kind")
+            if kinds is not None and kind not in ([kinds] if isinstance(kinds, str) else kinds):
+                continue
+            if files > route.get("max_files", files) or output_tokens > route.get("max_output_tokens", output_tokens):
+                continue
+            return SimpleNamespace(
+                name=route.get("name", kind),
+                model=route.get("model", MODEL),
+                temperature=route.get("temperature", TEMPERATURE),
+                max_tokens=route.get("max_tokens"),
+            )
+        return SimpleNamespace(name="default", model=MODEL, temperature=TEMPERATURE, max_tokens=None)
+
+    def cost(self, model, usage):
+        """USD cost of one call from its token usage, or None when the model has no price"""
+        self._load()
+        price = self.prices.get(model)
+        if not price:
+            return None
+        cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+        return (
+            (usage.prompt_tokens - cached) * price["input"]
+            + cached * price.get("cached_input", price["input"])
+            + usage.completion_tokens * price["output"]
+        ) / 1e6
+
+
+# Shared model router, reused across builder instances
+model_router = ModelRouter()
+
+
+class HistoryManager:
+    """Keeps the conversation compact: one copy of the current files, summaries for past replies"""
+
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self.turns = []
+        self.saved_tokens = 0
+        self.last_saved_tokens = 0
+
+    def add_user(self, content):
+        self.turns.append({"role": "user", "content": content})
+
+    def add_assistant(self, raw_reply, result=None):
+        """Store a compact summary of an assistant reply instead of the full file contents"""
+        if result is None:
+            summary = "(previous reply could not be parsed)"
+        else:
+            summary = json.dumps({
+                "project_name": result.get("project_name"),
+                "needs_backend": result.get("needs_backend", False),
+                "description": result.get("description", ""),
+                "files": {name: f"<{len(content)} chars>" for name, content in result.get("files", {}).items()},
+            })
+        self.last_saved_tokens = max(estimate_tokens(raw_reply) - estimate_tokens(summary), 0)
+        self.saved_tokens += self.last_saved_tokens
+        self.turns.append({"role": "assistant", "content": summary})
+
+    def build_messages(self, prefix_messages, project_files):
+        """Assemble the request: prefix messages, past turns within budget, current files, latest request"""
+        past, latest = self.turns[:-1], self.turns[-1:]
+        
+        # Drop the oldest turns until the rest fits the token budget
+        used = 0
+        kept = []
+        for turn in reversed(past):
+            used += estimate_tokens(turn["content"])
+            if used > self.token_budget:
+                break
+            kept.append(turn)
+        kept.reverse()
+        
+        messages = list(prefix_messages) + kept
+        if project_files:
+            messages.append({
+                "role": "user",
+                "content": "Current project files (latest version):\n" + json.dumps(project_files)
+            })
+        return messages + latest
+
+
+def keyword_variants(keyword):
+    """Plural and verb forms of a keyword: shop -> shops, shopping, shopper; pastry -> pastries"""
+    forms = {keyword, keyword + ("es" if keyword.endswith(("s", "x", "z", "ch", "sh")) else "s")}
+    if keyword.endswith("y") and keyword[-2] not in "aeiou":
+        forms.add(keyword[:-1] + "ies")
+    stem = keyword[:-1] if keyword.endswith("e") else keyword
+    if re.search(r"(?:^|[^aeiou])[aeiou][bdgmnpt]$", keyword):
+        stem += keyword[-1]  # a short closed syllable doubles: shop -> shopping
+    forms.update(stem + suffix for suffix in ("ing", "ed", "er", "ers"))
+    return forms
+
+
+def build_keyword_index(template_keywords):
+    """Compile template keywords into one word-boundary regex plus a word form -> templates map"""
+    index = {}
+    for key, (_, keywords) in template_keywords.items():
+        for keyword, weight in keywords:
+            for form in keyword_variants(keyword):
+                if (key, weight) not in index.get(form, []):
+                    index.setdefault(form, []).append((key, weight))
+    
+    # Longest forms first so "e-commerce" wins over shorter overlapping words
+    alternatives = "|".join(re.escape(form) for form in sorted(index, key=len, reverse=True))
+    pattern = re.compile(rf"\b({alternatives})\b")
+    return pattern, index
+
+
+TEMPLATE_KEYWORD_PATTERN, TEMPLATE_KEYWORD_INDEX = build_keyword_index(TEMPLATE_KEYWORDS)
+TEMPLATE_PRIORITY = {key: position for position, key in enumerate(TEMPLATE_KEYWORDS)}
+TEMPLATE_NAME_KEYS = {name: key for key, (name, _) in TEMPLATE_KEYWORDS.items()}
+
+
+def rank_templates(prompt):
+    """Templates whose keywords occur in the prompt, best match first"""
+    # Score every template in a single pass over the prompt
+    scores = {}
+    for match in TEMPLATE_KEYWORD_PATTERN.finditer(prompt.lower()):
+        for key, weight in TEMPLATE_KEYWORD_INDEX[match.group(1)]:
+            scores[key] = scores.get(key, 0) + weight
+    
+    # Highest score first; ties keep the declaration order of TEMPLATE_KEYWORDS
+    return sorted(scores, key=lambda key: (-scores[key], TEMPLATE_PRIORITY[key]))
+
+
+def content_hash(content):
+    """SHA-256 of a file's text content"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def load_manifest(manifest_path):
+    """Read a project's {filename: content hash} manifest, empty if missing or unreadable"""
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def snapshot_name(name):
+    """File-safe snapshot name"""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", name).strip(".-") or "session"
+
+
+def project_dir_name(name):
+    """Folder-safe project name: the last path component of name, or a timestamped default"""
+    name = os.path.basename(str(name or "").replace("\\", "/").rstrip("/"))
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "-", name).strip(".-")
+    return name or f"website-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+
+
+def list_snapshots(snapshot_dir=SNAPSHOT_DIR):
+    """Names of the saved session snapshots, most recent first"""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    paths = [
+        os.path.join(snapshot_dir, filename) for filename in os.listdir(snapshot_dir)
+        if filename.endswith(SNAPSHOT_SUFFIX)
+    ]
+    return [os.path.basename(path)[:-len(SNAPSHOT_SUFFIX)] for path in sorted(paths, key=os.path.getmtime, reverse=True)]
+
+
+def contained_path(root, filename):
+    """Path of filename under root, or None when the name would land outside root"""
+    file_path = os.path.normpath(os.path.join(root, filename))
+    if os.path.commonpath([os.path.abspath(file_path), os.path.abspath(root)]) != os.path.abspath(root):
+        return None
+    return file_path
+
+
+def write_file_atomic(file_path, content):
+    """Write text or bytes via a temporary file and rename so a crash never leaves a half-written file"""
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if isinstance(content, bytes):
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Characters after which a "/" in JavaScript starts a regular expression rather than a division
+JS_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+# Keywords a regular expression literal can follow, e.g. "return /x/"
+JS_REGEX_KEYWORD = re.compile(r"\b(?:return|typeof|case|do|else|in|of|new|delete|void|throw|yield|await)\s*$")
+
+HTML_PROTECTED_BLOCK = re.compile(
+    r"(<pre\b.*?</pre>|<textarea\b.*?</textarea>|<script\b[^>]*>.*?</script>|<style\b[^>]*>.*?</style>)",
+    re.DOTALL | re.IGNORECASE,
+)
+HTML_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+
+
+def minify_css(source):
+    """Drop comments and collapse whitespace in a stylesheet"""
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.DOTALL)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,>])\s*", r"\1", source)
+    return source.replace(";}", "}").strip()
+
+
+def _skip_js_string(source, i):
+    """Index just past the string or template literal starting at source[i]"""
+    quote = source[i]
+    i += 1
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == quote:
+            return i + 1
+        if quote == "`" and source.startswith("${", i):
+            # Skip the embedded expression, which may contain strings and templates of its own
+            depth = 1
+            i += 2
+            while i < len(source) and depth:
+                if source[i] in "'\"`":
+                    i = _skip_js_string(source, i)
+                    continue
+                depth += {"{": 1, "}": -1}.get(source[i], 0)
+                i += 1
+            continue
+        i += 1
+    return i
+
+
+def _js_regex_starts(source, i, last):
+    """Whether the "/" at source[i] starts a regular expression, given the last non-whitespace character"""
+    return last == "" or last in JS_REGEX_PRECEDERS or bool(JS_REGEX_KEYWORD.search(source, max(i - 12, 0), i))
+
+
+def _skip_js_regex(source, i):
+    """Index just past the regular expression literal starting at source[i]"""
+    end = i + 1
+    in_class = False
+    while end < len(source) and source[end] != "\n":
+        if source[end] == "\\":
+            end += 2
+            continue
+        if source[end] == "[":
+            in_class = True
+        elif source[end] == "]":
+            in_class = False
+        elif source[end] == "/" and not in_class:
+            break
+        end += 1
+    return end + 1
+
+
+def _append_js_space(out, newline):
+    """Write one separator, merging it with a separator already written"""
+    if not out:
+        return
+    if out[-1] in (" ", "\n"):
+        if newline:
+            out[-1] = "\n"
+    else:
+        out.append("\n" if newline else " ")
+
+
+def minify_js(source):
+    """Strip comments and indentation from JavaScript
+    
+    Strings, template literals and regular expressions are copied untouched and
+    line breaks are kept, so automatic semicolon insertion behaves the same.
+    """
+    out = []
+    last = ""  # last non-whitespace character written
+    i, length = 0, len(source)
+    while i < length:
+        char = source[i]
+        if char in "'\"`":
+            end = _skip_js_string(source, i)
+            out.append(source[i:end])
+            last = char
+            i = end
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = length if end == -1 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            # A comment separates tokens like whitespace; keep a line break where it had one
+            _append_js_space(out, "\n" in source[i:end])
+            i = end
+        elif char == "/" and _js_regex_starts(source, i, last):
+            end = _skip_js_regex(source, i)
+            out.append(source[i:end])
+            last = "/"
+            i = end
+        elif char.isspace():
+            end = i
+            while end < length and source[end].isspace():
+                end += 1
+            _append_js_space(out, "\n" in source[i:end])
+            i = end
+        else:
+            out.append(char)
+            last = char
+            i += 1
+    return "".join(out).strip()
+
+
+def minify_html(source):
+    """Drop comments and collapse whitespace in HTML, minifying inline scripts and styles"""
+    parts = HTML_PROTECTED_BLOCK.split(source)
+    for index, part in enumerate(parts):
+        if index % 2 == 0:
+            part = HTML_COMMENT.sub("", part)
+            parts[index] = re.sub(r"\s+", " ", part)
+            continue
+        
+        open_end = part.index(">") + 1
+        close_start = part.rindex("</")
+        opening, body, closing = part[:open_end], part[open_end:close_start], part[close_start:]
+        tag = opening[1:].split(None, 1)[0].rstrip(">").lower()
+        if tag == "style":
+            body = minify_css(body)
+        elif tag == "script" and not re.search(r"type=[\"'](?!text/javascript|module)", opening, re.IGNORECASE):
+            body = minify_js(body)
+        parts[index] = opening + body + closing
+    return "".join(parts).strip()
+
+
+ASSET_MINIFIERS = {
+    ".html": minify_html,
+    ".htm": minify_html,
+    ".css": minify_css,
+    ".js": minify_js,
+}
+
+
+def optimize_assets(files):
+    """Minify HTML, CSS and JS files; returns (optimized_files, [(filename, bytes_before, bytes_after)])"""
+    optimized = {}
+    report = []
+    for filename, content in files.items():
+        minifier = ASSET_MINIFIERS.get(os.path.splitext(filename)[1].lower())
+        optimized[filename] = minifier(content) if minifier else content
+        if minifier:
+            report.append((filename, len(content.encode("utf-8")), len(optimized[filename].encode("utf-8"))))
+    return optimized, report
+
+
+# Offline Tailwind utility table: the default palette (shades 50-950) and scales, used to
+# build a static stylesheet for the classes a site actually uses instead of the Play CDN
+TAILWIND_CDN_SCRIPT = re.compile(r"<script\s+src=[\"']https://cdn\.tailwindcss\.com[^\"']*[\"']\s*>\s*</script>", re.IGNORECASE)
+TAILWIND_SHADES = ("50", "100", "200", "300", "400", "500", "600", "700", "800", "900", "950")
+TAILWIND_PALETTE = {
+    "slate": "f8fafc f1f5f9 e2e8f0 cbd5e1 94a3b8 64748b 475569 334155 1e293b 0f172a 020617",
+    "gray": "f9fafb f3f4f6 e5e7eb d1d5db 9ca3af 6b7280 4b5563 374151 1f2937 111827 030712",
+    "zinc": "fafafa f4f4f5 e4e4e7 d4d4d8 a1a1aa 71717a 52525b 3f3f46 27272a 18181b 09090b",
+    "neutral": "fafafa f5f5f5 e5e5e5 d4d4d4 a3a3a3 737373 525252 404040 262626 171717 0a0a0a",
+    "stone": "fafaf9 f5f5f4 e7e5e4 d6d3d1 a8a29e 78716c 57534e 44403c 292524 1c1917 0c0a09",
+    "red": "fef2f2 fee2e2 fecaca fca5a5 f87171 ef4444 dc2626 b91c1c 991b1b 7f1d1d 450a0a",
+    "orange": "fff7ed ffedd5 fed7aa fdba74 fb923c f97316 ea580c c2410c 9a3412 7c2d12 431407",
+    "amber": "fffbeb fef3c7 fde68a fcd34d fbbf24 f59e0b d97706 b45309 92400e 78350f 451a03",
+    "yellow": "fefce8 fef9c3 fef08a fde047 facc15 eab308 ca8a04 a16207 854d0e 713f12 422006",
+    "lime": "f7fee7 ecfccb d9f99d bef264 a3e635 84cc16 65a30d 4d7c0f 3f6212 365314 1a2e05",
+    "green": "f0fdf4 dcfce7 bbf7d0 86efac 4ade80 22c55e 16a34a 15803d 166534 14532d 052e16",
+    "emerald": "ecfdf5 d1fae5 a7f3d0 6ee7b7 34d399 10b981 059669 047857 065f46 064e3b 022c22",
+    "teal": "f0fdfa ccfbf1 99f6e4 5eead4 2dd4bf 14b8a6 0d9488 0f766e 115e59 134e4a 042f2e",
+    "cyan": "ecfeff cffafe a5f3fc 67e8f9 22d3ee 06b6d4 0891b2 0e7490 155e75 164e63 083344",
+    "sky": "f0f9ff e0f2fe bae6fd 7dd3fc 38bdf8 0ea5e9 0284c7 0369a1 075985 0c4a6e 082f49",
+    "blue": "eff6ff dbeafe bfdbfe 93c5fd 60a5fa 3b82f6 2563eb 1d4ed8 1e40af 1e3a8a 172554",
+    "indigo": "eef2ff e0e7ff c7d2fe a5b4fc 818cf8 6366f1 4f46e5 4338ca 3730a3 312e81 1e1b4b",
+    "violet": "f5f3ff ede9fe ddd6fe c4b5fd a78bfa 8b5cf6 7c3aed 6d28d9 5b21b6 4c1d95 2e1065",
+    "purple": "faf5ff f3e8ff e9d5ff d8b4fe c084fc a855f7 9333ea 7e22ce 6b21a8 581c87 3b0764",
+    "fuchsia": "fdf4ff fae8ff f5d0fe f0abfc e879f9 d946ef c026d3 a21caf 86198f 701a75 4a044e",
+    "pink": "fdf2f8 fce7f3 fbcfe8 f9a8d4 f472b6 ec4899 db2777 be185d 9d174d 831843 500724",
+    "rose": "fff1f2 ffe4e6 fecdd3 fda4af fb7185 f43f5e e11d48 be123c 9f1239 881337 4c0519",
+}
+TAILWIND_SCREENS = {"sm": "640px", "md": "768px", "lg": "1024px", "xl": "1280px", "2xl": "1536px"}
+TAILWIND_PSEUDO_VARIANTS = {
+    "hover": ":hover", "focus": ":focus", "active": ":active", "disabled": ":disabled",
+    "focus-within": ":focus-within", "focus-visible": ":focus-visible", "visited": ":visited",
+    "first": ":first-child", "last": ":last-child", "odd": ":nth-child(odd)", "even": ":nth-child(even)",
+    "placeholder": "::placeholder",
+}
+TAILWIND_FONT_SIZES = {
+    "xs": ("0.75rem", "1rem"), "sm": ("0.875rem", "1.25rem"), "base": ("1rem", "1.5rem"),
+    "lg": ("1.125rem", "1.75rem"), "xl": ("1.25rem", "1.75rem"), "2xl": ("1.5rem", "2rem"),
+    "3xl": ("1.875rem", "2.25rem"), "4xl": ("2.25rem", "2.5rem"), "5xl": ("3rem", "1"),
+    "6xl": ("3.75rem", "1"), "7xl": ("4.5rem", "1"), "8xl": ("6rem", "1"), "9xl": ("8rem", "1"),
+}
+TAILWIND_MAX_WIDTHS = {
+    "xs": "20rem", "sm": "24rem", "md": "28rem", "lg": "32rem", "xl": "36rem", "2xl": "42rem",
+    "3xl": "48rem", "4xl": "56rem", "5xl": "64rem", "6xl": "72rem", "7xl": "80rem", "prose": "65ch",
+    "none": "none", "full": "100%", "screen-sm": "640px", "screen-md": "768px", "screen-lg": "1024px",
+    "screen-xl": "1280px", "screen-2xl": "1536px",
+}
+TAILWIND_RADII = {
+    "none": "0px", "sm": "0.125rem", "": "0.25rem", "md": "0.375rem", "lg": "0.5rem",
+    "xl": "0.75rem", "2xl": "1rem", "3xl": "1.5rem", "full": "9999px",
+}
+TAILWIND_SHADOWS = {
+    "sm": "0 1px 2px 0 rgb(0 0 0 / 0.05)",
+    "": "0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)",
+    "md": "0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)",
+    "lg": "0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)",
+    "xl": "0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)",
+    "2xl": "0 25px 50px -12px rgb(0 0 0 / 0.25)",
+    "inner": "inset 0 2px 4px 0 rgb(0 0 0 / 0.05)",
+    "none": "0 0 #0000",
+}
+TAILWIND_TRANSFORM = (
+    "transform:translate(var(--tw-translate-x),var(--tw-translate-y)) rotate(var(--tw-rotate)) "
+    "scale(var(--tw-scale-x),var(--tw-scale-y))"
+)
+TAILWIND_TRANSITION = "transition-timing-function:cubic-bezier(0.4,0,0.2,1);transition-duration:150ms"
+TAILWIND_STATIC = {
+    "block": "display:block", "inline-block": "display:inline-block", "inline": "display:inline",
+    "flex": "display:flex", "inline-flex": "display:inline-flex", "grid": "display:grid",
+    "inline-grid": "display:inline-grid", "table": "display:table", "contents": "display:contents",
+    "hidden": "display:none",
+    "static": "position:static", "relative": "position:relative", "absolute": "position:absolute",
+    "fixed": "position:fixed", "sticky": "position:sticky",
+    "flex-row": "flex-direction:row", "flex-row-reverse": "flex-direction:row-reverse",
+    "flex-col": "flex-direction:column", "flex-col-reverse": "flex-direction:column-reverse",
+    "flex-wrap": "flex-wrap:wrap", "flex-nowrap": "flex-wrap:nowrap",
+    "flex-1": "flex:1 1 0%", "flex-auto": "flex:1 1 auto", "flex-initial": "flex:0 1 auto", "flex-none": "flex:none",
+    "grow": "flex-grow:1", "flex-grow": "flex-grow:1", "grow-0": "flex-grow:0",
+    "shrink": "flex-shrink:1", "flex-shrink": "flex-shrink:1", "shrink-0": "flex-shrink:0", "flex-shrink-0": "flex-shrink:0",
+    "items-start": "align-items:flex-start", "items-end": "align-items:flex-end", "items-center": "align-items:center",
+    "items-baseline": "align-items:baseline", "items-stretch": "align-items:stretch",
+    "justify-start": "justify-content:flex-start", "justify-end": "justify-content:flex-end",
+    "justify-center": "justify-content:center", "justify-between": "justify-content:space-between",
+    "justify-around": "justify-content:space-around", "justify-evenly": "justify-content:space-evenly",
+    "content-center": "align-content:center", "content-between": "align-content:space-between",
+    "self-auto": "align-self:auto", "self-start": "align-self:flex-start", "self-end": "align-self:flex-end",
+    "self-center": "align-self:center", "self-stretch": "align-self:stretch",
+    "place-items-center": "place-items:center", "place-content-center": "place-content:center",
+    "text-left": "text-align:left", "text-center": "text-align:center", "text-right": "text-align:right",
+    "text-justify": "text-align:justify",
+    "font-thin": "font-weight:100", "font-extralight": "font-weight:200", "font-light": "font-weight:300",
+    "font-normal": "font-weight:400", "font-medium": "font-weight:500", "font-semibold": "font-weight:600",
+    "font-bold": "font-weight:700", "font-extrabold": "font-weight:800", "font-black": "font-weight:900",
+    "font-sans": "font-family:ui-sans-serif,system-ui,sans-serif,\"Apple Color Emoji\",\"Segoe UI Emoji\"",
+    "font-serif": "font-family:ui-serif,Georgia,Cambria,\"Times New Roman\",Times,serif",
+    "font-mono": "font-family:ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,monospace",
+    "italic": "font-style:italic", "not-italic": "font-style:normal",
+    "uppercase": "text-transform:uppercase", "lowercase": "text-transform:lowercase",
+    "capitalize": "text-transform:capitalize", "normal-case": "text-transform:none",
+    "underline": "text-decoration-line:underline", "line-through": "text-decoration-line:line-through",
+    "no-underline": "text-decoration-line:none",
+    "antialiased": "-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale",
+    "truncate": "overflow:hidden;text-overflow:ellipsis;white-space:nowrap",
+    "whitespace-nowrap": "white-space:nowrap", "whitespace-normal": "white-space:normal",
+    "whitespace-pre-line": "white-space:pre-line", "break-words": "overflow-wrap:break-word",
+    "leading-none": "line-height:1", "leading-tight": "line-height:1.25", "leading-snug": "line-height:1.375",
+    "leading-normal": "line-height:1.5", "leading-relaxed": "line-height:1.625", "leading-loose": "line-height:2",
+    "tracking-tighter": "letter-spacing:-0.05em", "tracking-tight": "letter-spacing:-0.025em",
+    "tracking-normal": "letter-spacing:0em", "tracking-wide": "letter-spacing:0.025em",
+    "tracking-wider": "letter-spacing:0.05em", "tracking-widest": "letter-spacing:0.1em",
+    "overflow-auto": "overflow:auto", "overflow-hidden": "overflow:hidden", "overflow-visible": "overflow:visible",
+    "overflow-scroll": "overflow:scroll", "overflow-x-auto": "overflow-x:auto", "overflow-y-auto": "overflow-y:auto",
+    "overflow-x-hidden": "overflow-x:hidden", "overflow-y-hidden": "overflow-y:hidden",
+    "cursor-pointer": "cursor:pointer", "cursor-default": "cursor:default", "cursor-not-allowed": "cursor:not-allowed",
+    "pointer-events-none": "pointer-events:none", "pointer-events-auto": "pointer-events:auto",
+    "select-none": "user-select:none", "resize-none": "resize:none", "appearance-none": "appearance:none",
+    "outline-none": "outline:2px solid transparent;outline-offset:2px",
+    "object-cover": "object-fit:cover", "object-contain": "object-fit:contain", "object-center": "object-position:center",
+    "bg-cover": "background-size:cover", "bg-contain": "background-size:contain", "bg-center": "background-position:center",
+    "bg-no-repeat": "background-repeat:no-repeat", "bg-fixed": "background-attachment:fixed",
+    "bg-clip-text": "-webkit-background-clip:text;background-clip:text",
+    "list-none": "list-style-type:none", "list-disc": "list-style-type:disc", "list-decimal": "list-style-type:decimal",
+    "list-inside": "list-style-position:inside",
+    "border-solid": "border-style:solid", "border-dashed": "border-style:dashed", "border-none": "border-style:none",
+    "border-collapse": "border-collapse:collapse",
+    "transition": "transition-property:color,background-color,border-color,text-decoration-color,fill,stroke,"
+                  "opacity,box-shadow,transform,filter,backdrop-filter;" + TAILWIND_TRANSITION,
+    "transition-all": "transition-property:all;" + TAILWIND_TRANSITION,
+    "transition-colors": "transition-property:color,background-color,border-color,text-decoration-color,fill,stroke;"
+                         + TAILWIND_TRANSITION,
+    "transition-opacity": "transition-property:opacity;" + TAILWIND_TRANSITION,
+    "transition-shadow": "transition-property:box-shadow;" + TAILWIND_TRANSITION,
+    "transition-transform": "transition-property:transform;" + TAILWIND_TRANSITION,
+    "transition-none": "transition-property:none",
+    "ease-linear": "transition-timing-function:linear", "ease-in": "transition-timing-function:cubic-bezier(0.4,0,1,1)",
+    "ease-out": "transition-timing-function:cubic-bezier(0,0,0.2,1)",
+    "ease-in-out": "transition-timing-function:cubic-bezier(0.4,0,0.2,1)",
+    "transform": TAILWIND_TRANSFORM, "transform-none": "transform:none",
+    "scroll-smooth": "scroll-behavior:smooth",
+    "sr-only": "position:absolute;width:1px;height:1px;padding:0;margin:-1px;overflow:hidden;"
+               "clip:rect(0,0,0,0);white-space:nowrap;border-width:0",
+    "container": "width:100%",  # plus a max-width per breakpoint, added by build_tailwind_css
+    "line-clamp-none": "overflow:visible;display:block;-webkit-box-orient:horizontal;-webkit-line-clamp:none",
+    "fill-current": "fill:currentColor", "stroke-current": "stroke:currentColor",
+    "aspect-square": "aspect-ratio:1 / 1", "aspect-video": "aspect-ratio:16 / 9",
+    "backdrop-blur": "backdrop-filter:blur(8px)", "backdrop-blur-sm": "backdrop-filter:blur(4px)",
+    "backdrop-blur-md": "backdrop-filter:blur(12px)", "backdrop-blur-lg": "backdrop-filter:blur(16px)",
+    "animate-spin": "animation:tw-spin 1s linear infinite",
+    "animate-ping": "animation:tw-ping 1s cubic-bezier(0,0,0.2,1) infinite",
+    "animate-pulse": "animation:tw-pulse 2s cubic-bezier(0.4,0,0.6,1) infinite",
+    "animate-bounce": "animation:tw-bounce 1s infinite",
+}
+TAILWIND_KEYFRAMES = (
+    "@keyframes tw-spin{to{transform:rotate(360deg)}}"
+    "@keyframes tw-ping{75%,100%{transform:scale(2);opacity:0}}"
+    "@keyframes tw-pulse{50%{opacity:.5}}"
+    "@keyframes tw-bounce{0%,100%{transform:translateY(-25%);animation-timing-function:cubic-bezier(0.8,0,1,1)}"
+    "50%{transform:none;animation-timing-function:cubic-bezier(0,0,0.2,1)}}"
+)
+# Compact version of Tailwind's preflight reset plus the variable defaults utilities rely on
+TAILWIND_PREFLIGHT = (
+    "*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb;"
+    "--tw-translate-x:0;--tw-translate-y:0;--tw-rotate:0;--tw-scale-x:1;--tw-scale-y:1;"
+    "--tw-ring-color:rgb(59 130 246 / 0.5);--tw-ring-offset-width:0px;--tw-ring-offset-color:#fff}"
+    "html{line-height:1.5;-webkit-text-size-adjust:100%;tab-size:4;"
+    "font-family:ui-sans-serif,system-ui,sans-serif,\"Apple Color Emoji\",\"Segoe UI Emoji\"}"
+    "body{margin:0;line-height:inherit}"
+    "hr{height:0;color:inherit;border-top-width:1px}"
+    "h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}"
+    "a{color:inherit;text-decoration:inherit}"
+    "b,strong{font-weight:bolder}"
+    "table{text-indent:0;border-color:inherit;border-collapse:collapse}"
+    "button,input,optgroup,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;"
+    "line-height:inherit;color:inherit;margin:0;padding:0}"
+    "button,select{text-transform:none}"
+    "button,[type='button'],[type='reset'],[type='submit']{-webkit-appearance:button;"
+    "background-color:transparent;background-image:none}"
+    "blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}"
+    "fieldset{margin:0;padding:0}"
+    "ol,ul,menu{list-style:none;margin:0;padding:0}"
+    "textarea{resize:vertical}"
+    "input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}"
+    "button,[role=\"button\"]{cursor:pointer}"
+    ":disabled{cursor:default}"
+    "img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}"
+    "img,video{max-width:100%;height:auto}"
+    "[hidden]{display:none}"
+)
+# Utility prefix -> CSS properties taking a spacing/size value
+TAILWIND_SPACING_PROPERTIES = {
+    "p": ("padding",), "px": ("padding-left", "padding-right"), "py": ("padding-top", "padding-bottom"),
+    "pt": ("padding-top",), "pr": ("padding-right",), "pb": ("padding-bottom",), "pl": ("padding-left",),
+    "m": ("margin",), "mx": ("margin-left", "margin-right"), "my": ("margin-top", "margin-bottom"),
+    "mt": ("margin-top",), "mr": ("margin-right",), "mb": ("margin-bottom",), "ml": ("margin-left",),
+    "gap": ("gap",), "gap-x": ("column-gap",), "gap-y": ("row-gap",),
+    "inset": ("inset",), "inset-x": ("left", "right"), "inset-y": ("top", "bottom"),
+    "top": ("top",), "right": ("right",), "bottom": ("bottom",), "left": ("left",),
+    "w": ("width",), "h": ("height",), "min-w": ("min-width",), "min-h": ("min-height",),
+    "max-h": ("max-height",), "size": ("width", "height"),
+}
+TAILWIND_BORDER_SIDES = {
+    "": ("border-width",), "x": ("border-left-width", "border-right-width"),
+    "y": ("border-top-width", "border-bottom-width"), "t": ("border-top-width",),
+    "r": ("border-right-width",), "b": ("border-bottom-width",), "l": ("border-left-width",),
+}
+TAILWIND_RADIUS_SIDES = {
+    "": ("border-radius",), "t": ("border-top-left-radius", "border-top-right-radius"),
+    "r": ("border-top-right-radius", "border-bottom-right-radius"),
+    "b": ("border-bottom-right-radius", "border-bottom-left-radius"),
+    "l": ("border-top-left-radius", "border-bottom-left-radius"),
+    "tl": ("border-top-left-radius",), "tr": ("border-top-right-radius",),
+    "br": ("border-bottom-right-radius",), "bl": ("border-bottom-left-radius",),
+}
+TAILWIND_GRADIENT_DIRECTIONS = {
+    "t": "to top", "tr": "to top right", "r": "to right", "br": "to bottom right",
+    "b": "to bottom", "bl": "to bottom left", "l": "to left", "tl": "to top left",
+}
+TAILWIND_CANDIDATE = re.compile(r"[^<>\"'`\s]*[^<>\"'`\s:]")
+
+
+TAILWIND_ARBITRARY_COLOR = re.compile(r"\[(#[0-9a-fA-F]{3,8}|(?:rgba?|hsla?)\([^\]]*\))\]")
+
+
+def tailwind_color(name):
+    """(r, g, b) or a CSS color string for a Tailwind color name like "pink-600" or "[#ff5a5f]", else None"""
+    arbitrary = TAILWIND_ARBITRARY_COLOR.fullmatch(name)
+    if arbitrary:
+        value = arbitrary.group(1)
+        if len(value) in (4, 7):  # #rgb or #rrggbb, so opacity modifiers and gradient ends work
+            digits = value[1:] if len(value) == 7 else "".join(digit * 2 for digit in value[1:])
+            return tuple(int(digits[i:i + 2], 16) for i in (0, 2, 4))
+        return value.replace("_", " ")
+    if name in ("transparent", "current", "inherit"):
+        return {"transparent": "transparent", "current": "currentColor", "inherit": "inherit"}[name]
+    if name == "white":
+        return (255, 255, 255)
+    if name == "black":
+        return (0, 0, 0)
+    family, _, shade = name.rpartition("-")
+    if family not in TAILWIND_PALETTE or shade not in TAILWIND_SHADES:
+        return None
+    value = TAILWIND_PALETTE[family].split()[TAILWIND_SHADES.index(shade)]
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _tailwind_color_value(color, opacity):
+    if isinstance(color, str):
+        return color
+    return f"rgb({color[0]} {color[1]} {color[2]} / {opacity})"
+
+
+def _tailwind_size(value, negative=False, allow_fractions=True):
+    """CSS length for a spacing/size key ("4", "1/2", "px", "full", "[80vh]"), else None"""
+    if value.startswith("[") and value.endswith("]"):
+        result = value[1:-1].replace("_", " ")
+    elif re.fullmatch(r"\d+(\.5)?", value):
+        result = "0px" if float(value) == 0 else f"{float(value) * 0.25:g}rem"
+    elif value == "px":
+        result = "1px"
+    elif allow_fractions and re.fullmatch(r"\d+/\d+", value):
+        numerator, denominator = value.split("/")
+        result = f"{int(numerator) / int(denominator) * 100:g}%"
+    else:
+        result = {"auto": "auto", "full": "100%", "screen": "100vh", "min": "min-content",
+                  "max": "max-content", "fit": "fit-content"}.get(value)
+    if result is None:
+        return None
+    return f"-{result}" if negative and result not in ("auto", "0px") else result
+
+
+def tailwind_declarations(utility):
+    """CSS declarations for a Tailwind utility without variants, or None if it is unknown
+
+    Returns (declarations, child_selector); child_selector is used by space-*/divide-*.
+    """
+    if utility in TAILWIND_STATIC:
+        return TAILWIND_STATIC[utility], ""
+    negative = utility.startswith("-")
+    base = utility[1:] if negative else utility
+
+    # Sizes and spacing
+    for prefix in sorted(TAILWIND_SPACING_PROPERTIES, key=len, reverse=True):
+        if base.startswith(prefix + "-"):
+            raw = base[len(prefix) + 1:]
+            if prefix in ("w", "min-w") and raw == "screen":
+                raw = "[100vw]"
+            size = _tailwind_size(raw, negative)
+            if size is not None:
+                return ";".join(f"{prop}:{size}" for prop in TAILWIND_SPACING_PROPERTIES[prefix]), ""
+    if base.startswith("max-w-"):
+        value = base[6:]
+        size = TAILWIND_MAX_WIDTHS.get(value) or (value.startswith("[") and _tailwind_size(value))
+        return (f"max-width:{size}", "") if size else None
+    for axis, margin in (("x", "margin-left"), ("y", "margin-top")):
+        if base.startswith(f"space-{axis}-"):
+            size = _tailwind_size(base[8:], negative, allow_fractions=False)
+            return (f"{margin}:{size}", " > :not([hidden]) ~ :not([hidden])") if size else None
+
+    # Typography
+    if base.startswith("text-"):
+        value = base[5:]
+        if value in TAILWIND_FONT_SIZES:
+            font_size, line_height = TAILWIND_FONT_SIZES[value]
+            return f"font-size:{font_size};line-height:{line_height}", ""
+        if value.startswith("opacity-"):
+            return f"--tw-text-opacity:{int(value[8:]) / 100:g}", ""
+        if value.startswith("[") and not TAILWIND_ARBITRARY_COLOR.fullmatch(value):
+            return f"font-size:{_tailwind_size(value)}", ""
+        return _tailwind_color_utility(value, "color", "--tw-text-opacity")
+    if base.startswith("placeholder-"):
+        declarations = _tailwind_color_utility(base[12:], "color", "--tw-placeholder-opacity")
+        return (declarations[0], "::placeholder") if declarations else None
+    clamp = re.fullmatch(r"line-clamp-(\d+)", base)
+    if clamp:
+        return f"overflow:hidden;display:-webkit-box;-webkit-box-orient:vertical;-webkit-line-clamp:{clamp.group(1)}", ""
+    if base.startswith("leading-"):
+        size = _tailwind_size(base[8:], allow_fractions=False)
+        return (f"line-height:{size}", "") if size else None
+
+    # Backgrounds and gradients
+    if base.startswith("bg-gradient-to-"):
+        direction = TAILWIND_GRADIENT_DIRECTIONS.get(base[15:])
+        return (f"background-image:linear-gradient({direction},var(--tw-gradient-stops))", "") if direction else None
+    if base.startswith("bg-opacity-"):
+        return f"--tw-bg-opacity:{int(base[11:]) / 100:g}", ""
+    if base.startswith("bg-[url("):
+        return f"background-image:{base[4:-1]}", ""
+    if base.startswith("bg-"):
+        return _tailwind_color_utility(base[3:], "background-color", "--tw-bg-opacity")
+    for stop in ("from", "via", "to"):
+        if base.startswith(stop + "-"):
+            color_name, _, alpha = base[len(stop) + 1:].partition("/")
+            color = tailwind_color(color_name)
+            if color is None:
+                return None
+            value = _tailwind_color_value(color, int(alpha) / 100 if alpha else 1)
+            end = _tailwind_color_value(color, 0)
+            if stop == "from":
+                return (f"--tw-gradient-from:{value};--tw-gradient-to:{end};"
+                        "--tw-gradient-stops:var(--tw-gradient-from),var(--tw-gradient-to)"), ""
+            if stop == "via":
+                return (f"--tw-gradient-to:{end};"
+                        f"--tw-gradient-stops:var(--tw-gradient-from),{value},var(--tw-gradient-to)"), ""
+            return f"--tw-gradient-to:{value}", ""
+
+    # Borders, dividers, rings
+    if base == "rounded" or base.startswith("rounded-"):
+        parts = base.split("-")[1:]
+        side = parts[0] if parts and parts[0] in TAILWIND_RADIUS_SIDES and parts[0] else ""
+        size = "-".join(parts[1:] if side else parts)
+        if side in TAILWIND_RADIUS_SIDES and size in TAILWIND_RADII:
+            return ";".join(f"{prop}:{TAILWIND_RADII[size]}" for prop in TAILWIND_RADIUS_SIDES[side]), ""
+        return None
+    if base == "border" or base.startswith("border-"):
+        parts = base.split("-")[1:]
+        side = parts[0] if parts and parts[0] in TAILWIND_BORDER_SIDES else ""
+        rest = parts[1:] if side else parts
+        if not rest or (len(rest) == 1 and rest[0].isdigit()):
+            width = f"{rest[0]}px" if rest else "1px"
+            return ";".join(f"{prop}:{width}" for prop in TAILWIND_BORDER_SIDES[side]), ""
+        if not side:
+            if rest[0] == "opacity" and len(rest) == 2:
+                return f"--tw-border-opacity:{int(rest[1]) / 100:g}", ""
+            return _tailwind_color_utility("-".join(rest), "border-color", "--tw-border-opacity")
+        return None
+    if base.startswith("divide-"):
+        value = base[7:]
+        if value in ("x", "y") or re.fullmatch(r"[xy]-\d+", value):
+            axis, _, width = value.partition("-")
+            prop = "border-left-width" if axis == "x" else "border-top-width"
+            return f"{prop}:{width or 1}px", " > :not([hidden]) ~ :not([hidden])"
+        declarations = _tailwind_color_utility(value, "border-color", "--tw-divide-opacity")
+        return (declarations[0], " > :not([hidden]) ~ :not([hidden])") if declarations else None
+    if base == "ring" or re.fullmatch(r"ring-\d+", base):
+        width = base[5:] or "3"
+        return ("box-shadow:0 0 0 var(--tw-ring-offset-width) var(--tw-ring-offset-color),"
+                f"0 0 0 calc({width}px + var(--tw-ring-offset-width)) var(--tw-ring-color)"), ""
+    if re.fullmatch(r"ring-offset-\d+", base):
+        return f"--tw-ring-offset-width:{base[12:]}px", ""
+    if base.startswith("ring-offset-"):
+        color = tailwind_color(base[12:])
+        return (f"--tw-ring-offset-color:{_tailwind_color_value(color, 1)}", "") if color else None
+    if base.startswith(("fill-", "stroke-")):
+        prop, _, color_name = base.partition("-")
+        color = tailwind_color(color_name)
+        return (f"{prop}:{_tailwind_color_value(color, 1)}", "") if color else None
+    if base.startswith("ring-"):
+        color_name, _, alpha = base[5:].partition("/")
+        color = tailwind_color(color_name)
+        return (f"--tw-ring-color:{_tailwind_color_value(color, int(alpha) / 100 if alpha else 1)}", "") if color else None
+
+    # Effects, layering, transforms and timing
+    if base == "shadow" or base.startswith("shadow-"):
+        shadow = TAILWIND_SHADOWS.get(base[7:])
+        return (f"box-shadow:{shadow}", "") if shadow else None
+    numeric = re.fullmatch(r"(opacity|z|duration|delay|order|scale|rotate)-(\d+)", base)
+    if numeric:
+        kind, number = numeric.group(1), int(numeric.group(2))
+        return {
+            "opacity": f"opacity:{number / 100:g}",
+            "z": f"z-index:{-number if negative else number}",
+            "duration": f"transition-duration:{number}ms",
+            "delay": f"transition-delay:{number}ms",
+            "order": f"order:{number}",
+            "scale": f"--tw-scale-x:{number / 100:g};--tw-scale-y:{number / 100:g};{TAILWIND_TRANSFORM}",
+            "rotate": f"--tw-rotate:{'-' if negative else ''}{number}deg;{TAILWIND_TRANSFORM}",
+        }[kind], ""
+    translate = re.fullmatch(r"translate-([xy])-(.+)", base)
+    if translate:
+        size = _tailwind_size(translate.group(2), negative)
+        return (f"--tw-translate-{translate.group(1)}:{size};{TAILWIND_TRANSFORM}", "") if size else None
+    grid = re.fullmatch(r"(grid-cols|grid-rows|col-span|row-span)-(\d+|full)", base)
+    if grid:
+        kind, value = grid.groups()
+        if kind == "grid-cols":
+            return f"grid-template-columns:repeat({value},minmax(0,1fr))", ""
+        if kind == "grid-rows":
+            return f"grid-template-rows:repeat({value},minmax(0,1fr))", ""
+        prop = "grid-column" if kind == "col-span" else "grid-row"
+        return (f"{prop}:1 / -1" if value == "full" else f"{prop}:span {value} / span {value}"), ""
+    return None
+
+
+def _tailwind_color_utility(value, prop, opacity_var):
+    color_name, _, alpha = value.partition("/")
+    color = tailwind_color(color_name)
+    if color is None:
+        return None
+    if isinstance(color, str):
+        return f"{prop}:{color}", ""
+    if alpha:
+        return f"{prop}:{_tailwind_color_value(color, int(alpha) / 100)}", ""
+    return f"{opacity_var}:1;{prop}:{_tailwind_color_value(color, f'var({opacity_var})')}", ""
 
-        // Render cakes grid
-        function renderCakes() {
-            const grid = document.getElementById('cakes-grid');
-            grid.innerHTML = cakes.map(cake => `
-                <div class="bg-white rounded-lg shadow-lg overflow-hidden hover:shadow-xl transition transform hover:-translate-y-1">
-                    <img src="${cake.image}" alt="${cake.name}" class="w-full h-48 object-cover">
-                    <div class="p-4">
-                        <h3 class="text-xl font-bold text-gray-800 mb-2">${cake.name}</h3>
-                        <p class="text-2xl font-semibold text-pink-600 mb-4">₹${cake.price}</p>
-                        <button onclick="addToCart(${cake.id})" class="w-full bg-pink-600 text-white py-2 rounded-lg hover:bg-pink-700 transition font-semibold">
-                            Add to Cart
-                        </button>
-                    </div>
-                </div>
-            `).join('');
-        }
 
-        // Add item to cart
-        function addToCart(cakeId) {
-            const cake = cakes.find(c => c.id === cakeId);
-            const existingItem = cart.find(item => item.id === cakeId);
+def tailwind_rule(class_name):
+    """Full CSS rule for a class (with variants like md:hover:), or None if unsupported
+
+    Returns (media_query, rule).
+    """
+    *variants, utility = class_name.split(":")
+    declared = tailwind_declarations(utility)
+    if declared is None:
+        return None
+    declarations, child_selector = declared
+
+    selector = "." + re.sub(r"([^a-zA-Z0-9_-])", r"\\\1", class_name)
+    media = ""
+    for variant in variants:
+        if variant in TAILWIND_SCREENS:
+            media = f"@media (min-width:{TAILWIND_SCREENS[variant]})"
+        elif variant in TAILWIND_PSEUDO_VARIANTS:
+            selector += TAILWIND_PSEUDO_VARIANTS[variant]
+        elif variant.startswith("group-") and variant[6:] in TAILWIND_PSEUDO_VARIANTS:
+            selector = f".group{TAILWIND_PSEUDO_VARIANTS[variant[6:]]} {selector}"
+        elif variant == "dark":
+            media = "@media (prefers-color-scheme:dark)"
+        else:
+            return None
+    return media, f"{selector}{child_selector}{{{declarations}}}"
+
+
+def _tailwind_sort_key(class_name):
+    """Order rules like Tailwind so combinations work: shorthands before axis and side
+    longhands ("p-4 pt-2"), colors before their opacity modifiers, gradient from/via/to
+    """
+    utility = class_name.split(":")[-1].lstrip("-")
+    prefix = utility.split("-")[0]
+    if "-opacity-" in utility or prefix == "to":
+        rank = 3
+    elif prefix == "via":
+        rank = 2
+    elif prefix in ("px", "py", "mx", "my") or utility.startswith(("inset-x", "inset-y", "border-x", "border-y", "space-", "gap-x", "gap-y")):
+        rank = 1
+    elif prefix in ("pt", "pr", "pb", "pl", "mt", "mr", "mb", "ml", "top", "right", "bottom", "left") \
+            or re.match(r"(border|rounded)-(t|r|b|l|tl|tr|br|bl)(-|$)", utility):
+        rank = 2
+    else:
+        rank = 0
+    return class_name.count(":"), rank, class_name
+
+
+def build_tailwind_css(files):
+    """Static stylesheet covering the Tailwind classes used across files
+
+    Returns (css, unknown_classes); unknown_classes lists class="..." tokens that are not
+    in the offline utility table.
+    """
+    candidates = set()
+    declared_classes = set()
+    for content in files.values():
+        candidates.update(TAILWIND_CANDIDATE.findall(content))
+        for attribute in re.findall(r"class(?:Name)?\s*=\s*[\"']([^\"']*)[\"']", content):
+            declared_classes.update(attribute.split())
+
+    base_rules = []
+    media_rules = {}
+    resolved = set()
+    for class_name in sorted(candidates | declared_classes, key=_tailwind_sort_key):
+        rule = tailwind_rule(class_name)
+        if rule is None:
+            continue
+        resolved.add(class_name)
+        media, css = rule
+        if media:
+            media_rules.setdefault(media, []).append(css)
+        else:
+            base_rules.append(css)
+
+    if "container" in resolved:
+        for width in TAILWIND_SCREENS.values():
+            media_rules.setdefault(f"@media (min-width:{width})", []).insert(0, f".container{{max-width:{width}}}")
+
+    css = [TAILWIND_PREFLIGHT, TAILWIND_KEYFRAMES, "\n".join(base_rules)]
+    # Breakpoints in ascending order so larger screens win
+    for screen, width in TAILWIND_SCREENS.items():
+        media = f"@media (min-width:{width})"
+        if media in media_rules:
+            css.append(f"{media}{{{''.join(media_rules.pop(media))}}}")
+    css.extend(f"{media}{{{''.join(rules)}}}" for media, rules in media_rules.items())
+
+    # Classes the site styles itself (e.g. in styles.css) are not missing utilities
+    defined = "\n".join(files.values())
+    unknown = sorted(
+        name for name in declared_classes - resolved
+        if "-" in name.split(":")[-1] and not name.startswith(("${", "fa-")) and f".{name}" not in defined
+    )
+    return "\n".join(css) + "\n", unknown
+
+
+def apply_static_css(files, stylesheet=STATIC_CSS_NAME):
+    """Swap the Tailwind CDN script for a purged static stylesheet
+
+    Returns (updated_files, unknown_classes). Pages that customise Tailwind through
+    tailwind.config keep the CDN, since the offline table cannot honour the config,
+    and so does the whole site when it uses classes the table does not know.
+    """
+    pages = [
+        name for name, content in files.items()
+        if os.path.splitext(name)[1].lower() in (".html", ".htm")
+        and TAILWIND_CDN_SCRIPT.search(content) and "tailwind.config" not in content
+    ]
+    if not pages or stylesheet in files:
+        return dict(files), []
+
+    css, unknown = build_tailwind_css(files)
+    if unknown:
+        return dict(files), unknown
+    updated = dict(files)
+    updated[stylesheet] = css
+    for name in pages:
+        href = posixpath.relpath(stylesheet, posixpath.dirname(name) or ".")
+        updated[name] = TAILWIND_CDN_SCRIPT.sub(f'<link rel="stylesheet" href="{href}">', files[name], count=1)
+    return updated, unknown
+
+
+JS_FUNCTION_DECLARATION = re.compile(r"(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)\s*\(")
+HTML_INLINE_SCRIPT = re.compile(r"(<script\b(?![^>]*\bsrc=)[^>]*>)(.*?)(</script>)", re.DOTALL | re.IGNORECASE)
+HTML_SCRIPT_TYPE = re.compile(r"(?<![\w-])type\s*=\s*[\"']?([^\"'\s>]*)", re.IGNORECASE)
+# Script types that run as classic scripts; modules, JSON and templates keep their own scope or never run
+JS_CLASSIC_TYPES = {"", "text/javascript", "application/javascript", "text/ecmascript", "application/ecmascript"}
+HTML_LAYOUT_ELEMENT = re.compile(r"[ \t]*<(header|nav|footer)\b[^>]*>.*?</\1>", re.DOTALL | re.IGNORECASE)
+
+
+def _js_top_level_functions(source):
+    """[(name, start, end)] of the function declarations at the top level of a script
+
+    start includes the // comment lines directly above the declaration.
+    """
+    functions = []
+    depth = 0
+    current = None  # (name, start) of the declaration being scanned
+    last = ""  # last non-whitespace character
+    newline = False  # whether a line break follows it
+    i, length = 0, len(source)
+    while i < length:
+        char = source[i]
+        if char in "'\"`":
+            i = _skip_js_string(source, i)
+            last, newline = char, False
+            continue
+        if source.startswith("//", i):
+            end = source.find("\n", i)
+            i = length if end == -1 else end
+            continue
+        if source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if char == "/" and _js_regex_starts(source, i, last):
+            i = _skip_js_regex(source, i)
+            last, newline = "/", False
+            continue
+        if char.isspace():
+            newline = newline or char == "\n"
+            i += 1
+            continue
+        
+        # A declaration starts a statement: first in the script, after ; or }, or on a new line
+        # after anything that cannot continue an expression
+        starts_statement = last in ("", ";", "}") or (newline and last not in JS_REGEX_PRECEDERS and last != ".")
+        match = depth == 0 and current is None and starts_statement and JS_FUNCTION_DECLARATION.match(source, i)
+        if match:
+            start = source.rfind("\n", 0, i) + 1
+            while start:
+                previous = source.rfind("\n", 0, start - 1) + 1
+                if not source[previous:start].strip().startswith("//"):
+                    break
+                start = previous
+            current = (match.group(1), start)
+            i = match.end() - 1  # continue at the opening parenthesis
+            continue
+        
+        if char in "({[":
+            depth += 1
+        elif char in ")}]":
+            depth -= 1
+            if depth == 0 and char == "}" and current and source.find("{", current[1]) < i:
+                functions.append((current[0], current[1], i + 1))
+                current = None
+        last, newline = char, False
+        i += 1
+    return functions
+
+
+def _classic_scripts(content):
+    """Inline scripts of a page that run as classic JavaScript"""
+    for match in HTML_INLINE_SCRIPT.finditer(content):
+        script_type = HTML_SCRIPT_TYPE.search(match.group(1))
+        if script_type is None or script_type.group(1).lower() in JS_CLASSIC_TYPES:
+            yield match
+
+
+def _page_href(page, target):
+    return posixpath.relpath(target, posixpath.dirname(page) or ".")
+
+
+def _unique_name(files, name):
+    stem, extension = os.path.splitext(name)
+    counter = 2
+    while name in files:
+        name = f"{stem}-{counter}{extension}"
+        counter += 1
+    return name
+
+
+def extract_shared_layout(files, min_bytes=SHARED_LAYOUT_MIN_BYTES):
+    """Hoist markup and functions repeated across pages into shared files
+
+    Identical <header>, <nav> and <footer> elements found in two or more pages move to
+    partials/<tag>.js, which writes the markup in place while the page is parsed.
+    Function declarations repeated verbatim in classic inline scripts move to common.js,
+    unless a page defines a different function under the same name; module scripts are
+    left alone, since their functions can use bindings common.js cannot see. Pieces smaller
+    than min_bytes are left inline, where they cost less than an extra request.
+    Returns (updated_files, [(shared_file, pages_using_it, bytes)]).
+    """
+    pages = [name for name in files if os.path.splitext(name)[1].lower() in (".html", ".htm")]
+    updated = dict(files)
+    report = []
+    
+    # Repeated layout elements, keyed by their markup with whitespace collapsed
+    occurrences = {}
+    for page in pages:
+        for match in HTML_LAYOUT_ELEMENT.finditer(files[page]):
+            markup = match.group(0)
+            if len(markup) >= min_bytes:
+                key = (posixpath.dirname(page), match.group(1).lower(), " ".join(markup.split()))
+                occurrences.setdefault(key, []).append((page, markup))
+    for (folder, tag, _), found in occurrences.items():
+        if len({page for page, _ in found}) < 2:
+            continue
+        partial = _unique_name(updated, posixpath.join(folder, "partials", f"{tag}.js"))
+        markup = textwrap.dedent(found[0][1]).strip()
+        literal = markup.replace("\\", "\\\\").replace("`", "\\`").replace("${", "\\${")
+        updated[partial] = f'document.currentScript.insertAdjacentHTML("beforebegin", `\n{literal}\n`);\n'
+        for page, original in found:
+            indent = original[:len(original) - len(original.lstrip())]
+            updated[page] = updated[page].replace(
+                original, f'{indent}<script src="{_page_href(page, partial)}"></script>', 1
+            )
+        report.append((partial, len(found), len(markup.encode("utf-8"))))
+    
+    # Repeated function declarations, keyed by their minified source
+    declarations = {}
+    for page in pages:
+        for match in _classic_scripts(updated[page]):
+            script = match.group(2)
+            for name, start, end in _js_top_level_functions(script):
+                declarations.setdefault(name, []).append((page, script[start:end]))
+    shared = {
+        name: found for name, found in declarations.items()
+        if len({page for page, _ in found}) >= 2 and len({minify_js(source) for _, source in found}) == 1
+    }
+    if sum(len(found[0][1]) for found in shared.values()) >= min_bytes:
+        common = _unique_name(updated, "common.js")
+        hoisted = [textwrap.dedent(found[0][1]).strip() for found in shared.values()]
+        updated[common] = "\n\n".join(hoisted) + "\n"
+        sharing_pages = sorted({page for found in shared.values() for page, _ in found})
+        for page in sharing_pages:
+            content = updated[page]
+            for found in shared.values():
+                for source in {source for owner, source in found if owner == page}:
+                    # Take the blank lines after it too, so no gap is left behind
+                    content = re.sub(re.escape(source) + r"[ \t]*(?:\n[ \t]*(?=\n))*\n?", "", content, count=1)
+            content = re.sub(r"[ \t]*<script>\s*</script>\n?", "", content)
+            # Load common.js ahead of the first inline script so top-level calls still resolve
+            first_script = next(_classic_scripts(content), None)
+            tag = f'<script src="{_page_href(page, common)}"></script>'
+            if first_script:
+                line_start = content.rfind("\n", 0, first_script.start()) + 1
+                indent = content[line_start:first_script.start()]
+                indent = indent if not indent.strip() else ""
+                content = content[:first_script.start()] + f"{tag}\n{indent}" + content[first_script.start():]
+            else:
+                content = re.sub(r"</body>", f"{tag}\n</body>", content, count=1, flags=re.IGNORECASE)
+            updated[page] = content
+        report.append((common, len(sharing_pages), len(updated[common].encode("utf-8"))))
+    return updated, report
+
+
+# Elements without a closing tag, and elements whose closing tag HTML lets authors omit
+HTML_VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+    "path", "circle", "rect", "line", "polyline", "polygon", "ellipse", "stop", "use",
+}
+HTML_OPTIONAL_CLOSE = {"p", "li", "dt", "dd", "tr", "td", "th", "thead", "tbody", "tfoot", "option", "colgroup"}
+# Missing link targets of these types can be generated; anything else (images, fonts) is left alone
+REGENERABLE_EXTENSIONS = (".html", ".htm", ".css", ".js")
+
+
+def _line_of(source, index):
+    return source.count("\n", 0, index) + 1
+
+
+def check_js_syntax(source):
+    """First unbalanced bracket or unterminated literal in JavaScript, or None
+
+    A tokenizer-level check rather than a full parse: it catches truncated output and
+    mismatched braces, the usual failures of generated scripts.
+    """
+    closing = {")": "(", "]": "[", "}": "{"}
+    stack = []
+    last = ""
+    i, length = 0, len(source)
+    while i < length:
+        char = source[i]
+        if char in "'\"`":
+            end = _skip_js_string(source, i)
+            multiline = char != "`" and "\n" in source[i:end].replace("\\\n", "")
+            if end > length or source[end - 1] != char or end - 1 == i or multiline:
+                return f"unterminated string at line {_line_of(source, i)}"
+            last = char
+            i = end
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = length if end == -1 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            if end == -1:
+                return f"unterminated comment at line {_line_of(source, i)}"
+            i = end + 2
+        elif char == "/" and _js_regex_starts(source, i, last):
+            end = _skip_js_regex(source, i)
+            if end > length or source[end - 1] != "/":
+                return f"unterminated regular expression at line {_line_of(source, i)}"
+            last = "/"
+            i = end
+        else:
+            if char in "([{":
+                stack.append((char, i))
+            elif char in closing:
+                if not stack or stack[-1][0] != closing[char]:
+                    return f"unexpected '{char}' at line {_line_of(source, i)}"
+                stack.pop()
+            if not char.isspace():
+                last = char
+            i += 1
+    if stack:
+        char, index = stack[-1]
+        return f"'{char}' opened at line {_line_of(source, index)} is never closed"
+    return None
+
+
+def check_css_syntax(source):
+    """Unbalanced braces in CSS, or None"""
+    depth = 0
+    stripped = re.sub(r"/\*.*?\*/|\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'", "", source, flags=re.DOTALL)
+    for line_number, line in enumerate(stripped.split("\n"), 1):
+        for char in line:
+            depth += {"{": 1, "}": -1}.get(char, 0)
+            if depth < 0:
+                return f"unexpected '}}' at line {line_number}"
+    return f"{depth} unclosed '{{'" if depth else None
+
+
+def local_link_target(page, url):
+    """Project-relative path a link on page points to, or None for external and in-page links"""
+    url = url.strip()
+    if not url or url.startswith(("#", "/", "data:", "mailto:", "tel:", "javascript:", "{", "$")) or re.match(r"[a-z][a-z0-9+.-]*:", url, re.IGNORECASE):
+        return None
+    path = re.split(r"[?#]", url, maxsplit=1)[0]
+    if not path:
+        return None
+    return posixpath.normpath(posixpath.join(posixpath.dirname(page), path))
+
+
+def validate_file(filename, content, known_files):
+    """Problems found in one generated file: [(kind, message)]
+
+    kind is "syntax" for malformed HTML/CSS/JS and "missing" for a link to a file that is
+    not in the project (message is then the missing path). Runs in a worker process.
+    """
+    from html.parser import HTMLParser
+    
+    extension = os.path.splitext(filename)[1].lower()
+    problems = []
+    if extension == ".js":
+        error = check_js_syntax(content)
+        if error:
+            problems.append(("syntax", f"JavaScript: {error}"))
+    elif extension == ".css":
+        error = check_css_syntax(content)
+        if error:
+            problems.append(("syntax", f"CSS: {error}"))
+    elif extension in (".html", ".htm"):
+        class PageChecker(HTMLParser):
+            def __init__(self):
+                super().__init__(convert_charrefs=True)
+                self.stack = []
+                self.links = []
+                self.scripts = []
             
-            if (existingItem) {
-                existingItem.qty++;
-            } else {
-                cart.push({
-                    id: cake.id,
-                    name: cake.name,
-                    price: cake.price,
-                    qty: 1
-                });
-            }
+            def handle_starttag(self, tag, attrs):
+                for name, value in attrs:
+                    if name in ("href", "src") and value:
+                        self.links.append(value)
+                if tag not in HTML_VOID_ELEMENTS:
+                    self.stack.append((tag, self.getpos()[0]))
             
-            saveCart();
+            def handle_startendtag(self, tag, attrs):
+                for name, value in attrs:
+                    if name in ("href", "src") and value:
+                        self.links.append(value)
             
-            // Show notification
-            const btn = event.target;
-            const originalText = btn.textContent;
-            btn.textContent = 'Added!';
-            btn.classList.add('bg-green-600', 'hover:bg-green-700');
-            btn.classList.remove('bg-pink-600', 'hover:bg-pink-700');
+            def handle_endtag(self, tag):
+                if tag in HTML_VOID_ELEMENTS:
+                    return
+                open_tags = [open_tag for open_tag, _ in self.stack]
+                if tag not in open_tags:
+                    problems.append(("syntax", f"HTML: stray </{tag}> at line {self.getpos()[0]}"))
+                    return
+                # Close elements left open inside this one; only optional-close ones may be
+                while self.stack:
+                    open_tag, line = self.stack.pop()
+                    if open_tag == tag:
+                        break
+                    if open_tag not in HTML_OPTIONAL_CLOSE:
+                        problems.append(("syntax", f"HTML: <{open_tag}> at line {line} is not closed before </{tag}>"))
             
-            setTimeout(() => {
-                btn.textContent = originalText;
-                btn.classList.remove('bg-green-600', 'hover:bg-green-700');
-                btn.classList.add('bg-pink-600', 'hover:bg-pink-700');
-            }, 1000);
-        }
+            def handle_data(self, data):
+                if self.stack and self.stack[-1][0] == "script":
+                    self.scripts.append((data, self.stack[-1][1]))
+        
+        checker = PageChecker()
+        checker.feed(content)
+        checker.close()
+        for tag, line in checker.stack:
+            if tag not in HTML_OPTIONAL_CLOSE | {"html", "body", "head"}:
+                problems.append(("syntax", f"HTML: <{tag}> at line {line} is never closed"))
+        for script, line in checker.scripts:
+            error = check_js_syntax(script)
+            if error:
+                problems.append(("syntax", f"inline script at line {line}: {error}"))
+        for url in dict.fromkeys(checker.links):
+            target = local_link_target(filename, url)
+            if target and target not in known_files and target.lower().endswith(REGENERABLE_EXTENSIONS):
+                problems.append(("missing", target))
+    return problems
 
-        // Initialize
-        loadCart();
-        renderCakes();
-    </script>
-</body>
-</html>
-
-<!-- CART PAGE (cart.html) -->
-<!-- This would be a separate file -->
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Cart - Sweet Bites</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-</head>
-<body class="bg-pink-50">
-    <header class="bg-white shadow-md sticky top-0 z-50">
-        <div class="max-w-7xl mx-auto px-4 py-4">
-            <div class="flex justify-between items-center">
-                <h1 class="text-3xl font-bold text-pink-600">Sweet Bites</h1>
-                <nav class="flex gap-6 items-center">
-                    <a href="index.html" class="text-gray-700 hover:text-pink-600 transition">Home</a>
-                    <a href="cart.html" class="text-gray-700 hover:text-pink-600 transition">Cart</a>
-                </nav>
-            </div>
-        </div>
-    </header>
-
-    <main class="max-w-4xl mx-auto px-4 py-8">
-        <h2 class="text-4xl font-bold mb-8 text-gray-800">Your Cart</h2>
-        <div id="cart-content"></div>
-    </main>
-
-    <script>
-        let cart = [];
-
-        function loadCart() {
-            const savedCart = sessionStorage.getItem('cart');
-            if (savedCart) {
-                cart = JSON.parse(savedCart);
-            }
-            renderCart();
-        }
 
-        function saveCart() {
-            sessionStorage.setItem('cart', JSON.stringify(cart));
-            renderCart();
-        }
+_validation_pool = None
+_validation_pool_lock = threading.Lock()
 
-        function renderCart() {
-            const container = document.getElementById('cart-content');
-            
-            if (cart.length === 0) {
-                container.innerHTML = `
-                    <div class="bg-white rounded-lg shadow-md p-8 text-center">
-                        <p class="text-xl text-gray-600 mb-4">Your cart is empty</p>
-                        <a href="index.html" class="inline-block bg-pink-600 text-white px-6 py-3 rounded-lg hover:bg-pink-700 transition">
-                            Shop Cakes
-                        </a>
-                    </div>
-                `;
-                return;
-            }
 
-            const subtotal = cart.reduce((sum, item) => sum + (item.price * item.qty), 0);
-
-            container.innerHTML = `
-                <div class="bg-white rounded-lg shadow-md overflow-hidden">
-                    <table class="w-full">
-                        <thead class="bg-pink-100">
-                            <tr>
-                                <th class="px-6 py-3 text-left">Item</th>
-                                <th class="px-6 py-3 text-center">Quantity</th>
-                                <th class="px-6 py-3 text-right">Price</th>
-                                <th class="px-6 py-3 text-right">Total</th>
-                                <th class="px-6 py-3"></th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            ${cart.map(item => `
-                                <tr class="border-b">
-                                    <td class="px-6 py-4 font-semibold">${item.name}</td>
-                                    <td class="px-6 py-4 text-center">
-                                        <div class="flex items-center justify-center gap-2">
-                                            <button onclick="updateQty(${item.id}, -1)" class="bg-gray-200 hover:bg-gray-300 w-8 h-8 rounded">-</button>
-                                            <span class="w-12 text-center">${item.qty}</span>
-                                            <button onclick="updateQty(${item.id}, 1)" class="bg-gray-200 hover:bg-gray-300 w-8 h-8 rounded">+</button>
-                                        </div>
-                                    </td>
-                                    <td class="px-6 py-4 text-right">₹${item.price}</td>
-                                    <td class="px-6 py-4 text-right font-semibold">₹${item.price * item.qty}</td>
-                                    <td class="px-6 py-4 text-right">
-                                        <button onclick="removeItem(${item.id})" class="text-red-600 hover:text-red-800">🗑️</button>
-                                    </td>
-                                </tr>
-                            `).join('')}
-                        </tbody>
-                    </table>
-                    <div class="p-6 bg-gray-50">
-                        <div class="flex justify-between items-center mb-6">
-                            <span class="text-2xl font-bold">Subtotal:</span>
-                            <span class="text-2xl font-bold text-pink-600">₹${subtotal}</span>
-                        </div>
-                        <div class="flex gap-4">
-                            <button onclick="updateCart()" class="flex-1 bg-gray-600 text-white py-3 rounded-lg hover:bg-gray-700 transition font-semibold">
-                                Update Cart
-                            </button>
-                            <a href="checkout.html" class="flex-1 bg-pink-600 text-white py-3 rounded-lg hover:bg-pink-700 transition font-semibold text-center">
-                                Proceed to Checkout
-                            </a>
-                        </div>
-                    </div>
-                </div>
-            `;
-        }
+def validate_files(files, max_workers=VALIDATION_WORKERS):
+    """Validate files concurrently in a process pool; returns {filename: problems} for failing files"""
+    global _validation_pool
+    known = frozenset(files)
+    names = list(files)
+    try:
+        with _validation_pool_lock:
+            if _validation_pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                _validation_pool = ProcessPoolExecutor(max_workers=max_workers)
+        results = list(_validation_pool.map(
+            validate_file, names, [files[name] for name in names], [known] * len(names),
+            chunksize=max(1, len(names) // (max_workers * 2)),
+        ))
+    except (OSError, NotImplementedError, RuntimeError):
+        # No usable process pool here (restricted platform or a broken worker): check in-process
+        _validation_pool = None
+        results = [validate_file(name, files[name], known) for name in names]
+    return {name: problems for name, problems in zip(names, results) if problems}
 
-        function updateQty(id, change) {
-            const item = cart.find(i => i.id === id);
-            if (item) {
-                item.qty += change;
-                if (item.qty <= 0) {
-                    removeItem(id);
-                } else {
-                    saveCart();
-                }
-            }
-        }
 
-        function removeItem(id) {
-            cart = cart.filter(i => i.id !== id);
-            saveCart();
-        }
+FAST_PATH_BRAND = re.compile(
+    r"[\"“]([^\"”]{2,40})[\"”]"
+    r"|\b(?:called|named|for)\s+([A-Z0-9][\w'’&-]*(?:\s+(?:&\s+)?[A-Z0-9][\w'’&-]*){0,3})"
+)
+FAST_PATH_ITEMS = re.compile(
+    r"\b(?:selling|sells|offering|featuring)\s+([a-z][\w'’ ,&-]*?)(?=\s+(?:in|with|called|named|for|using)\b|[.;!]|$)",
+    re.IGNORECASE,
+)
+FAST_PATH_ROLE = re.compile(
+    r",?\s+(?:as\s+)?an?\s+((?:[a-z]+\s+){0,2}(?:designer|developer|artist|photographer|writer|architect|"
+    r"engineer|illustrator|musician))\b",
+    re.IGNORECASE,
+)
+FAST_PATH_PAGE = re.compile(r"<!DOCTYPE html>.*?</html>", re.DOTALL | re.IGNORECASE)
+FAST_PATH_ITEM_ENTRY = re.compile(r"\{id: \d+, name: \"[^\"]*\", price: ([\d.]+), image: \"([^\"?]*)[^\"]*\"\}")
 
-        function updateCart() {
-            saveCart();
-            alert('Cart updated successfully!');
-        }
 
-        loadCart();
-    </script>
-</body>
-</html>
-"""
-}
+def _title_case(text):
+    return " ".join(word[:1].upper() + word[1:] for word in text.split())
+
+
+def extract_fast_path(prompt):
+    """Template slots of a prompt simple enough to render locally, or None when it needs the model
+
+    Returns {"template", "brand", "colors", "items", "tagline"}. The prompt has to match a
+    fast-path template and name a brand, and every other word must be a template keyword,
+    a color or one of FAST_PATH_WORDS, so anything the template cannot express falls through.
+    """
+    if len(prompt.split()) > FAST_PATH_MAX_WORDS:
+        return None
+    ranked = rank_templates(prompt)
+    if not ranked or ranked[0] not in FAST_PATH_TEMPLATES:
+        return None
+    template = FAST_PATH_TEMPLATES[ranked[0]]
+
+    brand = FAST_PATH_BRAND.search(prompt)
+    if brand is None:
+        return None
+    rest = prompt[:brand.start()] + " " + prompt[brand.end():]
+
+    items = []
+    match = FAST_PATH_ITEMS.search(rest) if "items" in template else None
+    if match:
+        items = [_title_case(item) for item in re.split(r"\s*(?:,|&|\band\b)\s*", match.group(1)) if item.strip()]
+        if not 2 <= len(items) <= FAST_PATH_MAX_ITEMS or any(len(item.split()) > 4 for item in items):
+            return None
+        rest = rest[:match.start(1)] + " " + rest[match.end(1):]
+
+    tagline = None
+    match = FAST_PATH_ROLE.search(rest) if "tagline" in template else None
+    if match:
+        tagline = _title_case(match.group(1))
+        rest = rest[:match.start()] + " " + rest[match.end():]
+
+    # What is left may only pick colors or repeat words the template already covers
+    colors = []
+    for word in re.findall(r"[a-z0-9]+(?:['’-][a-z0-9]+)*", rest.lower()):
+        color = FAST_PATH_COLOR_ALIASES.get(word, word)
+        if color in TAILWIND_PALETTE:
+            if color not in colors:
+                colors.append(color)
+        elif word not in FAST_PATH_WORDS and not TEMPLATE_KEYWORD_PATTERN.fullmatch(word):
+            return None
+    if len(colors) > len(template["colors"]):
+        return None
+
+    return {
+        "template": ranked[0],
+        "brand": (brand.group(1) or brand.group(2)).strip(),
+        "colors": colors,
+        "items": items,
+        "tagline": tagline,
+    }
+
+
+def render_fast_path(spec):
+    """Project files for slots from extract_fast_path: {filename: content}"""
+    from html import escape
+    from urllib.parse import quote_plus
+
+    template = FAST_PATH_TEMPLATES[spec["template"]]
+    source = TEMPLATE_SOURCES[spec["template"]]
+
+    # One file per document in the template; later pages are named in the comment before them
+    files = {}
+    position = 0
+    for match in FAST_PATH_PAGE.finditer(source):
+        named = re.findall(r"\(([\w-]+\.html)\)", source[position:match.start()])
+        if not files:
+            filename = "index.html"
+        else:
+            filename = named[-1] if named else f"page{len(files)}.html"
+        files[filename] = match.group(0) + "\n"
+        position = match.end()
+
+    recolor = {old: new for old, new in zip(template["colors"], spec["colors"]) if old != new}
+    color_class = re.compile(
+        rf"(?<![\w-])((?:bg|text|border|from|via|to|ring|divide|outline|fill|stroke)-)({'|'.join(recolor)})(?=-\d)"
+    ) if recolor else None
+
+    def items_array(match):
+        entries = FAST_PATH_ITEM_ENTRY.findall(match.group(2))
+        indent = re.search(r"\n([ \t]*)\{", match.group(2)).group(1)
+        lines = []
+        for number, name in enumerate(spec["items"]):
+            price, image = entries[number % len(entries)]
+            lines.append(f"{indent}{{id: {number + 1}, name: {json.dumps(name)}, price: {price}, "
+                         f"image: \"{image}?text={quote_plus(name)}\"}}")
+        return match.group(1) + "\n" + ",\n".join(lines) + match.group(3)
+
+    brand = escape(spec["brand"], quote=False)
+    for filename, content in files.items():
+        # Pages whose title does not carry the brand get the brand as their title
+        title = re.search(r"<title>(.*?)</title>", content)
+        if title and template["brand"] not in title.group(1):
+            content = content[:title.start(1)] + template["brand"] + content[title.end(1):]
+        content = content.replace(template["brand"], brand)
+        if spec["tagline"] and "tagline" in template:
+            content = content.replace(template["tagline"], escape(spec["tagline"], quote=False))
+        if spec["items"] and "items" in template:
+            array = re.compile(rf"(const {template['items']} = \[)(.*?)(\n[ \t]*\];)", re.DOTALL)
+            content = array.sub(items_array, content)
+        if color_class:
+            content = color_class.sub(lambda match: match.group(1) + recolor[match.group(2)], content)
+
+        # Links to pages the template only mentions go nowhere rather than to a missing file
+        content = re.sub(
+            r"href=\"([^\"]*)\"",
+            lambda match: match.group(0) if local_link_target(filename, match.group(1)) in (None, *files) else "href=\"#\"",
+            content,
+        )
+        files[filename] = content
+    return files
+
+
+def apply_search_replace_edits(files, edits):
+    """Apply search/replace edits to a copy of files
+    
+    Returns (updated_files, conflicts). An edit conflicts when its file is unknown
+    or its search text does not match exactly one place in the file.
+    """
+    updated = {}
+    conflicts = []
+    for edit in edits:
+        filename = edit.get("file")
+        search = edit.get("search", "")
+        replace = edit.get("replace", "")
+        if filename not in files:
+            conflicts.append(f"{filename}: file not found")
+            continue
+        content = updated.get(filename, files[filename])
+        matches = content.count(search) if search else 0
+        if matches != 1:
+            conflicts.append(f"{filename}: search text matched {matches} times")
+            continue
+        updated[filename] = content.replace(search, replace, 1)
+    return updated, conflicts
+
 
 class AIWebBuilder:
-    def __init__(self):
-        self.conversation_history = []
+    def __init__(self, use_cache=True, record_metrics=True, backend=None, lane="interactive"):
+        self.history = HistoryManager()
         self.project_name = None
         self.project_files = {}
         self.needs_backend = False
+        self.cache = generation_cache if use_cache else None
+        self.similar = similarity_index if use_cache and SIMILAR_REUSE else None
+        self.fast_path = FAST_PATH
+        self.served_locally = False
+        self.last_usage = None
+        self.usage_log = []
+        self.session_templates = None
+        self.snapshot_id = None  # snapshot this session was saved to or resumed from
+        self.metrics = metrics_sink if record_metrics else None
+        self.current_call = None
+        self._backend = backend
+        self.lane = lane
+        self.router = model_router
+        self._route_lock = threading.Lock()
+    
+    @property
+    def backend(self):
+        """LLM backend used for completions: the one given to __init__, else the shared one"""
+        return self._backend or get_backend()
+    
+    def _route(self, kind, prompt="", files=None):
+        """Route for a call of `kind`, from its estimated output size and the files it touches"""
+        if kind == "generate":
+            words = set(re.findall(r"[a-z]+", prompt.lower()))
+            pages = 1 + len(words & ROUTE_PAGE_WORDS)
+            counted = re.search(r"\b(\d+)[\s-]*pages?\b", prompt.lower())
+            if counted:
+                pages = max(pages, int(counted.group(1)))
+            return self.router.route(kind, pages * ROUTE_PAGE_TOKENS, pages)
+        if kind == "plan":
+            return self.router.route(kind, ROUTE_PLAN_TOKENS)
+        if kind == "file":
+            return self.router.route(kind, ROUTE_PAGE_TOKENS, 1)
+        
+        # modify (whole site again) or edit (search/replace on the given files)
+        files = self.project_files if files is None else files
+        size = sum(estimate_tokens(content) for content in files.values())
+        output_tokens = size if kind == "modify" else ROUTE_EDIT_TOKENS + size // 4
+        return self.router.route(kind, output_tokens, len(files))
+    
+    def _create(self, route, **request):
+        """Chat completion with `route`'s model settings, queued in this session's rate-limit lane
+        
+        Latency, tokens and cost of the call are added to the route's totals in the metrics.
+        """
+        request.update(model=route.model, temperature=route.temperature)
+        if route.max_tokens:
+            request["max_tokens"] = route.max_tokens
+        start = time.perf_counter()
+        response = self.backend.create(lane=self.lane, session=id(self), **request)
+        if request.get("stream"):
+            return self._measured_stream(response, route, start)
+        self._record_route(route, start, response.usage)
+        return response
+    
+    def _measured_stream(self, chunks, route, start):
+        usage = None
+        try:
+            for chunk in chunks:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                yield chunk
+        finally:
+            self._record_route(route, start, usage)
+    
+    def _record_route(self, route, start, usage):
+        """Add one call's latency, tokens and cost to the current call's per-route totals"""
+        if self.current_call is None:
+            return
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        cost = self.router.cost(route.model, usage) if usage is not None else None
+        with self._route_lock:
+            stats = self.current_call.setdefault("routes", {}).setdefault(route.name, {
+                "model": route.model, "calls": 0, "ms": [], "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+            })
+            stats["calls"] += 1
+            stats["ms"].append(elapsed_ms)
+            if usage is not None:
+                stats["prompt_tokens"] += usage.prompt_tokens
+                stats["completion_tokens"] += usage.completion_tokens
+            if cost:
+                stats["cost_usd"] = round(stats["cost_usd"] + cost, 6)
+    
+    @property
+    def conversation_history(self):
+        """Compacted conversation turns (see HistoryManager)"""
+        return self.history.turns
+        
+    def get_relevant_templates(self, user_prompt, max_templates=MAX_TEMPLATES, token_budget=TEMPLATE_TOKEN_BUDGET):
+        """Select the most relevant template examples that fit the token budget"""
+        ranked = rank_templates(user_prompt)
+        
+        # If no specific match, include landing page as default
+        if not ranked:
+            ranked = ["landing"]
         
-    def get_relevant_templates(self, user_prompt):
-        """Select relevant template examples based on user prompt"""
-        prompt_lower = user_prompt.lower()
         selected_templates = []
+        used_tokens = 0
+        for key in ranked:
+            if len(selected_templates) == max_templates:
+                break
+            code = TEMPLATE_EXAMPLES[key]
+            cost = estimate_tokens(code)
+            # The best match is always included, the rest only while they fit
+            if selected_templates and used_tokens + cost > token_budget:
+                continue
+            selected_templates.append((TEMPLATE_KEYWORDS[key][0], code))
+            used_tokens += cost
+        
+        return selected_templates
+        
+    def _prepare_generation(self, user_prompt, keep_templates=False):
+        """Record the prompt and build the request messages
+        
+        Returns (messages, cache_key, cached_message, route); cached_message is None
+        unless an identical earlier generation is in the cache.
+        """
+        with self._phase("prompt_assembly"):
+            route = self._route("modify" if keep_templates else "generate", user_prompt)
+            messages, relevant_templates = self._build_generation_messages(user_prompt, keep_templates)
+        self._note(templates=[name for name, _ in relevant_templates], route=route.name)
+        
+        # Look up an identical earlier generation before calling the API
+        cache_key = None
+        assistant_message = None
+        if self.cache:
+            with self._phase("cache_lookup"):
+                cache_key = self.cache.make_key(
+                    user_prompt,
+                    [name for name, _ in relevant_templates],
+                    route.model,
+                    route.temperature,
+                    messages[2:-1],
+                )
+                assistant_message = self.cache.get(cache_key)
+        self._note(cache_hit=assistant_message is not None)
+        
+        return messages, cache_key, assistant_message, route
+    
+    def _build_generation_messages(self, user_prompt, keep_templates=False):
+        """Add the prompt to history and assemble the messages; returns (messages, templates)"""
+        # Add user message to history
+        self.history.add_user(user_prompt)
+        
+        prefix_messages, relevant_templates = self._prompt_prefix(user_prompt, keep_templates)
+        
+        # Prepare messages for OpenAI API
+        # Invariant instructions first, then template examples, then the session-specific turns
+        messages = self.history.build_messages(prefix_messages, self.project_files)
+        return messages, relevant_templates
+    
+    def _prompt_prefix(self, user_prompt, keep_templates=False):
+        """System prompt plus template examples; returns (prefix_messages, templates)"""
+        # Get relevant template examples, in a fixed order so the same set always gives the same text
+        if keep_templates and self.session_templates:
+            # Modifications reuse the session's examples so the cached prompt prefix stays valid
+            relevant_templates = self.session_templates
+        else:
+            relevant_templates = sorted(
+                self.get_relevant_templates(user_prompt),
+                key=lambda template: TEMPLATE_PRIORITY[TEMPLATE_NAME_KEYS[template[0]]]
+            )
+            self.session_templates = relevant_templates
+        template_note = f"{TEMPLATE_COMPACT_NOTE}\n\n" if TEMPLATE_EXAMPLES.compact else ""
+        template_context = "\n\n".join([
+            f"=== {name} Template Example ===\n{code}" 
+            for name, code in relevant_templates
+        ])
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "system", "content": f"IMPORTANT TEMPLATE EXAMPLES TO LEARN FROM:\n{template_note}{template_context}"},
+        ], relevant_templates
+    
+    @instrumented("generate")
+    def generate_website(self, user_prompt, stream=False, output_dir=None, keep_templates=False):
+        """Main function to generate website from user prompt
+        
+        With stream=True files are added to project_files as soon as each one
+        is received, and written under output_dir right away if it is given;
+        the finished project is then saved there with save_project.
+        keep_templates reuses the template examples chosen earlier in the session.
+        """
+        starts_project = not self.project_files and not keep_templates
+        if starts_project and self.fast_path:
+            result = self._render_locally(user_prompt)
+            if result is not None:
+                return result
+        
+        messages, cache_key, assistant_message, route = self._prepare_generation(user_prompt, keep_templates)
+        
+        from_cache = assistant_message is not None
+        if not from_cache and starts_project and self.similar is not None:
+            messages = self._seed_with_similar(user_prompt, messages)
+        
+        parsed = None
+        if from_cache:
+            print("\n⚡ Using cached generation\n")
+        elif stream:
+            print("\n🤖 AI Agent is analyzing requirements and studying templates...\n")
+            try:
+                parsed = self._stream_completion(messages, route, output_dir)
+            except json.JSONDecodeError:
+                print("❌ Error: Could not parse AI response")
+                return None
+            
+            # Keep the parsed object and re-serialize it rather than holding the raw stream text
+            assistant_message = json.dumps(parsed)
+        else:
+            print("\n🤖 AI Agent is analyzing requirements and studying templates...\n")
+            
+            # Call OpenAI API
+            with self._phase("network"):
+                response = self._create(
+                    route,
+                    messages=messages,
+                    response_format={"type": "json_object"}
+                )
+            
+            # Get the response
+            assistant_message = response.choices[0].message.content
+            self._record_usage(response.usage)
+            if response.choices[0].finish_reason == "length":
+                parsed = self._continue_truncated(messages, route, *salvage_json(assistant_message))
+                assistant_message = json.dumps(parsed)
         
-        # Check which templates are relevant
-        if any(word in prompt_lower for word in ['cake', 'bakery', 'sweet', 'dessert', 'pastry']):
-            selected_templates.append(('Cake Shop', TEMPLATE_EXAMPLES['cake_shop']))
+        result = self._finish_generation(assistant_message, cache_key, from_cache, parsed)
+        if result is not None and stream and output_dir:
+            # Files streamed early are drafts; save the validated project with its manifest over them
+            self.save_project(output_dir)
+        if result is not None and starts_project and not from_cache and cache_key and self.similar is not None:
+            self.similar.add(user_prompt, cache_key)
+        return result
+    
+    def _render_locally(self, user_prompt):
+        """Build a simple site from its template without a model call; None when the prompt needs the model"""
+        with self._phase("fast_path"):
+            spec = extract_fast_path(user_prompt)
+            if spec is None:
+                return None
+            files = render_fast_path(spec)
         
-        if any(word in prompt_lower for word in ['shop', 'store', 'ecommerce', 'e-commerce', 'cart', 'product', 'buy', 'sell']):
-            selected_templates.append(('E-Commerce', TEMPLATE_EXAMPLES['ecommerce']))
+        name = TEMPLATE_KEYWORDS[spec["template"]][0]
+        print(f"\n🏎️  Simple request: building it from the {name} template without a model call\n")
+        result = {
+            "project_name": re.sub(r"[^a-z0-9]+", "-", spec["brand"].lower()).strip("-") or spec["template"],
+            "needs_backend": False,
+            "backend_requirements": "",
+            "files": files,
+            "description": f"{spec['brand']} built from the {name} template",
+        }
+        self.history.add_user(user_prompt)
+        self.session_templates = [(name, TEMPLATE_EXAMPLES[spec["template"]])]
+        self.served_locally = True
+        self._note(fast_path=spec["template"], templates=[name])
+        return self._finish_generation(json.dumps(result), parsed=result)
+    
+    def _seed_with_similar(self, user_prompt, messages):
+        """Messages with the nearest earlier site added as a reference before the request
         
-        if any(word in prompt_lower for word in ['landing', 'saas', 'service', 'features', 'pricing', 'startup']):
-            selected_templates.append(('Landing Page', TEMPLATE_EXAMPLES['landing']))
+        The new site is still generated in full; the earlier one only gives the model a
+        structure to follow. Returns messages unchanged when no earlier site is close enough.
+        """
+        with self._phase("similar_lookup"):
+            for match in self.similar.lookup(user_prompt):
+                earlier_message = self.cache.peek(match["key"])
+                if earlier_message is not None:
+                    break
+            else:
+                return messages
+            try:
+                earlier_files = json.loads(earlier_message)["files"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                return messages
         
-        if any(word in prompt_lower for word in ['portfolio', 'showcase', 'work', 'projects', 'designer', 'developer', 'artist']):
-            selected_templates.append(('Portfolio', TEMPLATE_EXAMPLES['portfolio']))
+        print(f"\n♻️  Using a similar earlier site as a reference ({match['similarity']:.0%} match): \"{match['prompt']}\"\n")
+        self._note(reused_from=match["key"], similarity=round(match["similarity"], 3))
+        seed = SIMILAR_SEED_PROMPT.format(prompt=match["prompt"], files=json.dumps(earlier_files))
+        return messages[:-1] + [{"role": "user", "content": seed}] + messages[-1:]
+    
+    @instrumented("generate")
+    def plan_and_generate(self, user_prompt, max_workers=FAN_OUT_WORKERS):
+        """Generate a multi-page site with a planning call, then one concurrent request per file
         
-        # If no specific match, include landing page as default
-        if not selected_templates:
-            selected_templates.append(('Landing Page', TEMPLATE_EXAMPLES['landing']))
+        Wall time approaches the slowest single file instead of the sum of all files.
+        """
+        self._note(mode="plan")
+        self.history.add_user(user_prompt)
         
-        return selected_templates
+        print("\n🗺️  AI Agent is planning the site map and design...\n")
+        with self._phase("planning"):
+            response = self._create(
+                self._route("plan"),
+                messages=[
+                    {"role": "system", "content": PLAN_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format={"type": "json_object"}
+            )
+        self._record_usage(response.usage)
+        try:
+            plan = json.loads(response.choices[0].message.content)
+        except json.JSONDecodeError:
+            print("❌ Error: Could not parse site plan")
+            return None
         
-    def generate_website(self, user_prompt):
-        """Main function to generate website from user prompt"""
+        planned_files = plan.get("files", {})
+        print(f"📋 Planned {len(planned_files)} file(s): {', '.join(planned_files)}\n")
         
-        # Add user message to history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_prompt
-        })
+        # Every file request shares the same cacheable prefix and the same plan
+        prefix_messages, relevant_templates = self._prompt_prefix(user_prompt)
+        self._note(templates=[name for name, _ in relevant_templates])
+        plan_text = json.dumps({key: value for key, value in plan.items() if key != "files"})
         
-        # Get relevant template examples
-        relevant_templates = self.get_relevant_templates(user_prompt)
-        template_context = "\n\n".join([
-            f"=== {name} Template Example ===\n{code}" 
-            for name, code in relevant_templates
-        ])
+        def generate_file(filename):
+            return self._request_file(filename, prefix_messages, (
+                f"WEBSITE REQUEST: {user_prompt}\n\n"
+                f"SITE PLAN (follow it exactly):\n{plan_text}\n\n"
+                f"ALL FILES: {json.dumps(planned_files)}\n\n"
+                f"Generate ONLY the file \"{filename}\". Its \"files\" object must contain just that one file."
+            ))
         
-        # System prompt for the AI agent with few-shot examples
-        system_prompt = f"""You are an expert web developer AI agent. Your job is to:
-1. Understand user requirements for websites
-2. Generate complete, production-ready HTML, CSS, and JavaScript code
-3. Create modern, responsive, and accessible websites using Tailwind CSS
-4. Learn from the template examples provided and generate similar quality code
-5. Identify if backend is needed
-6. Return code in a structured JSON format
-
-IMPORTANT TEMPLATE EXAMPLES TO LEARN FROM:
-{template_context}
-
-Study these examples carefully! They demonstrate:
-- Proper HTML structure and semantic markup
-- Tailwind CSS usage for styling
-- JavaScript for interactivity
-- Responsive design patterns
-- Component organization
-- Cart functionality for e-commerce
-- Form handling
-- Modal dialogs
-- Navigation patterns
-- Layout best practices
-
-When generating code, return a JSON object with this structure:
-{{
-    "project_name": "project-name",
-    "needs_backend": true/false,
-    "backend_requirements": "Brief description of what backend features are needed (if any)",
-    "files": {{
-        "index.html": "HTML content here",
-        "cart.html": "Additional pages if needed",
-        "checkout.html": "More pages as required",
-        "styles.css": "Custom CSS if needed beyond Tailwind",
-        "script.js": "JavaScript for functionality"
-    }},
-    "description": "Brief description of what was created"
-}}
-
-Set "needs_backend" to TRUE if the website requires:
-- Database (storing products, users, orders, etc.)
-- User authentication/login
-- Payment processing
-- Server-side operations
-- API integration
-- Real-time features
-- Order management
-- Email sending
-- Admin panels with data persistence
-
-IMPORTANT CODE QUALITY REQUIREMENTS:
-1. Use Tailwind CSS CDN: <script src="https://cdn.tailwindcss.com"></script>
-2. Make it fully responsive (mobile-first approach)
-3. Include proper semantic HTML5 tags
-4. Add accessibility features (ARIA labels, alt tags, proper form labels)
-5. DO NOT use localStorage or sessionStorage - use JavaScript variables for cart/data
-6. Include smooth transitions and hover effects
-7. Add clear comments explaining functionality
-8. For e-commerce: Implement full cart functionality like the example
-9. Use modern JavaScript (ES6+) with arrow functions, template literals
-10. Ensure clean, readable, well-organized code
-11. Add proper error handling for forms
-12. Include loading states for buttons when appropriate
-
-STYLING GUIDELINES:
-- Use consistent color schemes (primary, secondary, accent colors)
-- Proper spacing and typography hierarchy
-- Smooth transitions (transition-all duration-300)
-- Hover effects on interactive elements
-- Shadow effects for depth (shadow-md, shadow-lg)
-- Rounded corners for modern look (rounded-lg, rounded-xl)
-- Gradient backgrounds where appropriate
-- Proper contrast for accessibility
-
-FUNCTIONAL REQUIREMENTS:
-- All forms should have validation
-- Buttons should have hover and active states
-- Navigation should be sticky or fixed
-- Mobile menu for responsive navigation
-- Shopping carts should use JavaScript variables (NOT localStorage)
-- Modals should have backdrop and close buttons
-- Images should be lazy-loaded where possible
-- Add smooth scroll behavior
-
-Make websites visually stunning and highly functional!"""
-
-        # Prepare messages for OpenAI API
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ] + self.conversation_history
+        files = {}
+        missing = []
+        with self._phase("fan_out"):
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(planned_files)))) as executor:
+                futures = {executor.submit(generate_file, filename): filename for filename in planned_files}
+                for future, planned in futures.items():
+                    # One failed page must not throw away the pages already paid for
+                    try:
+                        filename, content, usage = future.result()
+                    except Exception as e:
+                        print(f"⚠️  {planned} could not be generated: {e}")
+                        missing.append(planned)
+                        continue
+                    self._record_usage(usage)
+                    files[filename] = content
+                    print(f"📄 Received {filename} ({len(content)} chars)")
+        if missing:
+            self._note(missing_files=missing)
+            print(f"⚠️  Missing {len(missing)} of {len(planned_files)} planned file(s): {', '.join(missing)}")
+        if not files:
+            print("❌ Error: No file of the plan could be generated")
+            return None
         
-        print("\n🤖 AI Agent is analyzing requirements and studying templates...\n")
+        result = {
+            "project_name": plan.get("project_name"),
+            "needs_backend": plan.get("needs_backend", False),
+            "backend_requirements": plan.get("backend_requirements", ""),
+            "files": files,
+            "description": plan.get("description", "Website generated successfully"),
+        }
+        if result["project_name"] is None:
+            del result["project_name"]
+        print()
+        return self._finish_generation(json.dumps(result), parsed=result)
+    
+    def _request_file(self, filename, prefix_messages, instructions):
+        """Ask for a single file; returns (filename, content, usage)
         
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
+        A reply cut off at the output limit is completed with continuation requests.
+        Raises ValueError when the reply holds no file.
+        """
+        route = self._route("file")
+        messages = prefix_messages + [{"role": "user", "content": instructions}]
+        response = self._create(
+            route,
             messages=messages,
-            temperature=0.7,
             response_format={"type": "json_object"}
         )
+        content = response.choices[0].message.content
+        if response.choices[0].finish_reason == "length":
+            reply = self._continue_truncated(messages, route, *salvage_json(content), on_file=lambda *_: None)
+        else:
+            reply = json.loads(content)
+        files = {name: body for name, body in (reply or {}).get("files", {}).items() if isinstance(body, str) and body}
+        if not files:
+            raise ValueError(f"the reply did not contain {filename}")
+        return filename, files.get(filename, next(iter(files.values()))), response.usage
+    
+    def validate_project(self, repair=True):
+        """Check every file (markup, scripts, links between pages) and regenerate only the failing ones
         
-        # Get the response
-        assistant_message = response.choices[0].message.content
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": assistant_message
-        })
+        Returns the problems left afterwards as {filename: [(kind, message)]}.
+        """
+        start = time.perf_counter()
+        with self._phase("validate"):
+            problems = validate_files(self.project_files)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if not problems:
+            print(f"🔎 Validated {len(self.project_files)} file(s) in {elapsed_ms:.0f} ms: no problems\n")
+            return {}
+        
+        for filename, file_problems in problems.items():
+            for kind, message in file_problems:
+                print(f"⚠️  {filename}: {'links to missing ' if kind == 'missing' else ''}{message}")
+        self._note(validation_problems=sum(len(file_problems) for file_problems in problems.values()))
+        if repair:
+            self._repair_files(problems)
+            with self._phase("validate"):
+                problems = validate_files(self.project_files)
+            for filename in problems:
+                print(f"⚠️  {filename} still has problems after regeneration")
+        print()
+        return problems
+    
+    def _repair_files(self, problems, max_workers=FAN_OUT_WORKERS):
+        """Regenerate broken files and create missing link targets, one concurrent request per file"""
+        broken = {}
+        missing = {}
+        for filename, file_problems in problems.items():
+            for kind, message in file_problems:
+                if kind == "missing":
+                    missing.setdefault(message, []).append(filename)
+                else:
+                    broken.setdefault(filename, []).append(message)
+        
+        prefix_messages, _ = self._prompt_prefix("", keep_templates=True)
+        file_list = f"PROJECT FILES: {', '.join(self.project_files)}\n\n"
+        requests = {}
+        for filename, messages in broken.items():
+            requests[filename] = (
+                file_list + f"The file \"{filename}\" has these problems:\n"
+                + "".join(f"- {message}\n" for message in messages)
+                + f"\nCurrent content:\n{self.project_files[filename]}\n\n"
+                f"Return the corrected \"{filename}\" in full. Its \"files\" object must contain just that one file."
+            )
+        for filename, referrers in missing.items():
+            requests[filename] = (
+                file_list + f"\"{filename}\" is linked from {', '.join(referrers)} but was never generated.\n\n"
+                f"{referrers[0]}:\n{self.project_files[referrers[0]]}\n\n"
+                f"Generate ONLY \"{filename}\", matching the rest of the site. "
+                f"Its \"files\" object must contain just that one file."
+            )
+        
+        print(f"🔧 Regenerating {len(requests)} file(s): {', '.join(requests)}")
+        self._note(repaired_files=list(requests))
+        with self._phase("repair"):
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(requests)))) as executor:
+                futures = [
+                    executor.submit(self._request_file, filename, prefix_messages, instructions)
+                    for filename, instructions in requests.items()
+                ]
+                for future in futures:
+                    try:
+                        filename, content, usage = future.result()
+                    except Exception as e:
+                        print(f"⚠️  A file could not be regenerated: {e}")
+                        continue
+                    self._record_usage(usage)
+                    if content:
+                        self.project_files[filename] = content
+                        print(f"📄 Regenerated {filename} ({len(content)} chars)")
+    
+    async def agenerate_website(self, user_prompt, async_client):
+        """Generate a website using an AsyncOpenAI client, for concurrent batch runs"""
+        with metrics_call(self, "generate"):
+            return await self._agenerate(user_prompt, async_client)
+    
+    async def _agenerate(self, user_prompt, async_client):
+        import asyncio
+        if not self.project_files and self.fast_path:
+            result = await asyncio.to_thread(self._render_locally, user_prompt)
+            if result is not None:
+                return result
+        
+        messages, cache_key, assistant_message, route = self._prepare_generation(user_prompt)
+        
+        from_cache = assistant_message is not None
+        if not from_cache:
+            request = {
+                "model": route.model,
+                "messages": messages,
+                "temperature": route.temperature,
+                "response_format": {"type": "json_object"},
+            }
+            if route.max_tokens:
+                request["max_tokens"] = route.max_tokens
+            # Queued, retried and backed off by the backend like every synchronous call
+            start = time.perf_counter()
+            response = await self.backend.acreate(async_client, self.lane, id(self), **request)
+            self._record_route(route, start, response.usage)
+            assistant_message = response.choices[0].message.content
+            self._record_usage(response.usage)
+            if response.choices[0].finish_reason == "length":
+                parsed = await asyncio.to_thread(self._continue_truncated, messages, route, *salvage_json(assistant_message))
+                assistant_message = json.dumps(parsed)
+        
+        # Validation may regenerate files with blocking calls, so keep it off the event loop
+        return await asyncio.to_thread(self._finish_generation, assistant_message, cache_key, from_cache)
+    
+    def _continue_truncated(self, messages, route, partial, open_file=None, on_file=None):
+        """Complete a reply cut off at the output limit by requesting only the files still missing
+        
+        partial is the object parsed from the cut-off reply, made through route, and open_file
+        the file it ended in.
+        Returns partial with the remaining files merged in; on_file(filename, content) is called
+        for each of them.
+        """
+        result = partial if isinstance(partial, dict) else {}
+        files = result.setdefault("files", {})
+        for attempt in range(1, MAX_CONTINUATIONS + 1):
+            cut_off = f" {open_file} was cut off and has to be sent again." if open_file else ""
+            print(f"✂️  Reply cut off at the output limit after {len(files)} complete file(s); requesting the rest...")
+            request = messages + [
+                {"role": "assistant", "content": json.dumps(result)},
+                {"role": "user", "content": CONTINUE_PROMPT.format(received=", ".join(files) or "none", cut_off=cut_off)},
+            ]
+            with self._phase("continuation"):
+                response = self._create(
+                    route,
+                    messages=request,
+                    response_format={"type": "json_object"}
+                )
+            self._record_usage(response.usage)
+            
+            content = response.choices[0].message.content
+            truncated = response.choices[0].finish_reason == "length"
+            reply, open_file = salvage_json(content)
+            received = {
+                filename: body for filename, body in (reply or {}).get("files", {}).items()
+                if isinstance(body, str) and filename not in files
+            }
+            for filename, body in received.items():
+                files[filename] = body
+                if on_file:
+                    on_file(filename, body)
+                else:
+                    print(f"📄 Received {filename} ({len(body)} chars)")
+            
+            # Stop once the model says the site is complete, or when a reply brought nothing new
+            if not truncated and (reply or {}).get("complete", True) is not False:
+                break
+            if not received:
+                print(f"⚠️  No further complete files after {attempt} continuation(s)")
+                break
+        self._note(continuations=attempt)
+        return result
+    
+    def _finish_generation(self, assistant_message, cache_key=None, from_cache=False, parsed=None):
+        """Record the model reply and update the project from it
+        
+        Fresh replies are validated and repaired before they are cached, so a cache hit
+        is used as stored, without validation or repair calls.
+        """
+        self._note(output_chars=len(assistant_message))
         
         # Parse the JSON response
         try:
-            result = json.loads(assistant_message)
-            self.project_name = result.get("project_name", f"website-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+            with self._phase("json_parse"):
+                result = parsed if parsed is not None else json.loads(assistant_message)
             self.project_files = result.get("files", {})
+            if VALIDATE_OUTPUT and not from_cache:
+                files_before = dict(self.project_files)
+                self.validate_project()
+                if self.project_files != files_before:
+                    result["files"] = self.project_files
+                    assistant_message = json.dumps(result)
+            self.history.add_assistant(assistant_message, result)
+            if cache_key and not from_cache:
+                self.cache.put(cache_key, assistant_message)
+            # The model picks the name, so keep it to one folder under the output directory
+            self.project_name = project_dir_name(result.get("project_name"))
             self.needs_backend = result.get("needs_backend", False)
             backend_requirements = result.get("backend_requirements", "")
             description = result.get("description", "Website generated successfully")
+            self._note(project_name=self.project_name, files=len(self.project_files))
             
             print(f"✅ {description}\n")
             print(f"📄 Generated {len(self.project_files)} file(s): {', '.join(self.project_files.keys())}\n")
+            result["files"] = self.project_files
+            if self.history.last_saved_tokens:
+                print(f"🗜️  History compacted: ~{self.history.last_saved_tokens} tokens saved this turn "
+                      f"(~{self.history.saved_tokens} total)\n")
             
             # Inform user about backend needs
             if self.needs_backend:
@@ -872,18 +3534,135 @@ Make websites visually stunning and highly functional!"""
             return result
             
         except json.JSONDecodeError:
+            self.history.add_assistant(assistant_message)
             print("❌ Error: Could not parse AI response")
             return None
     
-    def save_project(self, output_dir="output"):
-        """Save the generated project to disk"""
+    def _share_layout(self, files):
+        """Hoist headers, navs, footers and functions repeated across pages into shared files"""
+        with self._phase("shared_layout"):
+            shared, report = extract_shared_layout(files)
+        if not report:
+            return files
+        
+        before = sum(len(content.encode("utf-8")) for content in files.values())
+        after = sum(len(content.encode("utf-8")) for content in shared.values())
+        for filename, count, size in report:
+            print(f"🧩 {filename}: shared by {count} page(s), {size:,} bytes")
+        print(f"🧩 Shared layout: {before:,} → {after:,} bytes\n")
+        self._note(shared_files=[filename for filename, _, _ in report], bytes_before_layout=before, bytes_after_layout=after)
+        return shared
+    
+    def _stream_completion(self, messages, route, output_dir=None):
+        """Stream a completion and return the parsed result, emitting files as they close"""
+        start = time.time()
+        parser = None
+        unwritten = []
+        
+        def write_file(filename, content):
+            file_path = contained_path(os.path.join(output_dir, project_dir_name(parser.result["project_name"])), filename)
+            if file_path is None:
+                print(f"⚠️  Skipped unsafe path: {filename}")
+                return
+            write_file_atomic(file_path, content)
+        
+        def on_file(filename, content):
+            self.project_files[filename] = content
+            print(f"📄 Received {filename} ({len(content)} chars) after {time.time() - start:.1f}s")
+            if not output_dir:
+                return
+            if parser.result.get("project_name"):
+                for pending in unwritten:
+                    write_file(pending, self.project_files[pending])
+                unwritten.clear()
+                write_file(filename, content)
+            else:
+                unwritten.append(filename)
+        
+        parser = StreamingJSONParser(on_file=on_file)
+        with self._phase("network"):
+            response = self._create(
+                route,
+                messages=messages,
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            first_token = True
+            finish_reason = None
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token:
+                        self._note(ttft_ms=round((time.time() - start) * 1000, 1))
+                        first_token = False
+                    parser.feed(chunk.choices[0].delta.content)
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if getattr(chunk, "usage", None):
+                    self._record_usage(chunk.usage)
+        if finish_reason == "length":
+            result = self._continue_truncated(messages, route, *parser.partial(), on_file=on_file)
+        else:
+            result = parser.close()
+        
+        # Files that arrived before the project name are written once it is known
+        if output_dir and unwritten:
+            result.setdefault("project_name", f"website-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+            for filename in unwritten:
+                write_file(filename, self.project_files[filename])
+        
+        print(f"⏱️  Stream finished in {time.time() - start:.1f}s\n")
+        return result
+    
+    @instrumented("save")
+    def save_project(self, output_dir="output", optimize=False, keep_readable=False, static_css=STATIC_CSS,
+                     shared_layout=SHARED_LAYOUT):
+        """Save the generated project to disk
+        
+        With static_css=True pages link a purged tailwind.css instead of compiling
+        Tailwind in the browser. With shared_layout=True repeated headers, navs, footers
+        and functions are written once as shared files; project_files keep them inline.
+        With optimize=True HTML, CSS and JS are minified on the way out; keep_readable
+        also saves the original files under readable/.
+        """
         if not self.project_files:
             print("❌ No project to save. Generate a website first.")
             return
         
         # Create project directory
-        project_path = os.path.join(output_dir, self.project_name)
+        project_path = contained_path(output_dir, self.project_name or "")
+        if project_path is None or project_path == os.path.normpath(output_dir):
+            print(f"❌ Unsafe project name: {self.project_name}")
+            return
         os.makedirs(project_path, exist_ok=True)
+        files_to_save = dict(self.project_files)
+        
+        if static_css:
+            with self._phase("static_css"):
+                files_to_save, unknown = apply_static_css(files_to_save)
+            if unknown:
+                print(f"⚠️  Keeping the Tailwind CDN: {len(unknown)} class(es) not in the offline utility table: "
+                      f"{', '.join(unknown[:10])}")
+                self._note(static_css_unknown=len(unknown))
+            elif STATIC_CSS_NAME in files_to_save and STATIC_CSS_NAME not in self.project_files:
+                css_bytes = len(files_to_save[STATIC_CSS_NAME].encode("utf-8"))
+                print(f"🎨 Built {STATIC_CSS_NAME}: {css_bytes:,} bytes, replaces the Tailwind CDN runtime")
+                self._note(static_css_bytes=css_bytes, static_css_unknown=0)
+        
+        if shared_layout:
+            files_to_save = self._share_layout(files_to_save)
+        
+        if optimize:
+            with self._phase("optimize"):
+                files_to_save, report = optimize_assets(files_to_save)
+            for filename, before, after in report:
+                print(f"🗜️  {filename}: {before:,} → {after:,} bytes ({(after - before) / max(before, 1):+.0%})")
+            total_before = sum(before for _, before, _ in report)
+            total_after = sum(after for _, _, after in report)
+            print(f"🗜️  Total: {total_before:,} → {total_after:,} bytes\n")
+            self._note(bytes_before_optimize=total_before, bytes_after_optimize=total_after)
+            if keep_readable:
+                files_to_save.update({f"readable/{name}": content for name, content in self.project_files.items()})
         
         # Create backend folder if needed
         if self.needs_backend:
@@ -932,21 +3711,58 @@ Make websites visually stunning and highly functional!"""
 - Add authentication logic if needed
 - Connect database queries to your backend
 """
-            with open(os.path.join(backend_path, "README.md"), "w", encoding="utf-8") as f:
-                f.write(readme_content)
-            
-            print(f"📁 Created backend folder: {backend_path}")
-            print(f"📄 Created backend/README.md with setup instructions\n")
+            files_to_save.setdefault("backend/README.md", readme_content)
+            print(f"📁 Backend folder: {backend_path} (see backend/README.md for setup instructions)\n")
         
-        # Save all files
-        for filename, content in self.project_files.items():
-            file_path = os.path.join(project_path, filename)
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            print(f"📄 Created: {file_path}")
+        # Only write files whose content changed since the last save
+        manifest_path = os.path.join(project_path, MANIFEST_NAME)
+        manifest = load_manifest(manifest_path)
+        pending = {}
+        unchanged = 0
+        for filename, content in files_to_save.items():
+            file_path = contained_path(project_path, filename)
+            if file_path is None:
+                print(f"⚠️  Skipped unsafe path: {filename}")
+                continue
+            digest = content_hash(content)
+            if manifest.get(filename) == digest and os.path.exists(file_path):
+                unchanged += 1
+                continue
+            pending[filename] = (file_path, content, digest)
+        
+        # Independent files are flushed concurrently
+        written = []
+        if pending:
+            with self._phase("disk_write"):
+                with ThreadPoolExecutor(max_workers=min(SAVE_WORKERS, len(pending))) as executor:
+                    futures = {
+                        executor.submit(write_file_atomic, file_path, content): filename
+                        for filename, (file_path, content, _) in pending.items()
+                    }
+                    for future, filename in futures.items():
+                        future.result()
+                        file_path, _, digest = pending[filename]
+                        manifest[filename] = digest
+                        written.append(file_path)
+                        print(f"📄 Saved: {file_path}")
+                
+                # Forget files that are no longer part of the project
+                manifest = {name: digest for name, digest in manifest.items() if name in files_to_save}
+                write_file_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True))
+        
+        self._note(
+            project_name=self.project_name,
+            files=len(files_to_save),
+            files_written=len(written),
+            bytes_written=sum(len(content.encode("utf-8")) for _, content, _ in pending.values()),
+        )
+        
+        if unchanged:
+            print(f"⏭️  {unchanged} unchanged file(s) skipped")
         
         print(f"\n✅ Project saved to: {project_path}")
         print(f"💡 Open {os.path.join(project_path, 'index.html')} in your browser to view the website\n")
+        return written
     
     def preview_file(self, filename):
         """Preview a generated file"""
@@ -962,23 +3778,238 @@ Make websites visually stunning and highly functional!"""
             print("\n... (truncated, use 'save' to see full file)")
         print()
     
-    def modify_website(self, modification_request):
-        """Modify existing website based on user request"""
-        if not self.project_files:
-            print("❌ No project to modify. Generate a website first.")
+    def _record_usage(self, usage):
+        """Remember token usage of a call, including prompt tokens served from the provider cache"""
+        self.last_usage = usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        self.usage_log.append({
+            "prompt_tokens": usage.prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": usage.completion_tokens,
+        })
+        if self.current_call is not None:
+            for key, value in self.usage_log[-1].items():
+                self.current_call[key] = self.current_call.get(key, 0) + value
+    
+    @contextmanager
+    def _phase(self, name):
+        """Time a phase of the current instrumented call (no-op outside one)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.current_call is not None:
+                phases = self.current_call["phases"]
+                phases[name] = round(phases.get(name, 0) + (time.perf_counter() - start) * 1000, 1)
+    
+    def _note(self, **fields):
+        """Attach fields to the current instrumented call (no-op outside one)"""
+        if self.current_call is not None:
+            self.current_call.update(fields)
+    
+    def save_snapshot(self, name=None, snapshot_dir=SNAPSHOT_DIR):
+        """Write the session state to a compressed snapshot and return its path
+        
+        Without a name the session keeps the snapshot it was saved to or resumed from;
+        a new session gets "<project_name>-<timestamp>", so it never replaces the
+        snapshot of an earlier session with the same project name. File bodies are stored once in a blob table keyed by content hash, and history
+        turns with the same text as a file point at the same blob.
+        """
+        import gzip
+        
+        blobs = {}
+        
+        def blob(content):
+            digest = content_hash(content)
+            blobs[digest] = content
+            return digest
+        
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "project_name": self.project_name,
+            "needs_backend": self.needs_backend,
+            "session_templates": [template_name for template_name, _ in self.session_templates or []],
+            "files": {filename: blob(content) for filename, content in self.project_files.items()},
+            "history": [
+                {"role": turn["role"], "blob": blob(turn["content"])} for turn in self.history.turns
+            ],
+            "saved_tokens": self.history.saved_tokens,
+            "blobs": blobs,
+        }
+        if name is None and self.snapshot_id is None:
+            stem = snapshot_name(f"{self.project_name or 'session'}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+            name, counter = stem, 2
+            while os.path.exists(os.path.join(snapshot_dir, name + SNAPSHOT_SUFFIX)):
+                name = f"{stem}-{counter}"
+                counter += 1
+        name = snapshot_name(name or self.snapshot_id)
+        path = os.path.join(snapshot_dir, name + SNAPSHOT_SUFFIX)
+        self.snapshot_id = name
+        write_file_atomic(path, gzip.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"), mtime=0))
+        return path
+    
+    @classmethod
+    def load_snapshot(cls, name, snapshot_dir=SNAPSHOT_DIR, **kwargs):
+        """Builder restored from a snapshot written by save_snapshot, without any API call
+        
+        name is a snapshot name, or a project name for its most recent snapshot.
+        """
+        import gzip
+        
+        name = snapshot_name(name)
+        if not os.path.exists(os.path.join(snapshot_dir, name + SNAPSHOT_SUFFIX)):
+            timestamped = re.compile(re.escape(name) + r"-\d{8}-\d{6}(?:-\d+)?")
+            name = next((found for found in list_snapshots(snapshot_dir) if timestamped.fullmatch(found)), name)
+        path = os.path.join(snapshot_dir, name + SNAPSHOT_SUFFIX)
+        with open(path, "rb") as f:
+            state = json.loads(gzip.decompress(f.read()))
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version: {state.get('version')}")
+        
+        blobs = state["blobs"]
+        builder = cls(**kwargs)
+        builder.snapshot_id = name
+        builder.project_name = state["project_name"]
+        builder.needs_backend = state["needs_backend"]
+        builder.project_files = {filename: blobs[digest] for filename, digest in state["files"].items()}
+        builder.history.turns = [{"role": turn["role"], "content": blobs[turn["blob"]]} for turn in state["history"]]
+        builder.history.saved_tokens = state["saved_tokens"]
+        builder.session_templates = [
+            (template_name, TEMPLATE_EXAMPLES[TEMPLATE_NAME_KEYS[template_name]])
+            for template_name in state["session_templates"] if template_name in TEMPLATE_NAME_KEYS
+        ] or None
+        return builder
+    
+    def cached_token_ratio(self):
+        """Share of prompt tokens served from the provider's prompt cache this session"""
+        prompt_tokens = sum(entry["prompt_tokens"] for entry in self.usage_log)
+        cached_tokens = sum(entry["cached_tokens"] for entry in self.usage_log)
+        return cached_tokens / prompt_tokens if prompt_tokens else 0.0
+    
+    def select_files_for_change(self, modification_request, max_files=MAX_EDIT_FILES):
+        """Pick the files a modification request most likely touches"""
+        request_lower = modification_request.lower()
+        
+        # Files named explicitly in the request win
+        named = [filename for filename in self.project_files if filename.lower() in request_lower]
+        if named:
+            return named
+        
+        # Otherwise rank files by how many of the request's words they contain
+        words = {
+            word for word in re.findall(r"[a-z][a-z0-9-]{3,}", request_lower)
+            if word not in EDIT_STOPWORDS
+        }
+        scored = []
+        for filename, content in self.project_files.items():
+            content_lower = content.lower()
+            score = sum(1 for word in words if word in content_lower)
+            if score:
+                scored.append((score, filename))
+        selected = [filename for _, filename in sorted(scored, key=lambda item: -item[0])[:max_files]]
+        
+        if not selected:
+            pages = [filename for filename in self.project_files if filename.endswith(".html")]
+            selected = ["index.html"] if "index.html" in self.project_files else pages[:1]
+        return selected or list(self.project_files)[:1]
+    
+    def _modify_with_edits(self, modification_request):
+        """Ask for search/replace edits to the relevant files only; None means fall back"""
+        with self._phase("prompt_assembly"):
+            targets = self.select_files_for_change(modification_request)
+            relevant_files = {filename: self.project_files[filename] for filename in targets}
+            user_message = (
+                f"All project files: {', '.join(self.project_files)}\n\n"
+                f"Relevant files:\n{json.dumps(relevant_files)}\n\n"
+                f"MODIFY REQUEST: {modification_request}"
+            )
+        
+        route = self._route("edit", files=relevant_files)
+        self._note(edit_files=targets, route=route.name)
+        
+        print(f"\n✏️  Requesting edits for: {', '.join(targets)}\n")
+        with self._phase("network"):
+            response = self._create(
+                route,
+                messages=[
+                    {"role": "system", "content": EDIT_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_message},
+                ],
+                response_format={"type": "json_object"}
+            )
+        assistant_message = response.choices[0].message.content
+        self._record_usage(response.usage)
+        self._note(output_chars=len(assistant_message))
+        
+        try:
+            with self._phase("json_parse"):
+                result = json.loads(assistant_message)
+        except json.JSONDecodeError:
+            print("⚠️  Could not parse edit response")
+            return None
+        
+        with self._phase("apply_edits"):
+            updated, conflicts = apply_search_replace_edits(self.project_files, result.get("edits", []))
+        if conflicts:
+            for conflict in conflicts:
+                print(f"⚠️  Edit conflict in {conflict}")
             return None
         
-        # Add modification request to conversation
-        modification_prompt = f"MODIFY REQUEST: {modification_request}\n\nCurrent project files:\n"
-        for filename in self.project_files.keys():
-            modification_prompt += f"- {filename}\n"
+        new_files = result.get("new_files", {})
+        updated.update(new_files)
+        self.project_files.update(updated)
+        if VALIDATE_OUTPUT:
+            self.validate_project()
+        description = result.get("description", "Website modified successfully")
         
-        self.conversation_history.append({
-            "role": "user",
-            "content": modification_prompt
+        # Keep the conversation in sync without storing file contents
+        self.history.add_user(f"MODIFY REQUEST: {modification_request}")
+        self.history.add_assistant(assistant_message, {
+            "project_name": self.project_name,
+            "needs_backend": self.needs_backend,
+            "description": description,
+            "files": updated,
         })
         
-        return self.generate_website(modification_request)
+        print(f"✅ {description}\n")
+        print(f"📄 Changed {len(updated)} file(s): {', '.join(updated) or 'none'}\n")
+        return {
+            "project_name": self.project_name,
+            "needs_backend": self.needs_backend,
+            "files": self.project_files,
+            "changed_files": list(updated),
+            "description": description,
+        }
+    
+    @instrumented("modify")
+    def modify_website(self, modification_request, stream=False, diff=False):
+        """Modify existing website based on user request
+        
+        With diff=True only the relevant files are sent and the model returns
+        search/replace edits; on any conflict the whole site is regenerated.
+        """
+        if not self.project_files:
+            print("❌ No project to modify. Generate a website first.")
+            return None
+        
+        if diff:
+            result = self._modify_with_edits(modification_request)
+            if result is not None:
+                return result
+            print("↩️  Falling back to full regeneration\n")
+        
+        # The current files are sent once by the history manager, so only the request is added here
+        return self.generate_website(f"MODIFY REQUEST: {modification_request}", stream=stream, keep_templates=True)
+
+def save_session(builder):
+    """Snapshot the REPL session on exit so it can be resumed later"""
+    if not builder.project_files:
+        return
+    path = builder.save_snapshot()
+    name = os.path.basename(path)[:-len(SNAPSHOT_SUFFIX)]
+    print(f"💾 Session saved ({os.path.getsize(path):,} bytes). Continue it later with: resume {name}")
+
 
 def main():
     """Main interactive loop"""
@@ -989,9 +4020,15 @@ def main():
     print("\n💡 Commands:")
     print("   - Type any website description to generate")
     print("   - 'save' - Save project to output folder")
+    print("   - 'save min' - Save minified project (readable copy in readable/)")
     print("   - 'preview' - View generated code")
+    print("   - 'plan: <description>' - Generate a multi-page site page by page, in parallel")
     print("   - 'modify: <changes>' - Update existing project")
     print("   - 'new' - Start fresh project")
+    print("   - 'resume <name>' - Continue a saved session (sessions are saved on quit)")
+    print("   - 'cache' - Show generation cache stats")
+    print("   - 'stats' - Show latency, token and per-route cost stats")
+    print("   - 'templates' - Show template example sizes before and after compaction")
     print("   - 'quit' - Exit")
     print("=" * 60)
     
@@ -1005,12 +4042,16 @@ def main():
                 continue
             
             if user_input.lower() == 'quit':
+                save_session(builder)
                 print("👋 Goodbye!")
                 break
             
             elif user_input.lower() == 'save':
                 builder.save_project()
             
+            elif user_input.lower() == 'save min':
+                builder.save_project(optimize=True, keep_readable=True)
+            
             elif user_input.lower() == 'preview':
                 if not builder.project_files:
                     print("❌ No project to preview. Generate a website first.")
@@ -1021,33 +4062,455 @@ def main():
                 file_choice = input("\n📄 Enter filename to preview: ").strip()
                 builder.preview_file(file_choice)
             
+            elif user_input.lower() == 'cache':
+                stats = generation_cache.stats()
+                print(f"⚡ Cache: {stats['hits']} hit(s), {stats['misses']} miss(es), "
+                      f"{stats['hit_rate']:.0%} hit rate")
+                print(f"🧊 Provider prompt cache: {builder.cached_token_ratio():.0%} of prompt tokens cached "
+                      f"over {len(builder.usage_log)} call(s)")
+                reuse = metrics_sink.reuse_summary()
+                print(f"♻️  Similar-prompt reuse: {reuse['reused']} of {reuse['generations']} generation(s) "
+                      f"({reuse['reuse_rate']:.0%}), ~{reuse['saved_ms'] / 1000:.0f}s saved")
+                local = metrics_sink.fast_path_summary()
+                print(f"🏎️  Local fast path: {local['local']} of {local['generations']} generation(s) "
+                      f"({local['hit_rate']:.0%}), p50 {local['p50_ms']:.0f} ms")
+            
+            elif user_input.lower() == 'stats':
+                summary = metrics_sink.summary()
+                if not summary:
+                    print("📊 No metrics recorded yet.")
+                for operation, numbers in summary.items():
+                    print(f"📊 {operation:<9} {numbers['calls']:4d} call(s)   "
+                          f"p50 {numbers['p50_ms'] / 1000:6.1f}s   p95 {numbers['p95_ms'] / 1000:6.1f}s   "
+                          f"~{numbers['avg_tokens']:.0f} tokens/call")
+                if builder.backend.limiter:
+                    limits = builder.backend.limiter.stats()
+                    print(f"🚦 Rate limits: {limits['limits']['requests'] or '?'} RPM, "
+                          f"{limits['limits']['tokens'] or '?'} TPM; {limits['waits']} request(s) waited "
+                          f"{limits['wait_s']:.1f}s in total")
+                for name, numbers in metrics_sink.route_summary().items():
+                    print(f"🧭 {name:<11} {numbers['model']:<13} {numbers['calls']:4d} call(s)   "
+                          f"p50 {numbers['p50_ms'] / 1000:6.1f}s   p95 {numbers['p95_ms'] / 1000:6.1f}s   "
+                          f"~{numbers['avg_tokens']:.0f} tokens/call   ${numbers['cost_usd']:.4f}")
+            
+            elif user_input.lower() == 'templates':
+                for name, tokens, compact_tokens in template_token_report():
+                    print(f"📏 {name:<10} ~{tokens:5d} tokens as written, ~{compact_tokens:5d} compacted "
+                          f"({(compact_tokens - tokens) / tokens:+.0%})")
+                if not TEMPLATE_EXAMPLES.compact:
+                    print("📏 Compaction is off (AI_WEB_BUILDER_COMPACT_TEMPLATES=0); examples are sent as written")
+            
             elif user_input.lower() == 'new':
                 builder = AIWebBuilder()
                 print("✨ Started new project!")
             
+            elif user_input.lower() == 'resume' or user_input.lower().startswith('resume '):
+                name = user_input[6:].strip()
+                if not name:
+                    snapshots = list_snapshots()
+                    print(f"💾 Saved sessions: {', '.join(snapshots)}" if snapshots else "💾 No saved sessions yet.")
+                    continue
+                try:
+                    start = time.perf_counter()
+                    builder = AIWebBuilder.load_snapshot(name)
+                except FileNotFoundError:
+                    print(f"❌ No saved session named '{name}'. Type 'resume' to list them.")
+                    continue
+                print(f"💾 Resumed '{builder.project_name}' with {len(builder.project_files)} file(s) "
+                      f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+            
+            elif user_input.lower().startswith('plan:'):
+                description = user_input[5:].strip()
+                if description:
+                    builder.plan_and_generate(description)
+                else:
+                    print("❌ Please describe the site. Example: plan: cake shop with menu, cart and checkout pages")
+            
             elif user_input.lower().startswith('modify:'):
                 modification = user_input[7:].strip()
                 if modification:
-                    builder.modify_website(modification)
+                    builder.modify_website(modification, stream=True, diff=True)
                 else:
                     print("❌ Please specify what to modify. Example: modify: make header sticky")
             
             else:
                 # Generate new website
-                builder.generate_website(user_input)
+                builder.generate_website(user_input, stream=True)
         
         except KeyboardInterrupt:
-            print("\n\n👋 Goodbye!")
+            print()
+            save_session(builder)
+            print("\n👋 Goodbye!")
             break
         except Exception as e:
             print(f"\n❌ Error: {e}")
             print("Please try again or type 'quit' to exit.")
 
+def load_batch_prompts(prompts_path):
+    """Read batch prompts from a JSONL file of {"id", "prompt"} objects or plain strings"""
+    prompts = []
+    with open(prompts_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                entry = {"prompt": entry}
+            entry.setdefault("id", str(line_number))
+            prompts.append(entry)
+    return prompts
+
+
+async def run_batch(prompts_path, concurrency=8, output_dir="output", manifest_path=None):
+    """Generate and save a site for every prompt in a JSONL file, several at a time"""
+    import asyncio
+    from openai import AsyncOpenAI
+    
+    prompts = load_batch_prompts(prompts_path)
+    async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    semaphore = asyncio.Semaphore(concurrency)
+    used_names = set()
+    
+    async def run_one(entry):
+        builder = AIWebBuilder(lane="batch")
+        record = {"id": entry["id"], "prompt": entry["prompt"], "status": "failed"}
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await builder.agenerate_website(entry["prompt"], async_client)
+                if result is not None:
+                    # Keep projects with the same generated name from overwriting each other
+                    if builder.project_name in used_names:
+                        builder.project_name = f"{builder.project_name}-{entry['id']}"
+                    used_names.add(builder.project_name)
+                    await asyncio.to_thread(builder.save_project, output_dir)
+                    record["status"] = "ok"
+                    record["project_name"] = builder.project_name
+                    record["files"] = len(builder.project_files)
+                    record["fast_path"] = builder.served_locally
+            except Exception as e:
+                record["status"] = "error"
+                record["error"] = str(e)
+            record["latency_s"] = round(time.perf_counter() - start, 3)
+        if builder.usage_log:
+            # Every call for this prompt, including continuations and validation repairs
+            record["prompt_tokens"] = sum(entry["prompt_tokens"] for entry in builder.usage_log)
+            record["completion_tokens"] = sum(entry["completion_tokens"] for entry in builder.usage_log)
+        return record
+    
+    batch_start = time.perf_counter()
+    results = await asyncio.gather(*(run_one(entry) for entry in prompts))
+    elapsed = time.perf_counter() - batch_start
+    
+    manifest = {
+        "prompts_file": prompts_path,
+        "concurrency": concurrency,
+        "total": len(results),
+        "succeeded": sum(1 for r in results if r["status"] == "ok"),
+        "fast_path": sum(1 for r in results if r.get("fast_path")),
+        "elapsed_s": round(elapsed, 3),
+        "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in results),
+        "completion_tokens": sum(r.get("completion_tokens", 0) for r in results),
+        "results": results,
+    }
+    manifest_path = manifest_path or os.path.join(output_dir, "batch_manifest.json")
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    
+    print(f"\n✅ Batch finished: {manifest['succeeded']}/{manifest['total']} site(s) in {elapsed:.1f}s")
+    if manifest["fast_path"]:
+        print(f"🏎️  {manifest['fast_path']} site(s) built locally from templates, without a model call")
+    print(f"📋 Manifest written to: {manifest_path}")
+    return manifest
+
+
+class SessionStore:
+    """Bounded LRU map of session id -> AIWebBuilder session; the least recently used is dropped when full"""
+
+    def __init__(self, max_sessions=SERVICE_MAX_SESSIONS, factory=None):
+        self.max_sessions = max_sessions
+        self.factory = factory or AIWebBuilder
+        self.sessions = OrderedDict()
+        self.evicted = 0
+
+    def get(self, session_id):
+        """Session (builder plus a lock serializing its operations), created on first use"""
+        if session_id in self.sessions:
+            self.sessions.move_to_end(session_id)
+            return self.sessions[session_id]
+        session = SimpleNamespace(builder=self.factory(), lock=None)  # lock is created on the event loop
+        self.sessions[session_id] = session
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.evicted += 1
+        return session
+
+    def __contains__(self, session_id):
+        return session_id in self.sessions
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class BuilderService:
+    """JSON-over-HTTP front end serving many builder sessions from one process
+
+    Routes (session ids are created on first use):
+        POST /sessions/<id>/generate   {"prompt": "...", "plan": false}
+        POST /sessions/<id>/modify     {"request": "...", "diff": true}
+        GET  /sessions/<id>/files/<filename>
+        POST /sessions/<id>/save       {"optimize": false}
+        GET  /health
+    
+    Builder calls run on a thread pool. At most max_in_flight run at once and up to
+    max_queue more wait; beyond that requests get 429 with Retry-After. Identical
+    requests to a session while one is in flight share its result, and a new session
+    asking for a prompt another session is already generating waits for it and then
+    reads the result from the response cache.
+    """
+
+    def __init__(self, output_dir="output", max_sessions=SERVICE_MAX_SESSIONS,
+                 max_in_flight=SERVICE_MAX_IN_FLIGHT, max_queue=SERVICE_MAX_QUEUE, builder_factory=None):
+        self.output_dir = output_dir
+        self.store = SessionStore(max_sessions, builder_factory)
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="builder")
+        self.admitted = 0
+        self.in_flight = {}  # coalescing key -> future of the running request
+        self.stats = {"requests": 0, "rejected": 0, "coalesced": 0, "errors": 0}
+        self._slots = None  # asyncio.Semaphore, created on the event loop
+
+    async def handle(self, method, path, body):
+        """Route one request; returns (status, payload, extra_headers)"""
+        import asyncio
+        
+        self.stats["requests"] += 1
+        if method == "GET" and path == "/health":
+            return 200, self.health(), {}
+        
+        match = re.fullmatch(r"/sessions/([A-Za-z0-9_-]{1,64})/(generate|modify|save|files/(.+))", path)
+        if not match:
+            return 404, {"error": "not found"}, {}
+        session_id, action, filename = match.group(1), match.group(2), match.group(3)
+        
+        if filename is not None:
+            from urllib.parse import unquote
+            
+            filename = unquote(filename)
+            if method != "GET":
+                return 405, {"error": "use GET"}, {}
+            session = self.store.sessions.get(session_id)
+            if session is None or filename not in session.builder.project_files:
+                return 404, {"error": f"file not found: {filename}"}, {}
+            return 200, {"filename": filename, "content": session.builder.project_files[filename]}, {}
+        
+        if method != "POST":
+            return 405, {"error": "use POST"}, {}
+        if action != "generate" and session_id not in self.store:
+            return 404, {"error": f"unknown session: {session_id}"}, {}
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            return 400, {"error": "body must be JSON"}, {}
+        if action in ("generate", "modify") and not str(request.get("prompt" if action == "generate" else "request", "")).strip():
+            return 400, {"error": "prompt is required" if action == "generate" else "request is required"}, {}
+        
+        # Identical requests to the same session share one run
+        key = (session_id, action, json.dumps(request, sort_keys=True))
+        if key in self.in_flight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self.in_flight[key])
+        
+        if self.admitted >= self.max_in_flight + self.max_queue:
+            self.stats["rejected"] += 1
+            return 429, {"error": "server busy, retry later"}, {"Retry-After": "1"}
+        
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        self.admitted += 1
+        try:
+            response = await self._run(session_id, action, request)
+        except Exception as e:
+            self.stats["errors"] += 1
+            response = (500, {"error": str(e)}, {})
+        finally:
+            self.admitted -= 1
+            del self.in_flight[key]
+        future.set_result(response)
+        return response
+
+    async def _run(self, session_id, action, request):
+        import asyncio
+        
+        session = self.store.get(session_id)
+        builder = session.builder
+        if session.lock is None:
+            session.lock = asyncio.Lock()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        
+        # A fresh generation of a prompt another session is producing right now waits for it,
+        # then finds the reply in the response cache instead of making a second API call
+        shared_key = None
+        if action == "generate" and not builder.project_files and builder.cache is not None:
+            shared_key = ("generate", " ".join(request["prompt"].lower().split()), bool(request.get("plan")))
+            if shared_key in self.in_flight:
+                self.stats["coalesced"] += 1
+                await asyncio.shield(self.in_flight[shared_key])
+                shared_key = None
+            else:
+                self.in_flight[shared_key] = asyncio.get_running_loop().create_future()
+        
+        try:
+            async with session.lock, self._slots:
+                call = functools.partial(self._call_builder, builder, session_id, action, request)
+                return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+        finally:
+            if shared_key is not None:
+                self.in_flight.pop(shared_key).set_result(None)
+
+    def _call_builder(self, builder, session_id, action, request):
+        """Run one builder operation on a worker thread; returns (status, payload, headers)"""
+        if action == "generate":
+            if request.get("plan"):
+                result = builder.plan_and_generate(request["prompt"])
+            else:
+                result = builder.generate_website(request["prompt"])
+        elif action == "modify":
+            result = builder.modify_website(request["request"], diff=request.get("diff", True))
+        else:
+            if not builder.project_files:
+                return 409, {"error": "nothing to save, generate a website first"}, {}
+            written = builder.save_project(os.path.join(self.output_dir, session_id), optimize=bool(request.get("optimize")))
+            return 200, {"project_name": builder.project_name, "written": written or []}, {}
+        
+        if result is None:
+            return 502, {"error": "the model reply could not be used"}, {}
+        return 200, {
+            "project_name": builder.project_name,
+            "description": result.get("description", ""),
+            "needs_backend": builder.needs_backend,
+            "files": {filename: len(content) for filename, content in builder.project_files.items()},
+        }, {}
+
+    def health(self):
+        return dict(
+            self.stats,
+            sessions=len(self.store),
+            sessions_evicted=self.store.evicted,
+            admitted=self.admitted,
+            max_in_flight=self.max_in_flight,
+            max_queue=self.max_queue,
+        )
+
+    async def _serve_connection(self, reader, writer):
+        """Minimal HTTP/1.1 loop: JSON bodies with Content-Length, keep-alive by default"""
+        import asyncio
+        from http import HTTPStatus
+        
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                
+                length = int(headers.get("content-length") or 0)
+                if length > SERVICE_MAX_BODY:
+                    status, payload, extra = 413, {"error": "request body too large"}, {}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload, extra = await self.handle(method.upper(), target.split("?", 1)[0], body)
+                    keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                
+                data = json.dumps(payload).encode("utf-8")
+                response_headers = {
+                    "Content-Type": "application/json",
+                    "Content-Length": str(len(data)),
+                    "Connection": "keep-alive" if keep_alive else "close",
+                    **extra,
+                }
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n".encode("latin-1")
+                    + "".join(f"{name}: {value}\r\n" for name, value in response_headers.items()).encode("latin-1")
+                    + b"\r\n" + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        """Serve until cancelled"""
+        import asyncio
+        
+        server = await asyncio.start_server(self._serve_connection, host, port, backlog=1024)
+        print(f"🌐 Serving on http://{host}:{port} "
+              f"(max {self.max_in_flight} in flight, {self.max_queue} queued, {self.store.max_sessions} sessions)")
+        async with server:
+            await server.serve_forever()
+
+
+def parse_args(argv=None):
+    """Parse command line options; no options starts the interactive loop"""
+    parser = argparse.ArgumentParser(description="AI Web Builder Agent")
+    parser.add_argument("--batch", metavar="PROMPTS_JSONL",
+                        help="generate a site for every prompt in a JSONL file, without the REPL")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="maximum number of generations in flight in batch mode (default: 8)")
+    parser.add_argument("--output", default="output",
+                        help="folder generated projects are saved to (default: output)")
+    parser.add_argument("--manifest",
+                        help="batch results manifest path (default: <output>/batch_manifest.json)")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="serve generate/modify/preview/save over HTTP instead of the REPL")
+    parser.add_argument("--max-sessions", type=int, default=SERVICE_MAX_SESSIONS,
+                        help=f"sessions kept in memory in service mode (default: {SERVICE_MAX_SESSIONS})")
+    parser.add_argument("--max-in-flight", type=int, default=SERVICE_MAX_IN_FLIGHT,
+                        help=f"builder calls running at once in service mode (default: {SERVICE_MAX_IN_FLIGHT})")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    args = parse_args()
+    
     # Check for OpenAI API key
     if not os.getenv("OPENAI_API_KEY"):
         print("❌ Error: OPENAI_API_KEY environment variable not set")
         print("💡 Set it with: export OPENAI_API_KEY='your-api-key-here'")
-        exit(1)
+        sys.exit(1)
     
-    main()
\ No newline at end of file
+    if args.batch:
+        import asyncio
+        asyncio.run(run_batch(args.batch, args.concurrency, args.output, args.manifest))
+    elif args.serve:
+        import asyncio
+        host, _, port = args.serve.rpartition(":")
+        threading.Thread(target=get_backend().warm, daemon=True).start()
+        service = BuilderService(args.output, args.max_sessions, args.max_in_flight)
+        try:
+            asyncio.run(service.serve(host or "127.0.0.1", int(port)))
+        except KeyboardInterrupt:
+            print("\n👋 Server stopped")
+    else:
+        # Open the API connection in the background while the user types
+        threading.Thread(target=get_backend().warm, daemon=True).start()
+        main()
@@ -0,0 +1,212 @@
+"""End-to-end benchmark of AIWebBuilder against the local mock OpenAI server
+
+Drives generate_website (plain and streaming), modify_website (diff mode) and
+save_project through benchmarks/mock_openai_server.py for several site sizes,
+then measures throughput with N concurrent sessions. Reports latency
+percentiles, time to first file, peak RSS and bytes written, stores the results
+under benchmarks/results/ and prints the change against the previous run.
+
+Usage: python benchmarks/bench_e2e.py [--iterations 5] [--sessions 1,4,16] [--latency 0.2]
+"""
+import io
+import os
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from datetime import datetime
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+from common import ROOT, load_builder_module
+from mock_openai_server import MockOpenAIServer
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Site sizes: (pages, bytes per page)
+SIZES = {
+    "small": (1, 4000),
+    "medium": (3, 8000),
+    "large": (8, 12000),
+}
+
+
+def summarize(samples):
+    """p50/p95/max of a list of seconds, in milliseconds"""
+    module = load_builder_module()
+    return {
+        "p50_ms": round(module.percentile(samples, 0.50) * 1000, 1),
+        "p95_ms": round(module.percentile(samples, 0.95) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+
+def directory_bytes(path):
+    return sum(
+        os.path.getsize(os.path.join(folder, name))
+        for folder, _, names in os.walk(path) for name in names
+    )
+
+
+def new_builder():
+    module = load_builder_module()
+    return module.AIWebBuilder(use_cache=False, record_metrics=False)
+
+
+def bench_size(iterations, output_dir):
+    """Sequential latency of each operation for the size the server is configured with"""
+    generate, stream, first_file, modify, save = [], [], [], [], []
+    for iteration in range(iterations):
+        builder = new_builder()
+        start = time.perf_counter()
+        builder.generate_website("Create a modern landing page for a bakery")
+        generate.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        builder.save_project(output_dir)
+        save.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        builder.modify_website("make the heading in index.html larger", diff=True)
+        modify.append(time.perf_counter() - start)
+
+        # Streaming: record when the first file becomes available
+        first = []
+
+        class FirstFileWatch(dict):
+            def __setitem__(self, key, value):
+                if not first:
+                    first.append(time.perf_counter() - start)
+                super().__setitem__(key, value)
+
+        streamed = new_builder()
+        streamed.project_files = FirstFileWatch()
+        start = time.perf_counter()
+        streamed.generate_website("Create a modern landing page for a bakery", stream=True)
+        stream.append(time.perf_counter() - start)
+        first_file.append(first[0] if first else stream[-1])
+
+    return {
+        "generate": summarize(generate),
+        "generate_stream": summarize(stream),
+        "time_to_first_file": summarize(first_file),
+        "modify_diff": summarize(modify),
+        "save": summarize(save),
+    }
+
+
+def bench_concurrency(sessions, output_dir):
+    """Run generate + save in `sessions` parallel builders and report sites per second"""
+    latencies = []
+
+    def session(index):
+        builder = new_builder()
+        start = time.perf_counter()
+        builder.generate_website(f"Create a portfolio site number {index}")
+        builder.project_name = f"{builder.project_name}-{index}"
+        builder.save_project(output_dir)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(session, range(sessions)))
+    elapsed = time.perf_counter() - start
+    return dict(summarize(latencies), sessions=sessions, sites_per_sec=round(sessions / elapsed, 2))
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_results():
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    runs = sorted(name for name in os.listdir(RESULTS_DIR) if name.startswith("e2e-") and name.endswith(".json"))
+    if not runs:
+        return None
+    with open(os.path.join(RESULTS_DIR, runs[-1]), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_report(results, previous):
+    """Print p50/p95 per scenario, with the relative change against the previous run"""
+    def change(path, value):
+        node = previous and previous.get("results")
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+        if not node:
+            return ""
+        return f" ({(value - node) / node:+.0%})"
+
+    for group, scenarios in results.items():
+        print(f"\n[{group}]")
+        for scenario, numbers in scenarios.items():
+            parts = [
+                f"{metric} {value}{change((group, scenario, metric), value)}"
+                for metric, value in numbers.items()
+            ]
+            print(f"  {scenario:<20} " + "   ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--sessions", default="1,4,16", help="comma-separated concurrent session counts")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock time to first token, seconds")
+    parser.add_argument("--tokens-per-sec", type=float, default=2000.0, help="mock generation speed")
+    parser.add_argument("--no-store", action="store_true", help="do not write a results file")
+    args = parser.parse_args()
+
+    module = load_builder_module()
+    results = {}
+    bytes_written = 0
+    with tempfile.TemporaryDirectory() as output_dir:
+        for size, (pages, page_bytes) in SIZES.items():
+            server = MockOpenAIServer(latency=args.latency, tokens_per_sec=args.tokens_per_sec,
+                                      pages=pages, page_bytes=page_bytes).start()
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+            os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+            module.set_backend(None)  # reconnect to this size's server
+            try:
+                with redirect_stdout(io.StringIO()):
+                    results[f"sequential-{size}"] = bench_size(args.iterations, os.path.join(output_dir, size))
+                    if size == "medium":
+                        results["concurrent-medium"] = {
+                            f"sessions-{count}": bench_concurrency(count, os.path.join(output_dir, f"concurrent-{count}"))
+                            for count in (int(value) for value in args.sessions.split(","))
+                        }
+            finally:
+                server.stop()
+        bytes_written = directory_bytes(output_dir)
+
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "config": vars(args),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "bytes_written": bytes_written,
+        "results": results,
+    }
+
+    previous = previous_results()
+    print(f"End-to-end benchmark @ {run['git_commit']} "
+          f"(peak RSS {run['peak_rss_kb'] / 1024:.0f} MB, {bytes_written / 1024:.0f} KB written)")
+    print_report(results, previous)
+
+    if not args.no_store:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"e2e-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{run['git_commit']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nResults stored in {os.path.relpath(path, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark parallel generation against a rate-limited mock API, with and without RateLimiter
+
+Starts benchmarks/mock_openai_server.py with per-minute request and token limits, then
+runs the same number of sites from parallel sessions (half interactive, half batch)
+once through the client-side rate limiter and once without it. Reports 429 responses,
+retries, failed sites, throughput and per-lane latency.
+
+Usage: python benchmarks/bench_rate_limit.py [--sites 48] [--sessions 16] [--rpm 120] [--tpm 200000]
+"""
+import io
+import time
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+from common import load_builder_module
+from mock_openai_server import MockOpenAIServer
+
+
+def run(module, server, sites, sessions, use_limiter):
+    """Generate `sites` sites from `sessions` threads; returns the numbers for one mode"""
+    backend = module.OpenAIBackend(base_url=server.base_url, api_key="mock-key",
+                                   limiter=module.RateLimiter(rpm=0, tpm=0))
+    if not use_limiter:
+        backend.limiter = None
+    latencies = {lane: [] for lane in module.RATE_LIMIT_LANES}
+    failures = []
+
+    def session(index):
+        lane = module.RATE_LIMIT_LANES[index % len(module.RATE_LIMIT_LANES)]
+        for number in range(index, sites, sessions):
+            builder = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=backend, lane=lane)
+            builder.fast_path = False
+            start = time.perf_counter()
+            try:
+                builder.generate_website(f"Create a landing page for client {number}")
+            except Exception as e:
+                failures.append(str(e))
+                continue
+            latencies[lane].append(time.perf_counter() - start)
+
+    rejected_before = server.rejected
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(session, range(sessions)))
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed": elapsed,
+        "rejected": server.rejected - rejected_before,
+        "retries": backend.retries,
+        "failures": len(failures),
+        "latencies": latencies,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", type=int, default=48)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--rpm", type=int, default=120)
+    parser.add_argument("--tpm", type=int, default=200000)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock time to first token, seconds")
+    args = parser.parse_args()
+
+    module = load_builder_module()
+    print(f"{args.sites} sites from {args.sessions} sessions, limits {args.rpm} RPM / {args.tpm} TPM\n")
+    for use_limiter in (False, True):
+        # A fresh server per mode so both start with full per-minute budgets
+        server = MockOpenAIServer(latency=args.latency, tokens_per_sec=20000.0, pages=1, page_bytes=4000,
+                                  rpm=args.rpm, tpm=args.tpm).start()
+        try:
+            result = run(module, server, args.sites, args.sessions, use_limiter)
+        finally:
+            server.stop()
+        done = args.sites - result["failures"]
+        lanes = "   ".join(
+            f"{lane} p50 {module.percentile(samples, 0.50):5.1f}s p95 {module.percentile(samples, 0.95):5.1f}s"
+            for lane, samples in result["latencies"].items() if samples
+        )
+        print(f"{'rate limiter' if use_limiter else 'no limiter':<13} {result['elapsed']:6.1f}s   "
+              f"{done / result['elapsed'] * 60:5.1f} sites/min   {result['rejected']:4d} x 429   "
+              f"{result['retries']:4d} retries   {result['failures']:3d} failed")
+        print(f"{'':<13} {lanes}")
+
+
+if __name__ == "__main__":
+    main()
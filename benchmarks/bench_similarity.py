@@ -0,0 +1,48 @@
+"""Benchmark similar-prompt lookup in SimilarityIndex at tens of thousands of stored prompts
+
+Fills a throwaway index with sample prompts, then reports per-lookup latency and how
+many fresh prompts would start from an earlier site instead of a full generation.
+
+Usage: python benchmarks/bench_similarity.py [--stored 30000] [--lookups 2000]
+"""
+import os
+import time
+import argparse
+import tempfile
+
+from common import load_builder_module
+from bench_templates import sample_prompts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stored", type=int, default=30000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    module = load_builder_module()
+    with tempfile.TemporaryDirectory() as folder:
+        index = module.SimilarityIndex(path=os.path.join(folder, "similar.jsonl"))
+        start = time.perf_counter()
+        for number, prompt in enumerate(sample_prompts(args.stored, seed=1)):
+            index.add(prompt, f"key-{number}")
+        add_elapsed = time.perf_counter() - start
+
+        lookups = sample_prompts(args.lookups, seed=2)
+        latencies = []
+        matched = 0
+        for prompt in lookups:
+            start = time.perf_counter()
+            matched += bool(index.lookup(prompt))
+            latencies.append(time.perf_counter() - start)
+
+    print(f"Similar-prompt index with {args.stored} stored prompts\n")
+    print(f"add      {add_elapsed / args.stored * 1e6:8.1f} µs/prompt")
+    print(f"lookup   p50 {module.percentile(latencies, 0.50) * 1e6:7.1f} µs   "
+          f"p95 {module.percentile(latencies, 0.95) * 1e6:7.1f} µs   "
+          f"max {max(latencies) * 1e6:7.1f} µs")
+    print(f"reuse    {matched / len(lookups):.0%} of {len(lookups)} new prompts have a similar earlier site")
+
+
+if __name__ == "__main__":
+    main()
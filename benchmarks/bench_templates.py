@@ -0,0 +1,87 @@
+"""Benchmark few-shot template selection over a few thousand sample prompts
+
+Compares the keyword-index selector in AIWebBuilder.get_relevant_templates with
+the original substring scan, reporting selection time and few-shot prompt tokens,
+and lists each template's tokens as written and in the compacted few-shot form.
+
+Usage: python benchmarks/bench_templates.py [--prompts 5000]
+"""
+import time
+import random
+import argparse
+
+from common import load_builder_module
+
+
+SUBJECTS = [
+    "cake shop", "bakery", "dessert bar", "online store", "e-commerce site", "shoe shop",
+    "saas product", "startup", "consulting service", "portfolio", "designer showcase",
+    "developer portfolio", "artist gallery", "restaurant", "gym", "law firm", "blog",
+    "wedding planner", "dentist", "photography studio",
+]
+EXTRAS = [
+    "with a pricing table", "with a cart", "with features list", "landing page",
+    "with projects section", "with contact form", "dark theme", "pink colors",
+    "where customers can buy online", "with testimonials", "", "",
+]
+
+
+def sample_prompts(count, seed=42):
+    """Build a reproducible mix of realistic prompts"""
+    rng = random.Random(seed)
+    prompts = []
+    for _ in range(count):
+        extras = " ".join(rng.sample(EXTRAS, rng.randint(0, 3)))
+        prompts.append(f"Create a {rng.choice(SUBJECTS)} website {extras}".strip())
+    return prompts
+
+
+def legacy_select(module, user_prompt):
+    """The original selector: substring checks that can include every template"""
+    prompt_lower = user_prompt.lower()
+    selected = []
+    if any(word in prompt_lower for word in ['cake', 'bakery', 'sweet', 'dessert', 'pastry']):
+        selected.append(('Cake Shop', module.TEMPLATE_EXAMPLES['cake_shop']))
+    if any(word in prompt_lower for word in ['shop', 'store', 'ecommerce', 'e-commerce', 'cart', 'product', 'buy', 'sell']):
+        selected.append(('E-Commerce', module.TEMPLATE_EXAMPLES['ecommerce']))
+    if any(word in prompt_lower for word in ['landing', 'saas', 'service', 'features', 'pricing', 'startup']):
+        selected.append(('Landing Page', module.TEMPLATE_EXAMPLES['landing']))
+    if any(word in prompt_lower for word in ['portfolio', 'showcase', 'work', 'projects', 'designer', 'developer', 'artist']):
+        selected.append(('Portfolio', module.TEMPLATE_EXAMPLES['portfolio']))
+    if not selected:
+        selected.append(('Landing Page', module.TEMPLATE_EXAMPLES['landing']))
+    return selected
+
+
+def measure(name, select, prompts, estimate_tokens):
+    start = time.perf_counter()
+    selections = [select(prompt) for prompt in prompts]
+    elapsed = time.perf_counter() - start
+    
+    tokens = [sum(estimate_tokens(code) for _, code in selection) for selection in selections]
+    counts = [len(selection) for selection in selections]
+    print(f"{name:<10} {elapsed / len(prompts) * 1e6:8.1f} µs/prompt   "
+          f"{sum(counts) / len(counts):4.2f} templates   "
+          f"{sum(tokens) / len(tokens):7.0f} avg tokens   {max(tokens):6d} max tokens")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=5000)
+    args = parser.parse_args()
+    
+    module = load_builder_module()
+    builder = module.AIWebBuilder(use_cache=False)
+    prompts = sample_prompts(args.prompts)
+    
+    print("Template tokens as written -> compacted for few-shot context\n")
+    for name, tokens, compact_tokens in module.template_token_report():
+        print(f"{name:<10} {tokens:6d} -> {compact_tokens:6d}   ({(compact_tokens - tokens) / tokens:+.0%})")
+    
+    print(f"\nTemplate selection over {len(prompts)} prompts\n")
+    measure("legacy", lambda prompt: legacy_select(module, prompt), prompts, module.estimate_tokens)
+    measure("indexed", builder.get_relevant_templates, prompts, module.estimate_tokens)
+
+
+if __name__ == "__main__":
+    main()
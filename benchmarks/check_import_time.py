@@ -0,0 +1,73 @@
+"""Guard the cold-start cost of importing AI-web-builder.py
+
+Imports the module in a fresh interpreter under `python -X importtime`, fails if
+the import takes longer than the budget or pulls in modules that are meant to
+load lazily (the OpenAI SDK, dotenv, asyncio), and lists the slowest imports.
+
+Usage: python benchmarks/check_import_time.py [--budget-ms 100]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_PATH = os.path.join(ROOT, "AI-web-builder.py")
+
+# Modules that must only be imported on first use, never at import time
+LAZY_MODULES = {"openai", "dotenv", "asyncio"}
+
+PROBE = f"""
+import time
+import importlib.util
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("ai_web_builder", {MODULE_PATH!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def parse_importtime(stderr):
+    """Return [(cumulative_us, module_name)] from -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative), name.strip()))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    args = parser.parse_args()
+    
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True, text=True, check=True,
+    )
+    elapsed_ms = float(completed.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(completed.stderr)
+    
+    print(f"Import of AI-web-builder.py: {elapsed_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("Slowest imports:")
+    for cumulative, name in sorted(imports, reverse=True)[:5]:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+    
+    eager = sorted({name.split(".")[0] for _, name in imports} & LAZY_MODULES)
+    failed = False
+    if eager:
+        print(f"❌ Imported eagerly: {', '.join(eager)}")
+        failed = True
+    if elapsed_ms > args.budget_ms:
+        print("❌ Import time over budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ Import time OK")
+
+
+if __name__ == "__main__":
+    main()
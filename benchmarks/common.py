@@ -0,0 +1,17 @@
+"""Helpers shared by the benchmark scripts"""
+import os
+import sys
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_builder_module():
+    """Import AI-web-builder.py (its file name is not a valid module name)"""
+    if "ai_web_builder" in sys.modules:
+        return sys.modules["ai_web_builder"]
+    spec = importlib.util.spec_from_file_location("ai_web_builder", os.path.join(ROOT, "AI-web-builder.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["ai_web_builder"] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,246 @@
+"""Local stand-in for the OpenAI chat completions API, for benchmarking without real calls
+
+Serves POST /v1/chat/completions with canned website payloads, simulating
+time-to-first-token (--latency) and generation speed (--tokens-per-sec), with
+or without streaming. Edit requests from modify_website's diff mode get a small
+search/replace edit back. With --rpm/--tpm it enforces per-minute limits like the
+real API: x-ratelimit-* headers on every response and 429 with retry-after-ms once
+a limit is used up. Point the builder at it with
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Usage: python benchmarks/mock_openai_server.py [--port 8765] [--pages 3] [--page-bytes 6000] [--rpm 0] [--tpm 0]
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Text every generated index.html contains exactly once, used as the edit anchor
+EDIT_ANCHOR = "<h1 class=\"text-4xl font-bold\">Mock Site</h1>"
+
+CHARS_PER_TOKEN = 4
+
+
+def build_site_payload(pages=3, page_bytes=6000):
+    """Canned generation response: `pages` HTML pages of roughly page_bytes each plus CSS/JS"""
+    files = {}
+    for index in range(pages):
+        name = "index.html" if index == 0 else f"page{index}.html"
+        heading = EDIT_ANCHOR if index == 0 else f"<h1 class=\"text-4xl font-bold\">Page {index}</h1>"
+        card = (
+            "<div class=\"bg-white rounded-lg shadow-md p-6 hover:shadow-lg transition\">"
+            "<h3 class=\"text-xl font-bold mb-2\">Card title</h3>"
+            "<p class=\"text-gray-600\">Some descriptive text for this card.</p></div>\n"
+        )
+        cards = card * max(page_bytes // len(card), 1)
+        files[name] = (
+            "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"UTF-8\">\n"
+            f"<title>Mock page {index}</title>\n"
+            "<script src=\"https://cdn.tailwindcss.com\"></script>\n</head>\n"
+            f"<body class=\"bg-gray-50\">\n{heading}\n<main class=\"grid grid-cols-3 gap-6\">\n{cards}</main>\n"
+            "<script src=\"script.js\"></script>\n</body>\n</html>\n"
+        )
+    files["styles.css"] = "body { scroll-behavior: smooth; }\n" * 20
+    files["script.js"] = "document.querySelectorAll('a').forEach(a => a.addEventListener('click', () => {}));\n" * 20
+    return {
+        "project_name": "mock-site",
+        "needs_backend": False,
+        "backend_requirements": "",
+        "files": files,
+        "description": f"Mock site with {pages} page(s)",
+    }
+
+
+EDIT_PAYLOAD = {
+    "edits": [{"file": "index.html", "search": EDIT_ANCHOR, "replace": EDIT_ANCHOR + "\n<p>Edited</p>"}],
+    "new_files": {},
+    "description": "Mock edit",
+}
+
+
+class MockOpenAIServer:
+    """Threaded HTTP server answering chat completion requests with canned payloads"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.5, tokens_per_sec=400.0,
+                 pages=3, page_bytes=6000, rpm=0, tpm=0):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.site_payload = json.dumps(build_site_payload(pages, page_bytes))
+        self.edit_payload = json.dumps(EDIT_PAYLOAD)
+        self.requests = 0
+        self.rejected = 0
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self._levels = {kind: float(limit) for kind, limit in self.limits.items()}
+        self._updated = time.monotonic()
+        self._limit_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def admit(self, tokens):
+        """Take one request and `tokens` tokens from the per-minute limits: (allowed, headers)"""
+        with self._limit_lock:
+            now = time.monotonic()
+            elapsed, self._updated = now - self._updated, now
+            needs = {"requests": 1, "tokens": tokens}
+            for kind, limit in self.limits.items():
+                if limit:
+                    self._levels[kind] = min(limit, self._levels[kind] + limit / 60 * elapsed)
+            allowed = all(not limit or self._levels[kind] >= needs[kind] for kind, limit in self.limits.items())
+
+            headers = {}
+            wait = 0.0
+            for kind, limit in self.limits.items():
+                if not limit:
+                    continue
+                if allowed:
+                    self._levels[kind] -= needs[kind]
+                level = self._levels[kind]
+                wait = max(wait, (needs[kind] - level) / (limit / 60))
+                headers[f"x-ratelimit-limit-{kind}"] = str(limit)
+                headers[f"x-ratelimit-remaining-{kind}"] = str(max(int(level), 0))
+                headers[f"x-ratelimit-reset-{kind}"] = f"{(limit - level) / (limit / 60):.3f}s"
+            if not allowed:
+                self.rejected += 1
+                headers["retry-after-ms"] = str(int(wait * 1000) + 1)
+            return allowed, headers
+
+    def respond_to(self, body):
+        """Pick the canned content for a request body"""
+        self.requests += 1
+        system = body["messages"][0]["content"] if body.get("messages") else ""
+        return self.edit_payload if "editing an existing website" in system else self.site_payload
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                content = server.respond_to(body)
+                usage = {
+                    "prompt_tokens": len(json.dumps(body.get("messages", []))) // CHARS_PER_TOKEN,
+                    "completion_tokens": len(content) // CHARS_PER_TOKEN,
+                    "prompt_tokens_details": {"cached_tokens": 0},
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                allowed, self.limit_headers = server.admit(usage["total_tokens"])
+                if not allowed:
+                    self._send_json({"error": {
+                        "message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded",
+                    }}, status=429)
+                    return
+
+                time.sleep(server.latency)
+                if body.get("stream"):
+                    self._stream(body, content, usage)
+                else:
+                    time.sleep(usage["completion_tokens"] / server.tokens_per_sec)
+                    self._send_json({
+                        "id": "chatcmpl-mock",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body.get("model", "mock"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": usage,
+                    })
+
+            def _send_json(self, payload, status=200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self._send_limit_headers()
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body, content, usage):
+                self.send_response(200)
+                self._send_limit_headers()
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def chunk(choices, extra=None):
+                    payload = {
+                        "id": "chatcmpl-mock",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": body.get("model", "mock"),
+                        "choices": choices,
+                    }
+                    payload.update(extra or {})
+                    self._write_chunk(f"data: {json.dumps(payload)}\n\n")
+
+                # Send about 20 tokens per event at the configured token rate
+                step = 20 * CHARS_PER_TOKEN
+                for start in range(0, len(content), step):
+                    chunk([{"index": 0, "delta": {"content": content[start:start + step]}, "finish_reason": None}])
+                    time.sleep(20 / server.tokens_per_sec)
+                chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                if body.get("stream_options", {}).get("include_usage"):
+                    chunk([], {"usage": usage})
+                self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send_limit_headers(self):
+                for name, value in getattr(self, "limit_headers", {}).items():
+                    self.send_header(name, value)
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=400.0)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--page-bytes", type=int, default=6000)
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute limit (0 = none)")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute limit (0 = none)")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(port=args.port, latency=args.latency, tokens_per_sec=args.tokens_per_sec,
+                              pages=args.pages, page_bytes=args.page_bytes, rpm=args.rpm, tpm=args.tpm)
+    print(f"Mock OpenAI server listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Shared fixtures: the builder module, loaded with its caches and metrics in a scratch folder"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Module-level settings are read at import time, so point them away from .cache/ first
+SCRATCH = tempfile.mkdtemp(prefix="ai-web-builder-tests-")
+os.environ["AI_WEB_BUILDER_CACHE_DIR"] = os.path.join(SCRATCH, "generations")
+os.environ["AI_WEB_BUILDER_METRICS"] = os.path.join(SCRATCH, "metrics.jsonl")
+os.environ["AI_WEB_BUILDER_SNAPSHOT_DIR"] = os.path.join(SCRATCH, "sessions")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from common import load_builder_module  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def module():
+    return load_builder_module()
+
+
+@pytest.fixture
+def builder(module):
+    """Builder on a StubBackend without the cache, the local fast path or metrics"""
+    builder = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=module.StubBackend())
+    builder.fast_path = False
+    return builder
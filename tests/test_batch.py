@@ -0,0 +1,91 @@
+import json
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from mock_openai_server import MockOpenAIServer
+
+
+def test_run_batch_against_mock_server(module, tmp_path, monkeypatch):
+    server = MockOpenAIServer(latency=0.0, tokens_per_sec=1e6, pages=2, page_bytes=2000).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setattr(module, "FAST_PATH", False)
+    module.set_backend(None)
+    prompts = tmp_path / "prompts.jsonl"
+    prompts.write_text("\n".join(json.dumps(f"Booking site for dental clinic number {n} with an appointment form")
+                                 for n in range(3)) + "\n", encoding="utf-8")
+    try:
+        manifest = asyncio.run(module.run_batch(str(prompts), concurrency=2, output_dir=str(tmp_path / "out")))
+    finally:
+        server.stop()
+        module.set_backend(None)
+
+    assert manifest["succeeded"] == 3, manifest["results"]
+    assert server.requests == 3
+    assert all(record["completion_tokens"] > 0 for record in manifest["results"])
+    assert len({record["project_name"] for record in manifest["results"]}) == 3
+
+
+class FakeRawResponse:
+    """with_raw_response result whose parse() is a coroutine, like AsyncAPIResponse"""
+
+    def __init__(self, completion):
+        self.completion = completion
+        self.headers = {}
+
+    async def parse(self):
+        return self.completion
+
+
+class FakeAsyncClient:
+    def __init__(self, stub):
+        self.stub = stub
+        self.chat = self.completions = self.with_raw_response = self
+
+    async def create(self, **request):
+        return FakeRawResponse(self.stub._create_once(request))
+
+
+def test_agenerate_with_async_parse(module, builder):
+    stub = module.StubBackend()
+    result = asyncio.run(builder.agenerate_website("Booking site for a dental clinic", FakeAsyncClient(stub)))
+
+    assert result is not None
+    assert builder.project_files == module.STUB_SITE["files"]
+    assert builder.last_usage.completion_tokens > 0
+
+
+class FlakyAsyncClient(FakeAsyncClient):
+    """FakeAsyncClient that raises the given exceptions before it answers"""
+
+    def __init__(self, stub, failures):
+        super().__init__(stub)
+        self.failures = list(failures)
+
+    async def create(self, **request):
+        if self.failures:
+            raise self.failures.pop(0)
+        return await super().create(**request)
+
+
+def test_agenerate_retries_transient_errors(module, builder, monkeypatch):
+    monkeypatch.setattr(module, "BACKOFF_BASE", 0.0)
+    request = httpx.Request("POST", "http://mock/v1/chat/completions")
+    client = FlakyAsyncClient(module.StubBackend(), [
+        openai.APIConnectionError(request=request),
+        openai.InternalServerError("down", response=httpx.Response(503, request=request), body=None),
+    ])
+    assert asyncio.run(builder.agenerate_website("Booking site for a dental clinic", client)) is not None
+    assert builder.backend.retries == 2
+
+
+def test_agenerate_raises_client_errors_without_retrying(module, builder):
+    request = httpx.Request("POST", "http://mock/v1/chat/completions")
+    client = FlakyAsyncClient(module.StubBackend(), [
+        openai.BadRequestError("bad", response=httpx.Response(400, request=request), body=None),
+    ])
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(builder.agenerate_website("Booking site for a dental clinic", client))
+    assert builder.backend.retries == 0
@@ -0,0 +1,57 @@
+import os
+import time
+
+
+def test_hit_and_miss_counts(module, tmp_path):
+    cache = module.GenerationCache(cache_dir=str(tmp_path))
+    key = cache.make_key("bakery site", ["cake_shop"], "gpt-4.1-mini", 0.7, [])
+    assert cache.get(key) is None
+    cache.put(key, '{"files": {}}')
+    assert cache.get(key) == '{"files": {}}'
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_key_covers_model_and_templates(module, tmp_path):
+    cache = module.GenerationCache(cache_dir=str(tmp_path))
+    key = cache.make_key("Bakery  site", ["cake_shop"], "gpt-4.1-mini", 0.7, [])
+    assert key == cache.make_key("bakery site", ["cake_shop"], "gpt-4.1-mini", 0.7, [])
+    assert key != cache.make_key("bakery site", ["cake_shop"], "gpt-4.1-nano", 0.7, [])
+    assert key != cache.make_key("bakery site", ["landing"], "gpt-4.1-mini", 0.7, [])
+
+
+def test_expired_entry_is_a_miss_and_removed(module, tmp_path):
+    cache = module.GenerationCache(cache_dir=str(tmp_path), max_age=60)
+    cache.put("old", "content")
+    stale = time.time() - 120
+    os.utime(tmp_path / "old.json", (stale, stale))
+    assert cache.get("old") is None
+    assert not (tmp_path / "old.json").exists()
+
+
+def test_eviction_drops_least_recently_used(module, tmp_path):
+    cache = module.GenerationCache(cache_dir=str(tmp_path))
+    for age, key in ((30, "a"), (20, "b"), (10, "c")):
+        cache.put(key, "x" * 100)
+        then = time.time() - age
+        os.utime(tmp_path / f"{key}.json", (then, then))
+    cache.peek("a")  # touched, so "b" is now the oldest
+    cache.max_bytes = 250
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "c.json"]
+
+
+def test_entry_removed_by_another_process(module, tmp_path, monkeypatch):
+    cache = module.GenerationCache(cache_dir=str(tmp_path), max_age=60)
+    cache.put("gone", "content")
+    stale = time.time() - 120
+    os.utime(tmp_path / "gone.json", (stale, stale))
+    real_remove = os.remove
+
+    def remove_twice(path):
+        real_remove(path)
+        real_remove(path)  # as if another builder evicted it first
+
+    monkeypatch.setattr(module.os, "remove", remove_twice)
+    cache.evict()
+    assert not (tmp_path / "gone.json").exists()
+    assert cache.get("gone") is None
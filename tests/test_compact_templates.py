@@ -0,0 +1,39 @@
+SOURCE = '''<div class="grid">
+    <!-- Product grid -->
+    <div class="card">
+        <h2>One</h2>
+    </div>
+    <div class="card">
+        <h2>Two</h2>
+    </div>
+    <div class="card">
+        <h2>Three</h2>
+    </div>
+</div>
+<!-- CART PAGE (cart.html) -->
+<script>
+    // Menu data
+    const items = [
+        {id: 1, name: "A", price: 2},
+        {id: 2, name: "B", price: 3},
+        {id: 3, name: "C", price: 4},
+    ];
+</script>
+'''
+
+
+def test_repeated_blocks_and_entries_are_elided(module):
+    assert module.compact_template(SOURCE) == (
+        '<div class="grid">\n<div class="card">\n<h2>One</h2>\n</div>\n'
+        "<!-- ... 2 more blocks like the one above -->\n</div>\n"
+        "<!-- CART PAGE (cart.html) -->\n<script>\nconst items = [\n"
+        '{id: 1, name: "A", price: 2},\n// ... 2 more entries like the one above\n];\n</script>\n'
+    )
+
+
+def test_compact_library_and_token_report(module):
+    library = module.TemplateLibrary(compact=True)
+    assert library["cake_shop"] == module.compact_template(module.TEMPLATE_SOURCES["cake_shop"])
+    report = module.template_token_report()
+    assert [name for name, _, _ in report] == list(module.TEMPLATE_SOURCES)
+    assert all(compact < tokens for _, tokens, compact in report)
@@ -0,0 +1,46 @@
+import re
+import json
+
+import pytest
+
+
+def page(title):
+    return f"<!DOCTYPE html>\n<html><head><title>{title}</title></head><body><h1>{title}</h1>{'<p>x</p>' * 150}</body></html>\n"
+
+
+SITE = {
+    "project_name": "big",
+    "needs_backend": False,
+    "backend_requirements": "",
+    "files": {"index.html": page("home"), **{f"page{number}.html": page(number) for number in range(5)}},
+    "description": "Big site",
+}
+
+
+def content(request):
+    """The whole site, or on a continuation request only the files not yet received"""
+    last = request["messages"][-1]["content"]
+    if "cut off at the output limit" in last:
+        received = last.split("Files received in full: ")[1].split(". ")[0]
+        rest = {name: body for name, body in SITE["files"].items() if name not in re.findall(r"[\w]+\.html", received)}
+        return json.dumps({"files": rest, "complete": True})
+    return json.dumps(SITE)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_truncated_reply_is_completed(module, stream):
+    stub = module.StubBackend(content=content, max_chars=5000)
+    builder = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=stub)
+    builder.fast_path = False
+    assert builder.generate_website("Large site for a dental clinic", stream=stream) is not None
+    assert builder.project_files == SITE["files"]
+    assert len(stub.requests) == 2  # cut off once at 5000 characters, then the rest
+
+
+def test_continuation_stops_when_nothing_new_arrives(module):
+    stub = module.StubBackend(content='{"files": {}, "complete": false}')
+    builder = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=stub)
+    route = builder._route("generate", "site")
+    result = builder._continue_truncated([{"role": "user", "content": "site"}], route, {"files": {"index.html": "x"}})
+    assert result["files"] == {"index.html": "x"}
+    assert len(stub.requests) == 1
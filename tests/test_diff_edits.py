@@ -0,0 +1,55 @@
+import json
+
+FILES = {"index.html": "<h1>Old title</h1>\n<p>Text</p>\n<p>Text</p>\n", "about.html": "<h1>About</h1>\n"}
+
+
+def test_apply_edits(module):
+    updated, conflicts = module.apply_search_replace_edits(FILES, [
+        {"file": "index.html", "search": "Old title", "replace": "New title"},
+        {"file": "index.html", "search": "<h1>New title</h1>", "replace": "<h1 class=\"big\">New title</h1>"},
+    ])
+    assert conflicts == []
+    assert updated["index.html"].startswith("<h1 class=\"big\">New title</h1>")
+    assert "about.html" not in updated or updated["about.html"] == FILES["about.html"]
+
+
+def test_edit_conflicts(module):
+    _, conflicts = module.apply_search_replace_edits(FILES, [
+        {"file": "index.html", "search": "<p>Text</p>", "replace": "<p>One</p>"},
+        {"file": "index.html", "search": "missing", "replace": "x"},
+        {"file": "contact.html", "search": "a", "replace": "b"},
+    ])
+    assert conflicts == [
+        "index.html: search text matched 2 times",
+        "index.html: search text matched 0 times",
+        "contact.html: file not found",
+    ]
+
+
+def edit_builder(module, edits):
+    def content(request):
+        if request["messages"][0]["content"] == module.EDIT_SYSTEM_PROMPT:
+            return json.dumps({"edits": edits, "new_files": {}, "description": "Edited"})
+        return json.dumps(dict(module.STUB_SITE, description="Regenerated"))
+
+    builder = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=module.StubBackend(content=content))
+    builder.fast_path = False
+    builder.project_name = "demo"
+    builder.project_files = dict(FILES)
+    return builder
+
+
+def test_modify_with_edits_sends_one_request(module):
+    builder = edit_builder(module, [{"file": "index.html", "search": "Old title", "replace": "New title"}])
+    builder.modify_website("change the title in index.html to New title", diff=True)
+    assert len(builder.backend.requests) == 1
+    assert builder.project_files["index.html"].startswith("<h1>New title</h1>")
+
+
+def test_conflicting_edits_fall_back_to_regeneration(module):
+    builder = edit_builder(module, [{"file": "index.html", "search": "<p>Text</p>", "replace": "<p>One</p>"}])
+    builder.modify_website("change the text in index.html", diff=True)
+    first, second = builder.backend.requests
+    assert first["messages"][0]["content"] == module.EDIT_SYSTEM_PROMPT
+    assert second["messages"][0]["content"] == module.SYSTEM_PROMPT
+    assert builder.project_files == module.STUB_SITE["files"]
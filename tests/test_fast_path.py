@@ -0,0 +1,30 @@
+PROMPT = "cake shop called Sweet Treats selling cupcakes and donuts in rose"
+
+
+def test_simple_prompt_is_parsed_into_template_slots(module):
+    assert module.extract_fast_path(PROMPT) == {
+        "template": "cake_shop", "brand": "Sweet Treats", "colors": ["rose"],
+        "items": ["Cupcakes", "Donuts"], "tagline": None,
+    }
+
+
+def test_prompts_the_template_cannot_express_go_to_the_model(module):
+    assert module.extract_fast_path("cake shop called Sweet Treats with online ordering and a blog") is None
+    assert module.extract_fast_path("cake shop selling cupcakes") is None  # no brand
+
+
+def test_rendered_site_uses_the_slots(module):
+    files = module.render_fast_path(module.extract_fast_path(PROMPT))
+    assert list(files) == ["index.html", "cart.html"]
+    index = files["index.html"]
+    assert "Sweet Treats" in index and '"Cupcakes"' in index and '"Donuts"' in index
+    assert "bg-rose-" in index or "text-rose-" in index
+    assert not module.validate_files(files)
+
+
+def test_generate_builds_simple_prompts_without_a_model_call(module):
+    builder = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=module.StubBackend())
+    builder.fast_path = True
+    assert builder.generate_website(PROMPT) is not None
+    assert builder.backend.requests == [] and builder.served_locally
+    assert sorted(builder.project_files) == ["cart.html", "index.html"]
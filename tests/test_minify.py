@@ -0,0 +1,27 @@
+def test_regex_after_keyword_keeps_later_strings(module):
+    source = "function f(s) {\n  return /'/.test(s); var msg = 'hello   world';\n}\n"
+    minified = module.minify_js(source)
+    assert "'hello   world'" in minified
+    assert module.check_js_syntax(minified) is None
+
+
+def test_quotes_and_comment_markers_inside_regexes(module):
+    source = ('const quote = /["\']/g;  // strip quotes\n'
+              'if (typeof /x/ === "object") { note = "a  //  b"; }\n'
+              'const path = url.split(/\\/+/).join("  /  ");\n')
+    minified = module.minify_js(source)
+    assert "strip quotes" not in minified
+    assert '/["\']/g' in minified and '"a  //  b"' in minified and '/\\/+/' in minified and '"  /  "' in minified
+    assert module.check_js_syntax(minified) is None
+
+
+def test_division_is_not_a_regex(module):
+    assert module.minify_js("var half = total / 2;  // halve\nvar s = 'a  b';") == "var half = total / 2;\nvar s = 'a  b';"
+
+
+def test_minify_html_and_css(module):
+    page = "<!-- note -->\n<div>\n    <p>Hi</p>\n</div>\n<pre>  keep  </pre>\n<style>\n  a { color : red ; }\n</style>\n"
+    minified = module.minify_html(page)
+    assert "note" not in minified and "<pre>  keep  </pre>" in minified
+    assert "<style>a{color : red}</style>" in minified
+    assert module.minify_css("/* c */\n.a ,\n.b {\n  margin: 0;\n}\n") == ".a,.b{margin: 0}"
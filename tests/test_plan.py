@@ -0,0 +1,49 @@
+import re
+import json
+
+import pytest
+
+PLAN = {
+    "project_name": "planned",
+    "description": "Planned site",
+    "design": {"colors": {"primary": "pink-600"}},
+    "files": {"index.html": "Home page", "about.html": "About page", "menu.html": "Menu page"},
+}
+
+
+def page(title, filler=0):
+    return f"<!DOCTYPE html>\n<html><head><title>{title}</title></head><body><h1>{title}</h1>{'<p>x</p>' * filler}</body></html>\n"
+
+
+def content(request):
+    """The plan, one file per file request (menu.html fails, about.html is cut off), or the rest of about.html"""
+    messages = request["messages"]
+    if "planning a website" in messages[0]["content"]:
+        return json.dumps(PLAN)
+    last = messages[-1]["content"]
+    if "cut off at the output limit" in last:
+        return json.dumps({"files": {"about.html": page("About")}, "complete": True})
+    filename = re.search(r'Generate ONLY the file "([^"]+)"', last).group(1)
+    if filename == "menu.html":
+        raise RuntimeError("backend unavailable")
+    return json.dumps({"files": {filename: page(filename, 200 if filename == "about.html" else 0)}})
+
+
+def test_fan_out_keeps_pages_when_one_fails(module, builder):
+    builder._backend = module.StubBackend(content=content, max_chars=1500)
+    result = builder.plan_and_generate("Cake shop with home, about and menu pages")
+    assert result is not None
+    assert sorted(builder.project_files) == ["about.html", "index.html"]
+    assert builder.project_files["about.html"] == page("About")  # completed by a continuation request
+    assert builder.project_name == "planned"
+
+
+def test_plan_that_cannot_be_parsed(module, builder):
+    builder._backend = module.StubBackend(content="not json")
+    assert builder.plan_and_generate("Cake shop") is None
+
+
+def test_request_file_raises_on_a_reply_without_files(module, builder):
+    builder._backend = module.StubBackend(content=json.dumps({"files": {}}))
+    with pytest.raises(ValueError):
+        builder._request_file("index.html", [], "Generate ONLY the file \"index.html\".")
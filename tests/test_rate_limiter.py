@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+
+def usage(prompt_tokens, completion_tokens):
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def test_estimate_uses_max_tokens_or_recent_completions(module):
+    limiter = module.RateLimiter(rpm=0, tpm=0)
+    messages = [{"role": "user", "content": "x" * 400}]
+    prompt = module.estimate_tokens(module.json.dumps(messages))
+    assert limiter.estimate({"messages": messages, "max_tokens": 500}) == prompt + 500
+    assert limiter.estimate({"messages": messages}) == prompt + module.RATE_LIMIT_COMPLETION_TOKENS
+    limiter.settle(0, usage(10, 300))
+    assert limiter.estimate({"messages": messages}) == prompt + 300
+
+
+def test_settle_refunds_the_overestimate(module):
+    limiter = module.RateLimiter(rpm=100, tpm=10000, headroom=1.0)
+    limiter.acquire(3000)
+    limiter.settle(3000, usage(500, 500))
+    assert 9000 - 1 < limiter.levels["tokens"] <= 9000 + 1  # a little refill may have happened
+
+
+def test_observe_counts_requests_sent_before_limits_were_known(module):
+    limiter = module.RateLimiter(rpm=0, tpm=0, headroom=1.0)
+    limiter.acquire(2000)
+    limiter.settle(2000, usage(400, 600))  # 1000 tokens actually used while no limit was known
+    limiter.observe({"x-ratelimit-limit-tokens": "10000", "x-ratelimit-limit-requests": "60"})
+    assert limiter.limits == {"requests": 60, "tokens": 10000}
+    assert limiter.levels["tokens"] == 9000
+    assert limiter.levels["requests"] == 59
+
+
+def test_observe_follows_the_remaining_budget(module):
+    limiter = module.RateLimiter(rpm=60, tpm=10000, headroom=0.9)
+    limiter.observe({"x-ratelimit-remaining-tokens": "4000", "x-ratelimit-remaining-requests": "50"})
+    assert round(limiter.levels["tokens"]) == 3000  # remaining minus the 10% reserve
+    assert round(limiter.levels["requests"]) == 44
+
+
+def test_acquire_waits_for_the_bucket(module):
+    limiter = module.RateLimiter(rpm=6000, tpm=0, headroom=1.0)
+    limiter.levels["requests"] = 0  # next request fits after 1/100 s
+    start = module.time.monotonic()
+    limiter.acquire(100)
+    assert module.time.monotonic() - start >= 0.005
+    assert limiter.stats()["waits"] == 1
+
+
+def test_streams_settle_from_their_usage_chunk(module):
+    limiter = module.RateLimiter(rpm=100, tpm=100000, headroom=1.0)
+    backend = module.StubBackend(limiter=limiter)
+    request = {"messages": [{"role": "user", "content": "hi"}], "max_tokens": 20000, "stream": True}
+    chunks = list(backend.create(**request))
+    used = chunks[-1].usage.prompt_tokens + chunks[-1].usage.completion_tokens
+    assert 100000 - used - 1 < limiter.levels["tokens"] <= 100000 - used + 1
+
+
+def test_failed_attempts_are_refunded(module):
+    limiter = module.RateLimiter(rpm=100, tpm=100000, headroom=1.0)
+    backend = module.StubBackend(limiter=limiter, failures=[
+        module.TransientBackendError("HTTP 503", retry_after=0),
+        module.TransientBackendError("HTTP 503", retry_after=0),
+    ])
+    response = backend.create(messages=[{"role": "user", "content": "hi"}], max_tokens=20000)
+    used = response.usage.prompt_tokens + response.usage.completion_tokens
+    assert backend.retries == 2
+    assert 100000 - used - 1 < limiter.levels["tokens"] <= 100000 - used + 1
@@ -0,0 +1,73 @@
+import asyncio
+
+from test_batch import FakeAsyncClient
+
+
+def test_agenerate_records_route_metrics(module, tmp_path):
+    sink = module.MetricsSink(path=str(tmp_path / "metrics.jsonl"))
+    builder = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=module.StubBackend())
+    builder.fast_path = False
+    builder.metrics = sink
+    stub = module.StubBackend()
+
+    asyncio.run(builder.agenerate_website("Booking site for a dental clinic", FakeAsyncClient(stub)))
+
+    assert stub.requests[0]["model"] == "gpt-4.1-mini"
+    assert stub.requests[0]["max_tokens"] == 16000
+    [record] = sink.read()
+    assert record["operation"] == "generate" and record["route"] == "site-small"
+    summary = sink.route_summary()["site-small"]
+    assert summary["calls"] == 1 and summary["cost_usd"] > 0
+
+
+ROUTES = {
+    "routes": [
+        {"name": "edit-small", "kind": "edit", "max_files": 1, "max_output_tokens": 1500, "model": "nano"},
+        {"name": "edit", "kind": "edit", "model": "mini", "max_tokens": 8000},
+        {"name": "site-small", "kind": ["generate", "modify"], "max_output_tokens": 8000, "model": "mini"},
+        {"name": "site-large", "kind": ["generate", "modify"], "model": "mini", "max_tokens": 32768},
+    ],
+    "prices": {"mini": {"input": 0.4, "cached_input": 0.1, "output": 1.6}},
+}
+
+
+def router(module, tmp_path, config=ROUTES):
+    path = tmp_path / "routes.json"
+    path.write_text(module.json.dumps(config), encoding="utf-8")
+    return module.ModelRouter(path=str(path))
+
+
+def test_first_matching_route_wins(module, tmp_path):
+    routes = router(module, tmp_path)
+    assert routes.route("edit", 1000, 1).name == "edit-small"
+    assert routes.route("edit", 1000, 2).name == "edit"
+    assert routes.route("edit", 5000, 1).name == "edit"
+    assert routes.route("generate", 5000, 1).name == "site-small"
+    assert routes.route("modify", 20000, 6).name == "site-large"
+    assert routes.route("plan").name == "default"
+    large = routes.route("generate", 20000, 6)
+    assert (large.model, large.temperature, large.max_tokens) == ("mini", module.TEMPERATURE, 32768)
+
+
+def test_missing_routes_file_uses_defaults(module, tmp_path):
+    route = module.ModelRouter(path=str(tmp_path / "none.json")).route("generate", 5000, 1)
+    assert (route.name, route.model, route.temperature, route.max_tokens) == ("default", module.MODEL, module.TEMPERATURE, None)
+
+
+def test_cost_counts_cached_input_at_its_own_price(module, tmp_path):
+    routes = router(module, tmp_path)
+    usage = module.SimpleNamespace(prompt_tokens=1_000_000, completion_tokens=1_000_000,
+                                   prompt_tokens_details=module.SimpleNamespace(cached_tokens=500_000))
+    assert round(routes.cost("mini", usage), 6) == round(0.5 * 0.4 + 0.5 * 0.1 + 1.6, 6)
+    assert routes.cost("unpriced", usage) is None
+
+
+def test_builder_estimates_size_per_kind(module, builder, tmp_path):
+    builder.router = router(module, tmp_path)
+    assert builder._route("generate", "landing page for a bakery").name == "site-small"
+    assert builder._route("generate", "bakery with about, menu, gallery and contact pages").name == "site-large"
+    assert builder._route("generate", "a 6 page site for a bakery").name == "site-large"
+    assert builder._route("edit", files={"index.html": "x" * 4000}).name == "edit-small"
+    assert builder._route("edit", files={"index.html": "x" * 40000}).name == "edit"
+    builder.project_files = {"index.html": "x" * 40000}
+    assert builder._route("modify").name == "site-large"
@@ -0,0 +1,51 @@
+import json
+import asyncio
+
+
+def make_service(module, tmp_path, site, **kwargs):
+    def factory():
+        builder = module.AIWebBuilder(use_cache=False, record_metrics=False,
+                                      backend=module.StubBackend(content=json.dumps(site)))
+        builder.fast_path = False
+        return builder
+    return module.BuilderService(str(tmp_path / "out"), builder_factory=factory, **kwargs)
+
+
+def call(service, method, path, body=None):
+    return asyncio.run(service.handle(method, path, json.dumps(body).encode() if body is not None else b""))
+
+
+def test_generate_then_read_an_encoded_filename(module, tmp_path):
+    site = dict(module.STUB_SITE, files={"index.html": "<p>home</p>", "about us.html": "<p>about</p>"})
+    service = make_service(module, tmp_path, site)
+    status, payload, _ = call(service, "POST", "/sessions/s1/generate", {"prompt": "Booking site for a clinic"})
+    assert status == 200 and sorted(payload["files"]) == ["about us.html", "index.html"]
+    status, payload, _ = call(service, "GET", "/sessions/s1/files/about%20us.html")
+    assert status == 200 and payload["content"] == "<p>about</p>"
+
+
+def test_model_project_name_cannot_leave_output_dir(module, tmp_path):
+    site = dict(module.STUB_SITE, project_name="../../escaped")
+    service = make_service(module, tmp_path, site)
+    call(service, "POST", "/sessions/s1/generate", {"prompt": "Booking site for a clinic"})
+    status, payload, _ = call(service, "POST", "/sessions/s1/save", {})
+    assert status == 200 and payload["project_name"] == "escaped"
+    assert (tmp_path / "out" / "s1" / "escaped" / "index.html").exists()
+    assert not (tmp_path / "escaped").exists()
+
+
+def test_errors_and_health(module, tmp_path):
+    service = make_service(module, tmp_path, module.STUB_SITE)
+    assert call(service, "POST", "/sessions/nobody/modify", {"request": "x"})[0] == 404
+    assert call(service, "POST", "/sessions/s1/generate", {})[0] == 400
+    assert call(service, "GET", "/sessions/s1/files/index.html")[0] == 404
+    assert call(service, "GET", "/nowhere")[0] == 404
+    status, health, _ = call(service, "GET", "/health")
+    assert status == 200 and health["requests"] == 5 and health["sessions"] == 0
+
+
+def test_full_queue_answers_429(module, tmp_path):
+    service = make_service(module, tmp_path, module.STUB_SITE, max_in_flight=1, max_queue=0)
+    service.admitted = 1  # one request already running
+    status, _, headers = call(service, "POST", "/sessions/s1/generate", {"prompt": "Booking site for a clinic"})
+    assert status == 429 and headers["Retry-After"] == "1"
@@ -0,0 +1,44 @@
+HEADER = ('<header class="bg-white shadow"><nav class="container mx-auto flex gap-4 p-4">'
+          '<a href="index.html">Home</a><a href="menu.html">Menu</a><a href="about.html">About</a>'
+          '<a href="contact.html">Contact</a></nav></header>')
+HELPER = ("function formatPrice(value) {\n  // Two decimals and a currency sign, e.g. $4.50\n"
+          "  return '$' + Number(value).toFixed(2).replace(/\\.00$/, '.00');\n}\n")
+
+
+def page(title, script, script_tag="<script>"):
+    return (f"<!DOCTYPE html>\n<html>\n<head><title>{title}</title></head>\n<body>\n{HEADER}\n<main>{title}</main>\n"
+            f"{script_tag}\n{script}</script>\n</body>\n</html>\n")
+
+
+def test_repeated_header_and_functions_are_hoisted(module):
+    files = {"index.html": page("Home", HELPER), "menu.html": page("Menu", HELPER + "formatPrice(3);\n")}
+    updated, report = module.extract_shared_layout(files, min_bytes=100)
+    assert sorted(name for name, _, _ in report) == ["common.js", "partials/header.js"]
+    assert "Contact" in updated["partials/header.js"] and "function formatPrice" in updated["common.js"]
+    assert '<script src="common.js"></script>' in updated["menu.html"]
+    assert "function formatPrice" not in updated["menu.html"] and "formatPrice(3);" in updated["menu.html"]
+
+
+def test_module_and_data_scripts_are_left_alone(module):
+    module_script = "let cart = [];\nfunction addToCart(item) {\n  cart.push(item);\n  return cart.length;\n}\n" * 2
+    files = {
+        "index.html": page("Home", module_script, '<script type="module">'),
+        "menu.html": page("Menu", module_script, '<script type="module">'),
+        "about.html": page("About", '{"@type": "Bakery"}\n', '<script type="application/ld+json">'),
+    }
+    updated, report = module.extract_shared_layout(files, min_bytes=100)
+    assert [name for name, _, _ in report] == ["partials/header.js"]
+    assert "function addToCart" in updated["index.html"] and "common.js" not in updated
+
+
+def test_function_after_regex_following_return(module):
+    script = "function strip(s) {\n  return /\"/.test(s) ? s.replace(/\"/g, '') : s;\n}\nfunction later() {}\n"
+    assert [name for name, _, _ in module._js_top_level_functions(script)] == ["strip", "later"]
+
+
+def test_layout_is_shared_only_in_the_saved_files(module, builder, tmp_path):
+    pages = {"index.html": page("Home", HELPER), "menu.html": page("Menu", HELPER)}
+    builder.project_name, builder.project_files = "demo", dict(pages)
+    builder.save_project(str(tmp_path), static_css=False, shared_layout=True)
+    assert (tmp_path / "demo" / "partials" / "header.js").exists()
+    assert builder.project_files == pages
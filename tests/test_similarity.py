@@ -0,0 +1,25 @@
+def test_lookup_needs_shared_distinctive_words(module, tmp_path):
+    index = module.SimilarityIndex(path=str(tmp_path / "similar.jsonl"))
+    index.add("Create a gym website with a dark theme", "gym")
+    index.add("Wedding photographer portfolio", "photographer")
+    index.add("Lisbon bakery selling sourdough bread and pastries", "bakery")
+
+    assert index.lookup("Create a dentist website with a dark theme") == []
+    assert index.lookup("Portfolio for a wedding planner") == []
+    [match] = index.lookup("bakery in Lisbon selling sourdough bread")
+    assert match["key"] == "bakery"
+
+
+def test_similar_site_seeds_a_full_generation(module, builder, tmp_path):
+    builder.cache = module.GenerationCache(cache_dir=str(tmp_path / "cache"))
+    builder.similar = module.SimilarityIndex(path=str(tmp_path / "similar.jsonl"))
+    builder.cache.put("earlier", module.json.dumps(module.STUB_SITE))
+    builder.similar.add("Lisbon bakery selling sourdough bread and pastries", "earlier")
+
+    builder.generate_website("bakery in Lisbon selling sourdough bread")
+
+    [request] = builder.backend.requests
+    assert request["messages"][0]["content"] == module.SYSTEM_PROMPT  # a full generation, not a diff edit
+    seed = request["messages"][-2]["content"]
+    assert seed.startswith("A site built earlier for a similar request") and "index.html" in seed
+    assert request["messages"][-1]["content"].endswith("bakery in Lisbon selling sourdough bread")
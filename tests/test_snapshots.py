@@ -0,0 +1,36 @@
+def generated_builder(module):
+    builder = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=module.StubBackend())
+    builder.fast_path = False
+    builder.generate_website("Booking site for a dental clinic")
+    return builder
+
+
+def test_snapshot_round_trip(module, tmp_path):
+    builder = generated_builder(module)
+    path = builder.save_snapshot(snapshot_dir=str(tmp_path))
+    restored = module.AIWebBuilder.load_snapshot(builder.snapshot_id, snapshot_dir=str(tmp_path), use_cache=False)
+    assert path.endswith(module.SNAPSHOT_SUFFIX)
+    assert restored.project_name == builder.project_name
+    assert restored.project_files == builder.project_files
+    assert restored.history.turns == builder.history.turns
+
+
+def test_sessions_with_the_same_project_name_keep_separate_snapshots(module, tmp_path):
+    first, second = generated_builder(module), generated_builder(module)
+    assert first.project_name == second.project_name
+    first_path = first.save_snapshot(snapshot_dir=str(tmp_path))
+    second_path = second.save_snapshot(snapshot_dir=str(tmp_path))
+    assert first_path != second_path
+    assert len(module.list_snapshots(str(tmp_path))) == 2
+
+    # A resumed session saves back to its own snapshot
+    resumed = module.AIWebBuilder.load_snapshot(first.snapshot_id, snapshot_dir=str(tmp_path), use_cache=False)
+    assert resumed.save_snapshot(snapshot_dir=str(tmp_path)) == first_path
+    assert len(module.list_snapshots(str(tmp_path))) == 2
+
+
+def test_resume_by_project_name_picks_the_latest_session(module, tmp_path):
+    builder = generated_builder(module)
+    builder.save_snapshot(snapshot_dir=str(tmp_path))
+    restored = module.AIWebBuilder.load_snapshot(builder.project_name, snapshot_dir=str(tmp_path), use_cache=False)
+    assert restored.snapshot_id == builder.snapshot_id
@@ -0,0 +1,39 @@
+CDN = '<script src="https://cdn.tailwindcss.com"></script>'
+
+
+def page(classes):
+    return f'<!DOCTYPE html><html><head>{CDN}</head><body><div class="{classes}">Hi</div></body></html>'
+
+
+def test_container_has_breakpoint_max_widths(module):
+    css, unknown = module.build_tailwind_css({"index.html": page("container mx-auto")})
+    assert unknown == []
+    for width in module.TAILWIND_SCREENS.values():
+        assert f"@media (min-width:{width}){{.container{{max-width:{width}}}" in css
+
+
+def test_common_utilities_and_arbitrary_values(module):
+    classes = ("line-clamp-3 ring-2 ring-offset-2 ring-offset-white placeholder-gray-400 fill-current "
+               "bg-[#ff5a5f] hover:bg-[#ff5a5f]/80 text-[14px] text-[#333] from-[#fff]")
+    css, unknown = module.build_tailwind_css({"index.html": page(classes)})
+    assert unknown == []
+    assert "-webkit-line-clamp:3" in css
+    assert "--tw-ring-offset-width:2px" in css
+    assert ".placeholder-gray-400::placeholder{" in css
+    assert ".fill-current{fill:currentColor}" in css
+    assert "background-color:rgb(255 90 95 / 0.8)" in css
+    assert "font-size:14px" in css
+
+
+def test_unknown_classes_keep_the_cdn(module):
+    files = {"index.html": page("bg-pink-500 mask-radial-at-center")}
+    updated, unknown = module.apply_static_css(files)
+    assert unknown == ["mask-radial-at-center"]
+    assert updated == files
+
+
+def test_known_classes_replace_the_cdn(module):
+    updated, unknown = module.apply_static_css({"index.html": page("bg-pink-500 p-4")})
+    assert unknown == []
+    assert CDN not in updated["index.html"] and '<link rel="stylesheet" href="tailwind.css">' in updated["index.html"]
+    assert ".bg-pink-500{" in updated["tailwind.css"]
@@ -0,0 +1,73 @@
+def test_streamed_files_are_written_as_they_arrive(module, builder, tmp_path):
+    written = []
+    write = module.write_file_atomic
+    module.write_file_atomic = lambda path, content: (written.append(path), write(path, content))
+    try:
+        builder.generate_website("Booking site for a dental clinic", stream=True, output_dir=str(tmp_path))
+    finally:
+        module.write_file_atomic = write
+    project = tmp_path / module.STUB_SITE["project_name"]
+    # Written as soon as it streamed in, then saved again with the manifest once validated
+    assert written[0] == str(project / "index.html")
+    assert written.index(str(project / module.MANIFEST_NAME)) > 0
+    saved = (project / "index.html").read_text(encoding="utf-8")
+    assert "<h1 class=\"text-4xl font-bold\">Stub Site</h1>" in saved
+
+
+def test_cache_hit_with_stream_writes_output_dir(module, tmp_path):
+    cache = module.GenerationCache(cache_dir=str(tmp_path / "cache"))
+    for attempt in ("first", "second"):
+        builder = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=module.StubBackend())
+        builder.fast_path = False
+        builder.cache = cache
+        builder.generate_website("Booking site for a dental clinic", stream=True, output_dir=str(tmp_path / attempt))
+    assert builder.backend.requests == []  # the second run was a cache hit
+    first = tmp_path / "first" / module.STUB_SITE["project_name"]
+    second = tmp_path / "second" / module.STUB_SITE["project_name"]
+    assert sorted(path.name for path in second.iterdir()) == sorted(path.name for path in first.iterdir())
+    assert (second / "index.html").read_text(encoding="utf-8") == (first / "index.html").read_text(encoding="utf-8")
+
+
+def test_streamed_files_stay_inside_output_dir(module, tmp_path):
+    site = dict(module.STUB_SITE, files={"index.html": "<p>ok</p>", "../escape.html": "<p>no</p>"})
+    builder = module.AIWebBuilder(use_cache=False, record_metrics=False,
+                                  backend=module.StubBackend(content=module.json.dumps(site)))
+    builder.fast_path = False
+    builder.generate_website("Booking site for a dental clinic", stream=True, output_dir=str(tmp_path / "out"))
+    assert (tmp_path / "out" / site["project_name"] / "index.html").exists()
+    assert not (tmp_path / "out" / "escape.html").exists()
+
+
+def test_parser_emits_files_as_they_close(module):
+    site = {"project_name": "demo", "files": {"index.html": "<h1>Café \"Luna\"</h1>\n", "app.js": "let a = '\\\\';"},
+            "description": "Demo"}
+    text = module.json.dumps(site)
+    fed = 0
+    received = []
+    parser = module.StreamingJSONParser(on_file=lambda name, content: received.append((name, content, fed)))
+    while fed < len(text):  # three characters at a time, so escapes and keys are split across chunks
+        fed += 3
+        parser.feed(text[fed - 3:fed])
+    assert parser.close() == site
+    assert [(name, content) for name, content, _ in received] == list(site["files"].items())
+    assert received[0][2] < text.index('"app.js"') + 3  # index.html arrived before the next file started
+
+
+def test_parser_partial_and_salvage(module):
+    text = '{"project_name": "demo", "files": {"index.html": "<p>done</p>", "about.html": "<p>cut o'
+    parser = module.StreamingJSONParser()
+    parser.feed(text)
+    result, open_file = parser.partial()
+    assert result["files"] == {"index.html": "<p>done</p>"} and open_file == "about.html"
+    assert module.salvage_json(text) == (result, "about.html")
+
+
+def test_parser_scans_large_files_in_linear_time(module):
+    page = ("<div class=\"card\">\n  <p>Price: \\\\ 4 \"off\"</p>\n</div>\n" * 4000)
+    text = module.json.dumps({"project_name": "demo", "files": {"index.html": page}, "description": "Demo"})
+    parser = module.StreamingJSONParser()
+    start = module.time.perf_counter()
+    for offset in range(0, len(text), 4):  # token-sized deltas over a ~200 KB value
+        parser.feed(text[offset:offset + 4])
+    assert parser.close()["files"]["index.html"] == page
+    assert module.time.perf_counter() - start < 2.0
@@ -0,0 +1,15 @@
+def test_verbs_do_not_outweigh_the_business_type(module):
+    assert module.rank_templates("cake shop selling cupcakes, brownies and tarts")[0] == "cake_shop"
+    assert module.extract_fast_path("cake shop called Sweet Treats selling cupcakes, brownies and tarts")["template"] == "cake_shop"
+
+
+def test_keyword_forms(module):
+    assert module.rank_templates("online shopping for sneakers") == ["ecommerce"]
+    assert module.rank_templates("pastries and desserts") == ["cake_shop"]
+    assert module.rank_templates("developer portfolio showcasing projects") == ["portfolio"]
+    assert {"shops", "shopping", "shopper"} <= module.keyword_variants("shop")
+    assert {"sells", "selling", "seller"} <= module.keyword_variants("sell")
+
+
+def test_unmatched_prompt_falls_back_to_landing(module, builder):
+    assert [name for name, _ in builder.get_relevant_templates("a site for my dentist office")] == ["Landing Page"]
@@ -0,0 +1,34 @@
+import json
+
+
+BROKEN_SITE = {
+    "project_name": "broken",
+    "files": {"index.html": "<!DOCTYPE html><html><body><div><a href=\"about.html\">About</a></body></html>"},
+    "description": "Broken site",
+}
+FIXED_PAGE = "<!DOCTYPE html><html><body><div>{}</div></body></html>"
+
+
+def test_repaired_reply_is_cached_and_cache_hit_skips_validation(module, tmp_path):
+    def content(request):
+        last = request["messages"][-1]["content"]
+        if "Return the corrected" in last or "Generate ONLY" in last:
+            filename = last.split('"')[1]
+            return json.dumps({"files": {filename: FIXED_PAGE.format(filename)}})
+        return json.dumps(BROKEN_SITE)
+
+    cache = module.GenerationCache(cache_dir=str(tmp_path / "cache"))
+    first = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=module.StubBackend(content=content))
+    first.fast_path = False
+    first.cache = cache
+    first.generate_website("Booking site for a dental clinic")
+    assert len(first.backend.requests) > 1  # the broken page and the missing link were repaired
+    repaired = dict(first.project_files)
+
+    second = module.AIWebBuilder(use_cache=False, record_metrics=False, backend=module.StubBackend(content=content))
+    second.fast_path = False
+    second.cache = cache
+    second.validate_project = None  # a cache hit must not validate
+    second.generate_website("Booking site for a dental clinic")
+    assert second.backend.requests == []
+    assert second.project_files == repaired